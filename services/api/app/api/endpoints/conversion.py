@@ -5,94 +5,286 @@ Provides endpoints for converting OSCAL documents between JSON and XML formats
 using the OSCAL CLI with operation tracking and storage integration.
 """
 
+import hashlib
+import os
+import shutil
+import tempfile
+from functools import lru_cache
 from pathlib import Path
-from typing import Literal, Optional
-from uuid import UUID
+from typing import AsyncIterator, Literal, Optional
+from urllib.parse import quote
+from uuid import UUID, uuid4
 
+import aiofiles
 import structlog
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse, RedirectResponse, Response, StreamingResponse
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db_session
-from app.models import Operation
-from app.services.oscal_service import OSCALService, ConversionResult
-from app.services.storage_service import StorageService
+from app.core.config import get_settings
+from app.core.database import get_async_session, get_db_session
+from app.core.exceptions import ConversionError
+from app.core.operation_tracking import record_operation_failure
+from app.core.uploads import UPLOAD_CHUNK_SIZE
+from app.models import ConversionCache, Operation
+from app.models.operation import ACTIVE_STATUSES
+from app.services.oscal_service import (
+    DOCUMENT_KIND_PEEK_BYTES,
+    ConversionResult,
+    OSCALService,
+    detect_document_kind,
+    detect_source_format,
+)
+from app.services.storage_service import (
+    acquire_object_reference,
+    get_storage_service,
+    release_object_reference,
+)
 
 logger = structlog.get_logger()
 router = APIRouter()
 
+# Concurrent storage uploads per batch conversion
+BATCH_UPLOAD_CONCURRENCY = 8
+
 # Service instances
 oscal_service = OSCALService()
-storage_service = StorageService()
+storage_service = get_storage_service()
 
 
-@router.post("/file", response_model=dict)
-async def convert_file(
-    file: UploadFile = File(..., description="OSCAL file to convert"),
-    target_format: Literal["json", "xml"] = Form(..., description="Target format"),
-    store_result: bool = Form(True, description="Whether to store converted file"),
-    db: AsyncSession = Depends(get_db_session),
-) -> JSONResponse:
+@lru_cache
+def _scratch_root() -> Optional[str]:
     """
-    Convert an OSCAL file between JSON and XML formats.
+    Get the directory conversion scratch files are created in.
     
-    Supports bidirectional conversion using the OSCAL CLI with
-    comprehensive validation of both input and output.
+    Falls back to the system temp directory if the configured one (tmpfs by
+    default) cannot be created.
     """
-    # Validate input file type
-    if file.content_type not in ["application/json", "application/xml", "text/xml"]:
-        raise HTTPException(
-            status_code=400,
-            detail="Only JSON and XML OSCAL files are supported"
+    scratch_root = get_settings().oscal_tmpdir
+    try:
+        os.makedirs(scratch_root, exist_ok=True)
+    except OSError as e:
+        logger.warning("Conversion scratch directory unavailable", path=scratch_root, error=str(e))
+        return None
+    return scratch_root
+
+
+async def _spool_upload(file: UploadFile, destination: Path) -> tuple[int, str, Optional[str]]:
+    """
+    Stream an upload to disk in a single pass.
+    
+    Each chunk is written, fed to the content hash used as the conversion
+    cache key and, for the first chunk, sniffed for the OSCAL model, so the
+    upload is read exactly once.
+    
+    Args:
+        file: Uploaded file to spool
+        destination: Path the upload is written to
+        
+    Returns:
+        Tuple of (size in bytes, BLAKE2b-256 hex digest, OSCAL document kind)
+    """
+    size_bytes = 0
+    document_kind = None
+    hasher = hashlib.blake2b(digest_size=32)
+    
+    async with aiofiles.open(destination, "wb") as f:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            if size_bytes == 0:
+                document_kind = detect_document_kind(chunk[:DOCUMENT_KIND_PEEK_BYTES])
+            size_bytes += len(chunk)
+            hasher.update(chunk)
+            await f.write(chunk)
+    
+    return size_bytes, hasher.hexdigest(), document_kind
+
+
+async def _save_operation_status(session: AsyncSession, operation: Operation, **values) -> bool:
+    """
+    Persist an operation's status with a single UPDATE ... RETURNING.
+    
+    The operation stays detached, so no ORM state is loaded or flushed for it.
+    Only a pending or running row is updated, so a cancellation made while
+    the work was in progress is not overwritten.
+    
+    Returns:
+        True if the status was written, False if the operation is no longer
+        active or its row no longer exists
+    """
+    result = await session.execute(
+        update(Operation)
+        .where(Operation.id == operation.id, Operation.status.in_(ACTIVE_STATUSES))
+        .values(**operation.status_values(), **values)
+        .returning(Operation.id)
+    )
+    return result.scalar_one_or_none() is not None
+
+
+async def _record_child_failure(operation: Operation) -> None:
+    """Best-effort write of a failed batch child operation on a fresh session."""
+    try:
+        async with get_async_session() as session:
+            await _save_operation_status(session, operation)
+            await session.commit()
+    except Exception as e:
+        logger.error("Failed to mark batch child as failed", operation_id=str(operation.id), error=str(e))
+
+
+async def _sniff_source_format(file: UploadFile) -> Optional[str]:
+    """Detect an upload's format from its leading bytes and rewind it."""
+    head = await file.read(DOCUMENT_KIND_PEEK_BYTES)
+    await file.seek(0)
+    return detect_source_format(head)
+
+
+async def _lookup_cached_conversion(
+    db: AsyncSession,
+    content_hash: str,
+    target_format: str,
+) -> Optional[tuple[int, dict]]:
+    """
+    Look up a stored conversion of identical content and reference its object.
+    
+    The cached location is only served if its object is still in storage;
+    otherwise the stale entry is dropped so the next conversion replaces it.
+    Presigned URLs are re-signed, as the one cached with the entry has
+    likely expired. The caller commits the session.
+    
+    Args:
+        db: Database session the reference is acquired in
+        content_hash: BLAKE2b-256 digest of the input document
+        target_format: Target format of the conversion
+        
+    Returns:
+        Tuple of (output size in bytes, storage info), or None on a miss
+    """
+    cached_conversion = await db.scalar(
+        select(ConversionCache).where(
+            ConversionCache.content_hash == content_hash,
+            ConversionCache.target_format == target_format,
         )
+    )
+    if cached_conversion is None:
+        return None
     
-    # Determine source format from content type
-    source_format = "json" if "json" in file.content_type else "xml"
+    storage_data = dict(cached_conversion.storage_info)
+    bucket = storage_data["bucket"]
+    object_key = storage_data["object_key"]
     
-    if source_format == target_format:
-        raise HTTPException(
-            status_code=400,
-            detail="Source and target formats are the same"
+    # Stored objects are content-addressed and may be shared; the reference
+    # keeps a concurrent delete from removing the object once it is found
+    await acquire_object_reference(db, bucket, object_key)
+    if not await storage_service.object_exists(bucket, object_key):
+        logger.warning(
+            "Cached conversion missing from storage",
+            content_hash=content_hash,
+            target_format=target_format,
+            object_key=object_key,
         )
+        await release_object_reference(db, bucket, object_key)
+        await db.execute(
+            delete(ConversionCache).where(ConversionCache.id == cached_conversion.id)
+        )
+        return None
     
-    operation = Operation(
-        operation_type="conversion",
-        operation_name=f"Convert {file.filename} to {target_format.upper()}",
-        operation_description=f"OSCAL {source_format.upper()} to {target_format.upper()} conversion",
-        input_data={
-            "filename": file.filename,
-            "content_type": file.content_type,
-            "source_format": source_format,
-            "target_format": target_format,
-            "file_size": file.size if hasattr(file, 'size') else None,
-        }
+    logger.info(
+        "Conversion cache hit",
+        content_hash=content_hash,
+        target_format=target_format,
+    )
+    # Compressed objects are only served through the download endpoint
+    if storage_data.get("content_encoding") is None:
+        storage_data["url"] = await storage_service.get_download_url(bucket, object_key)
+    else:
+        storage_data["url"] = None
+    return cached_conversion.output_size_bytes, storage_data
+
+
+async def _cache_conversion(
+    db: AsyncSession,
+    content_hash: str,
+    target_format: str,
+    output_size_bytes: int,
+    storage_data: dict,
+    operation_id: UUID,
+) -> None:
+    """
+    Record a stored conversion for reuse by identical content.
+    
+    Concurrent requests for the same content may race to populate the
+    cache; the first writer wins. The caller commits the session.
+    """
+    await db.execute(
+        pg_insert(ConversionCache)
+        .values(
+            content_hash=content_hash,
+            target_format=target_format,
+            output_size_bytes=output_size_bytes,
+            storage_info=storage_data,
+            conversion_operation_id=operation_id,
+        )
+        .on_conflict_do_nothing(
+            index_elements=["content_hash", "target_format"]
+        )
     )
+
+
+async def _perform_conversion(
+    db: AsyncSession,
+    operation: Operation,
+    input_file: Path,
+    work_dir: Path,
+    input_size_bytes: int,
+    content_hash: str,
+    document_kind: Optional[str],
+    store_result: bool,
+) -> Optional[dict]:
+    """
+    Convert a spooled input file and record the outcome on its operation.
     
-    temp_input_file = None
-    temp_output_file = None
+    Serves identical, previously stored conversions from the cache, otherwise
+    runs the OSCAL CLI and stores the output. The caller commits the session.
     
-    try:
-        operation.mark_started()
-        db.add(operation)
-        await db.commit()
-        
-        # Save uploaded file temporarily
-        temp_input_file = Path(f"/tmp/input_{operation.id}.{source_format}")
-        content = await file.read()
-        temp_input_file.write_bytes(content)
-        
-        # Generate output filename
-        input_stem = Path(file.filename).stem
-        output_filename = f"{input_stem}.{target_format}"
-        temp_output_file = Path(f"/tmp/output_{operation.id}_{output_filename}")
+    Args:
+        db: Database session the operation belongs to
+        operation: Running conversion operation
+        input_file: Spooled input document
+        work_dir: Scratch directory for the converted output
+        input_size_bytes: Size of the input document
+        content_hash: BLAKE2b-256 digest of the input document
+        document_kind: Detected OSCAL model, if any
+        store_result: Whether to store the converted file
         
+    Returns:
+        Operation output data, or None if the CLI rejected the document
+    """
+    source_filename = operation.input_data["filename"]
+    source_format = operation.input_data["source_format"]
+    target_format = operation.input_data["target_format"]
+    
+    # Generate output filename
+    output_filename = f"{Path(source_filename).stem}.{target_format}"
+    temp_output_file = work_dir / output_filename
+    
+    # Identical content that was already converted and stored can be
+    # served from the cache without invoking the OSCAL CLI
+    cached_conversion = None
+    if store_result:
+        cached_conversion = await _lookup_cached_conversion(db, content_hash, target_format)
+    
+    if cached_conversion is not None:
+        output_size_bytes, storage_data = cached_conversion
+        conversion_time_ms = 0
+    else:
         # Convert with OSCAL CLI
         conversion_result: ConversionResult = await oscal_service.convert_document(
-            input_path=temp_input_file,
+            input_path=input_file,
             output_path=temp_output_file,
             target_format=target_format,
-            timeout=300
+            timeout=300,
+            document_kind=document_kind
         )
         
         if not conversion_result.success:
@@ -104,25 +296,13 @@ async def convert_file(
                     "return_code": conversion_result.return_code,
                 }
             )
-            await db.commit()
-            raise HTTPException(
-                status_code=400,
-                detail={
-                    "message": "Conversion failed",
-                    "error": conversion_result.error_message,
-                    "cli_output": {
-                        "stdout": conversion_result.cli_stdout,
-                        "stderr": conversion_result.cli_stderr,
-                        "return_code": conversion_result.return_code,
-                    }
-                }
-            )
+            return None
         
-        # Read converted content
-        converted_content = temp_output_file.read_bytes()
+        output_size_bytes = temp_output_file.stat().st_size
+        conversion_time_ms = conversion_result.duration_ms
         
         # Store converted file if requested
-        storage_info = None
+        storage_data = None
         if store_result:
             storage_info = await storage_service.store_artifact(
                 file_path=temp_output_file,
@@ -131,68 +311,297 @@ async def convert_file(
                 metadata={
                     "source_format": source_format,
                     "target_format": target_format,
-                    "source_filename": file.filename,
+                    "source_filename": source_filename,
                     "conversion_operation_id": str(operation.id),
-                }
+                },
+                compress=True,
+                reference_session=db
             )
-        
-        # Mark operation as completed
-        output_data = {
+            storage_data = storage_info.dict()
+            await _cache_conversion(
+                db, content_hash, target_format, output_size_bytes, storage_data, operation.id
+            )
+    
+    # Mark operation as completed
+    output_data = {
+        "source_format": source_format,
+        "target_format": target_format,
+        "document_kind": document_kind,
+        "input_size_bytes": input_size_bytes,
+        "output_size_bytes": output_size_bytes,
+        "output_filename": output_filename,
+        "conversion_time_ms": conversion_time_ms,
+        "content_hash": content_hash,
+        "cache_hit": cached_conversion is not None,
+        "storage_info": storage_data,
+    }
+    operation.mark_completed(output_data)
+    return output_data
+
+
+async def _run_conversion_job(
+    operation: Operation,
+    job_dir: Path,
+    input_file: Path,
+    input_size_bytes: int,
+    content_hash: str,
+    document_kind: Optional[str],
+    store_result: bool,
+) -> None:
+    """
+    Convert a queued upload in the background and persist the outcome.
+    
+    Runs after the 202 response has been sent, using its own session, and
+    removes the job's scratch directory when done.
+    """
+    try:
+        async with get_async_session() as session:
+            operation.mark_started()
+            
+            try:
+                await _perform_conversion(
+                    session,
+                    operation,
+                    input_file,
+                    job_dir,
+                    input_size_bytes,
+                    content_hash,
+                    document_kind,
+                    store_result,
+                )
+            except Exception as e:
+                # Discard anything half-written so the failure can be recorded
+                await session.rollback()
+                operation.mark_failed(str(e), {"exception_type": type(e).__name__})
+                logger.error("Background conversion failed", operation_id=str(operation.id), error=str(e))
+            
+            if not await _save_operation_status(session, operation):
+                logger.info(
+                    "Background conversion finished after its operation was cancelled",
+                    operation_id=str(operation.id)
+                )
+            await session.commit()
+    finally:
+        shutil.rmtree(job_dir, ignore_errors=True)
+
+
+@router.post("/file", response_model=dict)
+async def convert_file(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(..., description="OSCAL file to convert"),
+    target_format: Literal["json", "xml"] = Form(..., description="Target format"),
+    store_result: bool = Form(True, description="Whether to store converted file"),
+    db: AsyncSession = Depends(get_db_session),
+) -> JSONResponse:
+    """
+    Convert an OSCAL file between JSON and XML formats.
+    
+    Supports bidirectional conversion using the OSCAL CLI with
+    comprehensive validation of both input and output. Files larger than
+    the async conversion threshold are accepted with 202 and converted in
+    the background; poll the operation for the result.
+    """
+    # Determine source format from the content itself; clients often send
+    # generic or wrong content types
+    source_format = await _sniff_source_format(file)
+    if source_format is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Only JSON and XML OSCAL files are supported"
+        )
+    
+    if source_format == target_format:
+        raise HTTPException(
+            status_code=400,
+            detail="Source and target formats are the same"
+        )
+    
+    # Assign the ID up front so the operation is only written once, at the end
+    operation = Operation(
+        id=uuid4(),
+        operation_type="conversion",
+        operation_name=f"Convert {file.filename} to {target_format.upper()}",
+        operation_description=f"OSCAL {source_format.upper()} to {target_format.upper()} conversion",
+        input_data={
+            "filename": file.filename,
+            "content_type": file.content_type,
             "source_format": source_format,
             "target_format": target_format,
-            "input_size_bytes": len(content),
-            "output_size_bytes": len(converted_content),
-            "output_filename": output_filename,
-            "conversion_time_ms": conversion_result.duration_ms,
-            "storage_info": storage_info.dict() if storage_info else None,
+            "file_size": file.size if hasattr(file, 'size') else None,
         }
-        operation.mark_completed(output_data)
-        await db.commit()
+    )
+    
+    # Large files are converted outside the request so the connection and
+    # worker are not held for the duration of the CLI run
+    if file.size is not None and file.size > get_settings().async_conversion_threshold:
+        # Queued jobs may wait a while, so they spool to disk rather than tmpfs
+        job_dir = Path(tempfile.mkdtemp(prefix="oscal_job_"))
+        try:
+            input_file = job_dir / f"input.{source_format}"
+            input_size_bytes, content_hash, document_kind = await _spool_upload(
+                file, input_file
+            )
+            
+            db.add(operation)
+            await db.commit()
+            db.expunge(operation)
+        except Exception:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise
+        
+        background_tasks.add_task(
+            _run_conversion_job,
+            operation,
+            job_dir,
+            input_file,
+            input_size_bytes,
+            content_hash,
+            document_kind,
+            store_result,
+        )
         
         return JSONResponse(
-            status_code=200,
+            status_code=202,
             content={
                 "operation_id": str(operation.id),
-                "success": True,
+                "status": "pending",
                 "source_format": source_format,
                 "target_format": target_format,
                 "input_filename": file.filename,
-                "output_filename": output_filename,
-                "conversion_time_ms": conversion_result.duration_ms,
-                "file_sizes": {
-                    "input_bytes": len(content),
-                    "output_bytes": len(converted_content),
-                },
-                "storage": storage_info.dict() if storage_info else None,
-                "download_url": f"/api/v1/convert/download/{operation.id}" if conversion_result.success else None,
+                "status_url": f"/api/v1/convert/operations/{operation.id}",
+                "download_url": f"/api/v1/convert/download/{operation.id}",
             }
         )
-        
-    except Exception as e:
-        operation.mark_failed(str(e), {"exception_type": type(e).__name__})
-        await db.commit()
-        
-        logger.error("Conversion failed", operation_id=str(operation.id), error=str(e))
-        raise HTTPException(status_code=500, detail=f"Conversion failed: {str(e)}")
-        
-    finally:
-        # Clean up temp files
-        if temp_input_file and temp_input_file.exists():
-            temp_input_file.unlink(missing_ok=True)
-        if temp_output_file and temp_output_file.exists():
-            temp_output_file.unlink(missing_ok=True)
+    
+    with tempfile.TemporaryDirectory(prefix="oscal_", dir=_scratch_root()) as temp_dir:
+        try:
+            operation.mark_started()
+            db.add(operation)
+            
+            # Stream uploaded file to disk without buffering it in memory
+            temp_input_file = Path(temp_dir) / f"input.{source_format}"
+            input_size_bytes, content_hash, document_kind = await _spool_upload(
+                file, temp_input_file
+            )
+            
+            output_data = await _perform_conversion(
+                db,
+                operation,
+                temp_input_file,
+                Path(temp_dir),
+                input_size_bytes,
+                content_hash,
+                document_kind,
+                store_result,
+            )
+            await db.commit()
+            
+            if output_data is None:
+                raise HTTPException(
+                    status_code=400,
+                    detail={
+                        "message": "Conversion failed",
+                        "error": operation.error_message,
+                        "cli_output": {
+                            "stdout": operation.error_details["cli_stdout"],
+                            "stderr": operation.error_details["cli_stderr"],
+                            "return_code": operation.error_details["return_code"],
+                        }
+                    }
+                )
+            
+            return JSONResponse(
+                status_code=200,
+                content={
+                    "operation_id": str(operation.id),
+                    "success": True,
+                    "source_format": source_format,
+                    "target_format": target_format,
+                    "input_filename": file.filename,
+                    "output_filename": output_data["output_filename"],
+                    "conversion_time_ms": output_data["conversion_time_ms"],
+                    "cache_hit": output_data["cache_hit"],
+                    "file_sizes": {
+                        "input_bytes": input_size_bytes,
+                        "output_bytes": output_data["output_size_bytes"],
+                    },
+                    "storage": output_data["storage_info"],
+                    "download_url": f"/api/v1/convert/download/{operation.id}",
+                }
+            )
+            
+        except HTTPException:
+            raise
+            
+        except Exception as e:
+            await record_operation_failure(
+                db, operation, str(e), {"exception_type": type(e).__name__}
+            )
+            
+            logger.error("Conversion failed", operation_id=str(operation.id), error=str(e))
+            raise HTTPException(status_code=500, detail=f"Conversion failed: {str(e)}")
+
+
+def _accepts_encoding(accept_encoding: str, encoding: str) -> bool:
+    """
+    Check whether an Accept-Encoding header allows a content coding.
+    
+    Codings listed with ``q=0`` are refused; ``*`` matches any coding not
+    listed explicitly.
+    """
+    wildcard_q = None
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding == encoding:
+            return q > 0
+        if coding == "*":
+            wildcard_q = q
+    return wildcard_q is not None and wildcard_q > 0
+
+
+def _content_disposition(filename: str) -> str:
+    """Build an attachment Content-Disposition with an RFC 6266 ``filename*``."""
+    fallback = "".join(
+        c if c.isascii() and c.isprintable() and c not in '"\\' else "_"
+        for c in filename
+    )
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+async def _prepend_chunk(first_chunk: bytes, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Yield an already fetched chunk, then the rest of the stream."""
+    if first_chunk:
+        yield first_chunk
+    async for chunk in chunks:
+        yield chunk
 
 
 @router.get("/download/{operation_id}")
 async def download_converted_file(
     operation_id: UUID,
+    request: Request,
     db: AsyncSession = Depends(get_db_session),
-) -> FileResponse:
+) -> Response:
     """
     Download the converted file from a conversion operation.
-    """
-    from sqlalchemy import select
     
+    Files up to the configured stream threshold are streamed from storage;
+    larger files redirect to a presigned storage URL that carries the
+    response headers. Compressed files are sent zstd-encoded to clients that
+    accept it and decompressed on the fly for everyone else, which always
+    streams through the API.
+    """
     # Get the operation
     query = select(Operation).where(
         Operation.id == operation_id,
@@ -216,23 +625,68 @@ async def download_converted_file(
         )
     
     storage_info = output_data["storage_info"]
+    output_size_bytes = output_data.get("output_size_bytes")
+    content_encoding = storage_info.get("content_encoding")
+    content_type = storage_info.get("content_type", "application/octet-stream")
+    content_disposition = _content_disposition(output_data.get("output_filename", "converted"))
+    
+    # Compressed files are sent as stored only to clients that accept the encoding
+    passthrough = content_encoding is not None and _accepts_encoding(
+        request.headers.get("accept-encoding", ""), content_encoding
+    )
     
     try:
-        # Get download URL from storage
-        download_url = await storage_service.get_download_url(
-            bucket=storage_info["bucket"],
-            object_key=storage_info["object_key"],
-            expires_in=3600  # 1 hour
+        # Large files are served by storage directly via a presigned URL, unless
+        # they would need decompressing for a client that can't take zstd
+        stream = (
+            output_size_bytes is not None
+            and output_size_bytes <= get_settings().download_stream_threshold
+        )
+        if not stream and (content_encoding is None or passthrough):
+            response_headers = {
+                "response-content-type": content_type,
+                "response-content-disposition": content_disposition,
+            }
+            if passthrough:
+                response_headers["response-content-encoding"] = content_encoding
+            download_url = await storage_service.get_download_url(
+                bucket=storage_info["bucket"],
+                object_key=storage_info["object_key"],
+                expires_in=3600,  # 1 hour
+                response_headers=response_headers
+            )
+            return RedirectResponse(
+                url=download_url,
+                status_code=302,
+                headers={"Vary": "Accept-Encoding"} if content_encoding is not None else None
+            )
+        
+        headers = {"Content-Disposition": content_disposition}
+        if content_encoding is not None:
+            headers["Vary"] = "Accept-Encoding"
+        if passthrough:
+            headers["Content-Encoding"] = content_encoding
+        elif output_size_bytes is not None:
+            headers["Content-Length"] = str(output_size_bytes)
+        
+        # Open the object before answering, so a missing object or storage
+        # error becomes an error response rather than a truncated 200
+        body = storage_service.stream_object(
+            storage_info["bucket"],
+            storage_info["object_key"],
+            decompress=content_encoding is not None and not passthrough
         )
+        first_chunk = await anext(body, b"")
         
-        # For direct file response, we'd need to stream from storage
-        # For now, redirect to the presigned URL
-        from fastapi.responses import RedirectResponse
-        return RedirectResponse(url=download_url, status_code=302)
+        return StreamingResponse(
+            _prepend_chunk(first_chunk, body),
+            media_type=content_type,
+            headers=headers
+        )
         
     except Exception as e:
-        logger.error("Failed to generate download URL", operation_id=str(operation_id), error=str(e))
-        raise HTTPException(status_code=500, detail="Failed to generate download URL")
+        logger.error("Failed to prepare download", operation_id=str(operation_id), error=str(e))
+        raise HTTPException(status_code=500, detail="Failed to prepare download")
 
 
 @router.post("/batch", response_model=dict)
@@ -256,6 +710,7 @@ async def convert_batch(
     
     # Create parent operation for batch tracking
     parent_operation = Operation(
+        id=uuid4(),
         operation_type="conversion",
         operation_name=f"Batch convert {len(files)} files to {target_format.upper()}",
         operation_description=f"Batch OSCAL conversion of {len(files)} files to {target_format}",
@@ -266,131 +721,208 @@ async def convert_batch(
         }
     )
     parent_operation.mark_started()
+    
+    # Build every child operation up front with pre-generated IDs so the whole
+    # batch is inserted in a single round trip instead of one per file
+    child_operations: list[Operation] = []
+    for file in files:
+        source_format = await _sniff_source_format(file)
+        child_operation = Operation(
+            id=uuid4(),
+            operation_type="conversion",
+            operation_name=f"Convert {file.filename}",
+            operation_description=f"Batch item: {(source_format or 'unknown').upper()} to {target_format.upper()}",
+            parent_operation_id=parent_operation.id,
+            input_data={
+                "filename": file.filename,
+                "source_format": source_format,
+                "target_format": target_format,
+            }
+        )
+        child_operation.mark_started()
+        child_operations.append(child_operation)
+    
     db.add(parent_operation)
+    db.add_all(child_operations)
     await db.commit()
     
+    # Child rows are updated by the per-task sessions from here on
+    for child_operation in child_operations:
+        db.expunge(child_operation)
+    
     results = []
     successful_conversions = 0
     
     try:
         import asyncio
         
-        async def convert_single_file(file: UploadFile) -> dict:
+        async def convert_single_file(file: UploadFile, child_operation: Operation) -> dict:
             """Convert a single file and return result info."""
-            nonlocal successful_conversions
+            source_format = child_operation.input_data["source_format"]
             
-            try:
-                # Create child operation
-                source_format = "json" if "json" in file.content_type else "xml"
-                
-                child_operation = Operation(
-                    operation_type="conversion",
-                    operation_name=f"Convert {file.filename}",
-                    operation_description=f"Batch item: {source_format.upper()} to {target_format.upper()}",
-                    parent_operation_id=parent_operation.id,
-                    input_data={
-                        "filename": file.filename,
-                        "source_format": source_format,
-                        "target_format": target_format,
-                    }
-                )
-                child_operation.mark_started()
-                db.add(child_operation)
-                await db.flush()
-                
-                # Save file temporarily
-                temp_input = Path(f"/tmp/batch_input_{child_operation.id}_{file.filename}")
-                content = await file.read()
-                temp_input.write_bytes(content)
-                
-                # Convert
-                output_filename = f"{Path(file.filename).stem}.{target_format}"
-                temp_output = Path(f"/tmp/batch_output_{child_operation.id}_{output_filename}")
+            # AsyncSession is not safe for concurrent use, so each task writes
+            # its child operation through its own pooled session
+            async with get_async_session() as task_session:
+                with tempfile.TemporaryDirectory(prefix="oscal_batch_", dir=_scratch_root()) as temp_dir:
+                    try:
+                        if source_format is None:
+                            raise ConversionError(
+                                "Only JSON and XML OSCAL files are supported",
+                                details={"filename": file.filename}
+                            )
+                        
+                        # Hold a conversion slot only while spooling and
+                        # running the CLI so the next file can start while
+                        # this one uploads
+                        async with conversion_slots:
+                            # Save file temporarily
+                            temp_input = Path(temp_dir) / f"input.{source_format}"
+                            input_size_bytes, content_hash, document_kind = await _spool_upload(
+                                file, temp_input
+                            )
+                            child_operation.input_data = {
+                                **child_operation.input_data,
+                                "input_size_bytes": input_size_bytes,
+                                "content_hash": content_hash,
+                            }
+                            
+                            output_filename = f"{Path(file.filename).stem}.{target_format}"
+                            temp_output = Path(temp_dir) / output_filename
+                            
+                            # Files converted and stored before, in this
+                            # batch or elsewhere, are served from the cache
+                            cached_conversion = None
+                            if store_results:
+                                cached_conversion = await _lookup_cached_conversion(
+                                    task_session, content_hash, target_format
+                                )
+                            
+                            # Convert
+                            conversion_result = None
+                            if cached_conversion is None:
+                                conversion_result = await oscal_service.convert_document(
+                                    input_path=temp_input,
+                                    output_path=temp_output,
+                                    target_format=target_format,
+                                    timeout=120,  # Shorter timeout for batch
+                                    document_kind=document_kind
+                                )
+                        
+                        if conversion_result is None or conversion_result.success:
+                            if cached_conversion is not None:
+                                output_size_bytes, storage_data = cached_conversion
+                            else:
+                                output_size_bytes = temp_output.stat().st_size
+                                
+                                # Store if requested
+                                storage_data = None
+                                if store_results:
+                                    async with upload_slots:
+                                        storage_info = await storage_service.store_artifact(
+                                            file_path=temp_output,
+                                            artifact_type="batch_converted",
+                                            original_filename=output_filename,
+                                            metadata={
+                                                "batch_operation_id": str(parent_operation.id),
+                                                "source_filename": file.filename,
+                                                "source_format": source_format,
+                                                "target_format": target_format,
+                                            },
+                                            compress=True,
+                                            reference_session=task_session
+                                        )
+                                    storage_data = storage_info.dict()
+                                    await _cache_conversion(
+                                        task_session,
+                                        content_hash,
+                                        target_format,
+                                        output_size_bytes,
+                                        storage_data,
+                                        child_operation.id,
+                                    )
+                            
+                            child_operation.mark_completed({
+                                "output_filename": output_filename,
+                                "output_size_bytes": output_size_bytes,
+                                "cache_hit": cached_conversion is not None,
+                                "storage_info": storage_data,
+                            })
+                            
+                            result = {
+                                "operation_id": str(child_operation.id),
+                                "filename": file.filename,
+                                "success": True,
+                                "output_filename": output_filename,
+                                "cache_hit": cached_conversion is not None,
+                                "storage": storage_data,
+                            }
+                        else:
+                            child_operation.mark_failed(conversion_result.error_message)
+                            result = {
+                                "operation_id": str(child_operation.id),
+                                "filename": file.filename,
+                                "success": False,
+                                "error": conversion_result.error_message,
+                            }
+                            
+                    except Exception as e:
+                        # Drop references acquired for a result that is not recorded
+                        await task_session.rollback()
+                        child_operation.mark_failed(str(e))
+                        result = {
+                            "operation_id": str(child_operation.id),
+                            "filename": file.filename,
+                            "success": False,
+                            "error": str(e),
+                        }
                 
-                conversion_result = await oscal_service.convert_document(
-                    input_path=temp_input,
-                    output_path=temp_output,
-                    target_format=target_format,
-                    timeout=120  # Shorter timeout for batch
+                await _save_operation_status(
+                    task_session, child_operation, input_data=child_operation.input_data
                 )
-                
-                if conversion_result.success:
-                    converted_content = temp_output.read_bytes()
-                    
-                    # Store if requested
-                    storage_info = None
-                    if store_results:
-                        storage_info = await storage_service.store_artifact(
-                            file_path=temp_output,
-                            artifact_type="batch_converted",
-                            original_filename=output_filename,
-                            metadata={
-                                "batch_operation_id": str(parent_operation.id),
-                                "source_filename": file.filename,
-                                "source_format": source_format,
-                                "target_format": target_format,
-                            }
-                        )
-                    
-                    child_operation.mark_completed({
-                        "output_filename": output_filename,
-                        "output_size_bytes": len(converted_content),
-                        "storage_info": storage_info.dict() if storage_info else None,
-                    })
-                    successful_conversions += 1
-                    
-                    return {
-                        "operation_id": str(child_operation.id),
-                        "filename": file.filename,
-                        "success": True,
-                        "output_filename": output_filename,
-                        "storage": storage_info.dict() if storage_info else None,
-                    }
-                else:
-                    child_operation.mark_failed(conversion_result.error_message)
-                    return {
-                        "operation_id": str(child_operation.id),
-                        "filename": file.filename,
-                        "success": False,
-                        "error": conversion_result.error_message,
-                    }
-                    
+                await task_session.commit()
+                return result
+        
+        async def record_single_file(file: UploadFile, child_operation: Operation) -> dict:
+            """Convert a file, recording the child as failed if its status write fails."""
+            nonlocal successful_conversions
+            
+            # An exception raised into the TaskGroup would cancel every sibling
+            # and leave their child operations running, so none escapes a task
+            try:
+                result = await convert_single_file(file, child_operation)
             except Exception as e:
-                if 'child_operation' in locals():
-                    child_operation.mark_failed(str(e))
+                logger.error(
+                    "Failed to record batch conversion result",
+                    operation_id=str(child_operation.id),
+                    error=str(e)
+                )
+                child_operation.mark_failed(f"Failed to record conversion result: {str(e)}")
+                await _record_child_failure(child_operation)
                 return {
-                    "operation_id": str(child_operation.id) if 'child_operation' in locals() else None,
+                    "operation_id": str(child_operation.id),
                     "filename": file.filename,
                     "success": False,
                     "error": str(e),
                 }
-            finally:
-                # Clean up temp files
-                if 'temp_input' in locals() and temp_input.exists():
-                    temp_input.unlink(missing_ok=True)
-                if 'temp_output' in locals() and temp_output.exists():
-                    temp_output.unlink(missing_ok=True)
+            
+            if result["success"]:
+                successful_conversions += 1
+            return result
         
-        # Process files with limited concurrency
-        semaphore = asyncio.Semaphore(5)  # Process 5 files at a time
+        # Files flow through two bounded stages: CLI conversions are CPU-bound,
+        # so their concurrency is configurable and defaults to the number of
+        # cores, while storage uploads are I/O-bound and overlap with later
+        # conversions.
+        conversion_slots = asyncio.Semaphore(get_settings().conversion_concurrency)
+        upload_slots = asyncio.Semaphore(BATCH_UPLOAD_CONCURRENCY)
         
-        async def convert_with_semaphore(file):
-            async with semaphore:
-                return await convert_single_file(file)
+        async with asyncio.TaskGroup() as task_group:
+            tasks = [
+                task_group.create_task(record_single_file(file, child_operation))
+                for file, child_operation in zip(files, child_operations)
+            ]
         
-        results = await asyncio.gather(
-            *[convert_with_semaphore(file) for file in files],
-            return_exceptions=True
-        )
-        
-        # Handle any exceptions from gather
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                results[i] = {
-                    "filename": files[i].filename,
-                    "success": False,
-                    "error": str(result),
-                }
+        results = [task.result() for task in tasks]
         
         # Complete parent operation
         parent_operation.mark_completed({
@@ -429,8 +961,6 @@ async def get_conversion_operation(
     db: AsyncSession = Depends(get_db_session),
 ) -> dict:
     """Get details of a conversion operation."""
-    from sqlalchemy import select
-    
     query = select(Operation).where(
         Operation.id == operation_id,
         Operation.operation_type == "conversion"
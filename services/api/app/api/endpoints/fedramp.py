@@ -5,48 +5,126 @@ Provides endpoints for validating OSCAL documents against FedRAMP 20x
 requirements including baseline-specific constraints and compliance validation.
 """
 
-from pathlib import Path
-from typing import Literal, Optional
-from uuid import UUID
+import asyncio
+from collections import OrderedDict
+from typing import AsyncIterator, Literal, Optional
+from uuid import UUID, uuid4
 
+import orjson
 import structlog
-from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Request, UploadFile
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import get_settings
 from app.core.database import get_db_session
+from app.core.operation_tracking import record_operation_failure
+from app.core.uploads import read_upload
 from app.models import Operation
-from app.services.fedramp_service import FedRAMPService, FedRAMPValidationResult
+from app.models.operation import OperationStatus
+from app.services.fedramp_service import FedRAMPValidationResult, get_fedramp_service
+from app.services.oscal_service import detect_source_format
 
 logger = structlog.get_logger()
 router = APIRouter()
 
+SNIFF_BYTES = 64
+OSCAL_CONTENT_TYPES = ("application/json", "application/xml", "text/xml")
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NDJSON_BATCH_SIZE = 256  # Issues encoded per streamed chunk
+
 # Service instance
-fedramp_service = FedRAMPService()
+fedramp_service = get_fedramp_service()
+
+# Shared by every batch request so concurrent batches cannot oversubscribe the worker pool
+validation_slots = asyncio.Semaphore(get_settings().fedramp_validation_workers)
+
+# Baseline data is static, so responses are encoded once and may be cached downstream
+BASELINE_CACHE_HEADERS = {"Cache-Control": "public, max-age=3600, immutable"}
+
+_BASELINES_RESPONSE = orjson.dumps({
+    "baselines": [
+        {
+            "id": "low",
+            "name": "FedRAMP Low",
+            "description": "Low impact systems with basic security controls",
+            "min_controls": 108,
+            "use_cases": ["Public information", "Low-risk applications"],
+        },
+        {
+            "id": "moderate",
+            "name": "FedRAMP Moderate",
+            "description": "Moderate impact systems with comprehensive security controls",
+            "min_controls": 325,
+            "use_cases": ["Sensitive but unclassified information", "Business applications"],
+        },
+        {
+            "id": "high",
+            "name": "FedRAMP High",
+            "description": "High impact systems with extensive security controls",
+            "min_controls": 421,
+            "use_cases": ["Sensitive/classified information", "Critical infrastructure"],
+        },
+    ],
+    "default_baseline": "moderate",
+    "oscal_version": "1.1.3",
+})
+
+_requirements_response_cache: dict[str, bytes] = {}
+
+# Finished operations never change again, so their encoded responses are kept (LRU)
+FINISHED_OPERATION_CACHE_SIZE = 1024
+FINISHED_STATUSES = (OperationStatus.COMPLETED, OperationStatus.FAILED, OperationStatus.CANCELLED)
+_finished_operation_cache: OrderedDict[UUID, bytes] = OrderedDict()
+
+
+async def _ndjson_lines(header: dict, issues: list) -> AsyncIterator[bytes]:
+    """
+    Yield a validation response as NDJSON: the summary line, then one line per issue.
+    
+    Issues are encoded a batch at a time, so the response is sent while it is
+    being serialised instead of after one large JSON document is built.
+    """
+    yield orjson.dumps(header, option=orjson.OPT_APPEND_NEWLINE)
+    for start in range(0, len(issues), NDJSON_BATCH_SIZE):
+        yield b"".join(
+            orjson.dumps(issue, option=orjson.OPT_APPEND_NEWLINE)
+            for issue in issues[start:start + NDJSON_BATCH_SIZE]
+        )
 
 
 @router.post("/validate/file", response_model=dict)
 async def validate_fedramp_file(
+    request: Request,
     file: UploadFile = File(..., description="OSCAL file to validate against FedRAMP constraints"),
     baseline: Literal["low", "moderate", "high"] = Form("moderate", description="FedRAMP baseline"),
     document_type: Optional[str] = Form(None, description="OSCAL document type (auto-detected if not provided)"),
     store_result: bool = Form(True, description="Whether to store validation results"),
     db: AsyncSession = Depends(get_db_session),
-) -> JSONResponse:
+) -> Response:
     """
     Validate an uploaded OSCAL file against FedRAMP constraints.
     
     Performs FedRAMP-specific validation beyond basic OSCAL schema validation,
     including baseline requirements, control implementation validation, and
-    compliance checking.
+    compliance checking. Clients that accept application/x-ndjson receive the
+    summary on the first line followed by one issue per line.
     """
-    if file.content_type not in ["application/json", "application/xml", "text/xml"]:
-        raise HTTPException(
-            status_code=400,
-            detail="Only JSON and XML OSCAL files are supported"
-        )
+    if file.content_type not in OSCAL_CONTENT_TYPES:
+        # Clients often send JSON as application/octet-stream; trust the bytes instead
+        head = await file.read(SNIFF_BYTES)
+        await file.seek(0)
+        if detect_source_format(head) is None:
+            raise HTTPException(
+                status_code=400,
+                detail="Only JSON and XML OSCAL files are supported"
+            )
+    
+    content = await read_upload(file, get_settings().max_upload_size)
     
+    # The operation is written once, when the outcome is known
     operation = Operation(
+        id=uuid4(),
         operation_type="fedramp_check",
         operation_name=f"FedRAMP {baseline.title()} validation of {file.filename}",
         operation_description=f"FedRAMP constraint validation for {baseline} baseline",
@@ -55,25 +133,18 @@ async def validate_fedramp_file(
             "content_type": file.content_type,
             "baseline": baseline,
             "document_type": document_type,
-            "file_size": file.size if hasattr(file, 'size') else None,
+            "file_size": len(content),
         }
     )
     
-    temp_file = None
+    operation.mark_started()
+    db.add(operation)
     
     try:
-        operation.mark_started()
-        db.add(operation)
-        await db.commit()
-        
-        # Save uploaded file temporarily
-        temp_file = Path(f"/tmp/fedramp_{operation.id}_{file.filename}")
-        content = await file.read()
-        temp_file.write_bytes(content)
-        
-        # Validate with FedRAMP service
-        fedramp_result: FedRAMPValidationResult = await fedramp_service.validate_document(
-            file_path=temp_file,
+        # Validate the upload in a worker process, keeping the event loop free
+        fedramp_result: FedRAMPValidationResult = await fedramp_service.validate_bytes_in_pool(
+            content,
+            file.content_type,
             baseline=baseline,
             document_type=document_type
         )
@@ -106,50 +177,48 @@ async def validate_fedramp_file(
                 "warnings": fedramp_result.warning_count,
                 "validation_time_ms": fedramp_result.validation_time_ms,
             },
-            "issues": [
-                {
-                    "severity": issue.severity,
-                    "code": issue.code,
-                    "message": issue.message,
-                    "location": issue.location,
-                    "requirement": issue.requirement,
-                    "baseline": issue.baseline,
-                    "suggested_fix": issue.suggested_fix,
-                    "context": issue.context,
-                }
-                for issue in fedramp_result.issues
-            ],
+            # orjson serialises the issue dataclasses natively, field for field
+            "issues": fedramp_result.issues,
             "metadata": fedramp_result.metadata,
         }
         
         status_code = 200 if fedramp_result.is_compliant else 400
-        return JSONResponse(status_code=status_code, content=response_data)
+        
+        # Stream large issue lists line by line when the client asks for NDJSON
+        if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+            issues = response_data.pop("issues")
+            return StreamingResponse(
+                _ndjson_lines(response_data, issues),
+                status_code=status_code,
+                media_type=NDJSON_MEDIA_TYPE,
+            )
+        
+        return ORJSONResponse(status_code=status_code, content=response_data)
         
     except Exception as e:
-        operation.mark_failed(str(e), {"exception_type": type(e).__name__})
-        await db.commit()
+        await record_operation_failure(db, operation, str(e), {"exception_type": type(e).__name__})
         
         logger.error("FedRAMP validation failed", operation_id=str(operation.id), error=str(e))
         raise HTTPException(status_code=500, detail=f"FedRAMP validation failed: {str(e)}")
-        
-    finally:
-        # Clean up temp file
-        if temp_file and temp_file.exists():
-            temp_file.unlink(missing_ok=True)
 
 
 @router.get("/baselines/{baseline}/requirements", response_model=dict)
 async def get_baseline_requirements(
     baseline: Literal["low", "moderate", "high"],
-) -> dict:
+) -> Response:
     """
     Get the requirements for a specific FedRAMP baseline.
     
     Returns the control requirements, metadata requirements, and other
-    constraints for the specified baseline.
+    constraints for the specified baseline. The requirements are static, so
+    each baseline's response is encoded once and served from cache.
     """
+    content = _requirements_response_cache.get(baseline)
+    if content is not None:
+        return Response(content=content, media_type="application/json", headers=BASELINE_CACHE_HEADERS)
+    
     try:
-        requirements = await fedramp_service.get_baseline_requirements(baseline)
+        requirements = fedramp_service.get_baseline_requirements(baseline)
         
         if not requirements:
             raise HTTPException(
@@ -157,12 +226,15 @@ async def get_baseline_requirements(
                 detail=f"Requirements not found for baseline: {baseline}"
             )
         
-        return {
+        content = orjson.dumps({
             "baseline": baseline,
             "requirements": requirements,
             "description": f"FedRAMP {baseline.title()} baseline requirements",
             "last_updated": "2024-01-01",  # Would be actual date from requirements
-        }
+        })
+        _requirements_response_cache[baseline] = content
+        
+        return Response(content=content, media_type="application/json", headers=BASELINE_CACHE_HEADERS)
         
     except Exception as e:
         logger.error("Failed to get baseline requirements", baseline=baseline, error=str(e))
@@ -173,35 +245,9 @@ async def get_baseline_requirements(
 
 
 @router.get("/baselines", response_model=dict)
-async def list_baselines() -> dict:
+async def list_baselines() -> Response:
     """List available FedRAMP baselines and their basic information."""
-    return {
-        "baselines": [
-            {
-                "id": "low",
-                "name": "FedRAMP Low",
-                "description": "Low impact systems with basic security controls",
-                "min_controls": 108,
-                "use_cases": ["Public information", "Low-risk applications"],
-            },
-            {
-                "id": "moderate",
-                "name": "FedRAMP Moderate",
-                "description": "Moderate impact systems with comprehensive security controls",
-                "min_controls": 325,
-                "use_cases": ["Sensitive but unclassified information", "Business applications"],
-            },
-            {
-                "id": "high",
-                "name": "FedRAMP High",
-                "description": "High impact systems with extensive security controls",
-                "min_controls": 421,
-                "use_cases": ["Sensitive/classified information", "Critical infrastructure"],
-            },
-        ],
-        "default_baseline": "moderate",
-        "oscal_version": "1.1.3",
-    }
+    return Response(content=_BASELINES_RESPONSE, media_type="application/json", headers=BASELINE_CACHE_HEADERS)
 
 
 @router.post("/validate/batch", response_model=dict)
@@ -210,7 +256,7 @@ async def validate_fedramp_batch(
     baseline: Literal["low", "moderate", "high"] = Form("moderate", description="FedRAMP baseline"),
     store_results: bool = Form(True, description="Whether to store validation results"),
     db: AsyncSession = Depends(get_db_session),
-) -> JSONResponse:
+) -> ORJSONResponse:
     """
     Validate multiple OSCAL files against FedRAMP constraints in batch.
     
@@ -225,6 +271,7 @@ async def validate_fedramp_batch(
     
     # Create parent operation for batch tracking
     parent_operation = Operation(
+        id=uuid4(),
         operation_type="fedramp_check",
         operation_name=f"FedRAMP batch validation of {len(files)} files ({baseline} baseline)",
         operation_description=f"Batch FedRAMP constraint validation for {baseline} baseline",
@@ -235,52 +282,44 @@ async def validate_fedramp_batch(
         }
     )
     parent_operation.mark_started()
-    db.add(parent_operation)
+    
+    # Create every child operation up front so they are inserted together
+    child_operations = []
+    for file in files:
+        child_operation = Operation(
+            id=uuid4(),
+            operation_type="fedramp_check",
+            operation_name=f"FedRAMP validation: {file.filename}",
+            operation_description=f"Batch item: FedRAMP {baseline} validation",
+            parent_operation_id=parent_operation.id,
+            input_data={
+                "filename": file.filename,
+                "baseline": baseline,
+                "batch_item": True,
+            }
+        )
+        child_operation.mark_started()
+        child_operations.append(child_operation)
+    
+    db.add_all([parent_operation, *child_operations])
     await db.commit()
     
     results = []
-    compliant_count = 0
     
     try:
-        import asyncio
-        
-        async def validate_single_file(file: UploadFile) -> dict:
+        async def validate_single_file(file: UploadFile, child_operation: Operation) -> dict:
             """Validate a single file and return result info."""
-            nonlocal compliant_count
-            
-            temp_file = None
-            child_operation = None
-            
             try:
-                # Create child operation
-                child_operation = Operation(
-                    operation_type="fedramp_check",
-                    operation_name=f"FedRAMP validation: {file.filename}",
-                    operation_description=f"Batch item: FedRAMP {baseline} validation",
-                    parent_operation_id=parent_operation.id,
-                    input_data={
-                        "filename": file.filename,
-                        "baseline": baseline,
-                        "batch_item": True,
-                    }
-                )
-                child_operation.mark_started()
-                db.add(child_operation)
-                await db.flush()
+                # Read (capped) before taking a slot so slots are only held for validation
+                content = await read_upload(file, get_settings().max_upload_size)
                 
-                # Save file temporarily
-                temp_file = Path(f"/tmp/fedramp_batch_{child_operation.id}_{file.filename}")
-                content = await file.read()
-                temp_file.write_bytes(content)
-                
-                # Validate with FedRAMP service
-                fedramp_result = await fedramp_service.validate_document(
-                    file_path=temp_file,
-                    baseline=baseline
-                )
-                
-                if fedramp_result.is_compliant:
-                    compliant_count += 1
+                # Validate the upload in a worker process
+                async with validation_slots:
+                    fedramp_result = await fedramp_service.validate_bytes_in_pool(
+                        content,
+                        file.content_type,
+                        baseline=baseline
+                    )
                 
                 child_operation.mark_completed({
                     "is_compliant": fedramp_result.is_compliant,
@@ -312,30 +351,18 @@ async def validate_fedramp_batch(
                 }
                 
             except Exception as e:
-                if child_operation:
-                    child_operation.mark_failed(str(e))
+                child_operation.mark_failed(str(e))
                 
                 return {
-                    "operation_id": str(child_operation.id) if child_operation else None,
+                    "operation_id": str(child_operation.id),
                     "filename": file.filename,
                     "is_compliant": False,
                     "error": str(e),
                 }
-                
-            finally:
-                # Clean up temp file
-                if temp_file and temp_file.exists():
-                    temp_file.unlink(missing_ok=True)
-        
-        # Process files with limited concurrency (FedRAMP validation is more intensive)
-        semaphore = asyncio.Semaphore(3)  # Process 3 files at a time
-        
-        async def validate_with_semaphore(file):
-            async with semaphore:
-                return await validate_single_file(file)
         
+        # validation_slots bounds how many validations run at once across requests
         results = await asyncio.gather(
-            *[validate_with_semaphore(file) for file in files],
+            *[validate_single_file(file, child) for file, child in zip(files, child_operations)],
             return_exceptions=True
         )
         
@@ -348,7 +375,8 @@ async def validate_fedramp_batch(
                     "error": str(result),
                 }
         
-        # Complete parent operation
+        # Complete parent operation; the commit also flushes every child's status
+        compliant_count = sum(1 for result in results if result.get("is_compliant"))
         parent_operation.mark_completed({
             "total_files": len(files),
             "compliant_files": compliant_count,
@@ -358,7 +386,7 @@ async def validate_fedramp_batch(
         
         await db.commit()
         
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=200,
             content={
                 "batch_operation_id": str(parent_operation.id),
@@ -384,21 +412,24 @@ async def validate_fedramp_batch(
 async def get_fedramp_operation(
     operation_id: UUID,
     db: AsyncSession = Depends(get_db_session),
-) -> dict:
-    """Get details of a FedRAMP validation operation."""
-    from sqlalchemy import select
+) -> Response:
+    """
+    Get details of a FedRAMP validation operation.
     
-    query = select(Operation).where(
-        Operation.id == operation_id,
-        Operation.operation_type == "fedramp_check"
-    )
-    result = await db.execute(query)
-    operation = result.scalar_one_or_none()
+    Status polling hits this often, so the row is loaded by primary key and
+    responses for finished operations are served from an in-process cache.
+    """
+    content = _finished_operation_cache.get(operation_id)
+    if content is not None:
+        _finished_operation_cache.move_to_end(operation_id)
+        return Response(content=content, media_type="application/json")
     
-    if not operation:
+    operation = await db.get(Operation, operation_id)
+    
+    if operation is None or operation.operation_type != "fedramp_check":
         raise HTTPException(status_code=404, detail="FedRAMP validation operation not found")
     
-    return {
+    content = orjson.dumps({
         "operation_id": str(operation.id),
         "operation_name": operation.operation_name,
         "operation_description": operation.operation_description,
@@ -412,7 +443,14 @@ async def get_fedramp_operation(
         "error_message": operation.error_message,
         "created_at": operation.created_at.isoformat(),
         "updated_at": operation.updated_at.isoformat(),
-    }
+    })
+    
+    if operation.status in FINISHED_STATUSES:
+        _finished_operation_cache[operation_id] = content
+        if len(_finished_operation_cache) > FINISHED_OPERATION_CACHE_SIZE:
+            _finished_operation_cache.popitem(last=False)
+    
+    return Response(content=content, media_type="application/json")
 
 
 @router.get("/controls", response_model=dict)
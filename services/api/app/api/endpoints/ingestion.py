@@ -5,27 +5,129 @@ Provides endpoints for ingesting legacy document formats and converting
 them to OSCAL structures, particularly for SSP generation.
 """
 
-import json
+import asyncio
+import os
+import tempfile
+from collections import OrderedDict
 from pathlib import Path
 from typing import Literal, Optional
-from uuid import UUID
+from uuid import UUID, uuid4
 
+import aiofiles
+import orjson
 import structlog
 from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import get_settings
 from app.core.database import get_db_session
+from app.core.operation_tracking import record_operation_failure, start_operation
+from app.core.uploads import UPLOAD_CHUNK_SIZE
 from app.models import Operation
+from app.models.operation import OperationStatus
 from app.services.ingestion_service import DocumentIngestionService, IngestionResult
-from app.services.storage_service import StorageService
+from app.services.storage_service import get_storage_service
 
 logger = structlog.get_logger()
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# Finished operations never change again, so their encoded responses are kept (LRU)
+FINISHED_OPERATION_CACHE_SIZE = 1024
+FINISHED_STATUSES = (OperationStatus.COMPLETED, OperationStatus.FAILED, OperationStatus.CANCELLED)
+_finished_operation_cache: OrderedDict[UUID, bytes] = OrderedDict()
 
 # Service instances
 ingestion_service = DocumentIngestionService()
-storage_service = StorageService()
+storage_service = get_storage_service()
+
+# Static format catalogue, encoded once at import
+_SUPPORTED_FORMATS_RESPONSE = orjson.dumps({
+    "supported_input_formats": [
+        {
+            "format": "docx",
+            "description": "Microsoft Word Document (Office Open XML)",
+            "supported_content_types": [
+                "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+            ],
+            "typical_use_cases": [
+                "Legacy SSP documents",
+                "Control implementation matrices",
+                "System documentation"
+            ],
+            "extraction_capabilities": [
+                "Text content and structure",
+                "Tables and structured data", 
+                "Section identification",
+                "Control pattern recognition"
+            ]
+        }
+    ],
+    "supported_output_formats": [
+        {
+            "format": "ssp",
+            "description": "OSCAL System Security Plan",
+            "version": "1.1.3",
+            "file_extension": ".json",
+            "content_type": "application/json"
+        }
+    ],
+    "future_formats": [
+        {
+            "format": "pdf",
+            "status": "planned",
+            "description": "PDF document extraction (OCR-based)"
+        },
+        {
+            "format": "xlsx", 
+            "status": "planned",
+            "description": "Excel spreadsheet control matrices"
+        }
+    ]
+})
+
+
+def _create_temp_docx(prefix: str) -> Path:
+    """
+    Create an empty temporary DOCX file for an upload.
+    
+    The name is generated by ``mkstemp`` rather than derived from the
+    client-supplied filename. Files go to the configured ingestion spool
+    directory (tmpfs by default), falling back to the system temp directory
+    if it is unavailable.
+    
+    Args:
+        prefix: Prefix for the generated file name
+        
+    Returns:
+        Path to the temporary file; the caller is responsible for removing it
+    """
+    try:
+        fd, path = tempfile.mkstemp(prefix=prefix, suffix=".docx", dir=get_settings().ingest_tmpdir)
+    except OSError as e:
+        logger.warning("Ingestion spool directory unavailable", error=str(e))
+        fd, path = tempfile.mkstemp(prefix=prefix, suffix=".docx")
+    os.close(fd)
+    return Path(path)
+
+
+async def _save_upload(file: UploadFile, destination: Path) -> int:
+    """
+    Stream an upload to disk chunk by chunk.
+    
+    Args:
+        file: Uploaded file to save
+        destination: Path the upload is written to
+        
+    Returns:
+        Number of bytes written
+    """
+    size_bytes = 0
+    async with aiofiles.open(destination, "wb") as f:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            size_bytes += len(chunk)
+            await f.write(chunk)
+    return size_bytes
 
 
 @router.post("/docx", response_model=dict)
@@ -37,7 +139,7 @@ async def ingest_docx_file(
     store_result: bool = Form(True, description="Whether to store the generated OSCAL document"),
     validate_output: bool = Form(True, description="Whether to validate the generated OSCAL document"),
     db: AsyncSession = Depends(get_db_session),
-) -> JSONResponse:
+) -> ORJSONResponse:
     """
     Ingest a DOCX file and convert it to OSCAL format.
     
@@ -51,6 +153,7 @@ async def ingest_docx_file(
         )
     
     operation = Operation(
+        id=uuid4(),
         operation_type="ingestion",
         operation_name=f"Ingest {file.filename} to OSCAL {target_document_type.upper()}",
         operation_description=f"Document ingestion: DOCX to OSCAL {target_document_type}",
@@ -63,24 +166,23 @@ async def ingest_docx_file(
         }
     )
     
+    # Format the id once; the hex form names the temp file
+    operation_id = str(operation.id)
     temp_file = None
     
     try:
-        operation.mark_started()
-        db.add(operation)
-        await db.commit()
+        await start_operation(db, operation)
         
         # Save uploaded file temporarily
-        temp_file = Path(f"/tmp/ingestion_{operation.id}_{file.filename}")
-        content = await file.read()
-        temp_file.write_bytes(content)
+        temp_file = await asyncio.to_thread(_create_temp_docx, f"ingestion_{operation.id.hex}_")
+        await _save_upload(file, temp_file)
         
-        # Ingest document
+        # Ingest document; the temp file name is random, so title from the upload name
         ingestion_result: IngestionResult = await ingestion_service.ingest_docx(
             file_path=temp_file,
             target_document_type=target_document_type,
             system_id=system_id,
-            document_title=document_title
+            document_title=document_title or Path(file.filename).stem.replace('_', ' ').replace('-', ' ').title()
         )
         
         if not ingestion_result.success:
@@ -98,41 +200,51 @@ async def ingest_docx_file(
                 detail={
                     "message": "Document ingestion failed",
                     "issues": ingestion_result.issues,
-                    "operation_id": str(operation.id)
+                    "operation_id": operation_id
                 }
             )
         
-        # Validate generated OSCAL document if requested
-        validation_result = None
+        # Validation and upload are independent, so run them concurrently
+        validation_task = None
         if validate_output and ingestion_result.oscal_document:
-            validation_result = await ingestion_service.validate_ingested_document(
+            validation_task = ingestion_service.validate_ingested_document(
                 ingestion_result.oscal_document
             )
         
-        # Store generated OSCAL document if requested
-        storage_info = None
+        storage_task = None
         if store_result and ingestion_result.oscal_document:
-            # Convert OSCAL document to JSON and store
-            oscal_json = json.dumps(ingestion_result.oscal_document, indent=2)
-            temp_oscal_file = Path(f"/tmp/generated_oscal_{operation.id}.json")
-            temp_oscal_file.write_text(oscal_json, encoding='utf-8')
-            
-            storage_info = await storage_service.store_artifact(
-                file_path=temp_oscal_file,
+            # Store the OSCAL document as minified JSON straight from memory
+            storage_task = storage_service.store_artifact_bytes(
+                orjson.dumps(ingestion_result.oscal_document, option=orjson.OPT_NON_STR_KEYS),
                 artifact_type="ingested_oscal",
                 original_filename=f"{Path(file.filename).stem}.json",
                 metadata={
                     "source_document": file.filename,
                     "target_document_type": target_document_type,
                     "system_id": system_id,
-                    "ingestion_operation_id": str(operation.id),
+                    "ingestion_operation_id": operation_id,
                     "generated_from": "docx_ingestion",
                     **ingestion_result.metadata
-                }
+                },
+                reference_session=db
             )
-            
-            # Clean up temp OSCAL file
-            temp_oscal_file.unlink(missing_ok=True)
+        
+        validation_result = None
+        storage_info = None
+        if validation_task and storage_task:
+            validation_result, storage_info = await asyncio.gather(validation_task, storage_task)
+        elif validation_task:
+            validation_result = await validation_task
+        elif storage_task:
+            storage_info = await storage_task
+        
+        # Statistics are reported in both the operation record and the response
+        extracted = ingestion_result.extracted_content
+        controls_count = len(extracted.get("controls_identified", ()))
+        sections_count = len(extracted.get("potential_ssp_sections", ()))
+        paragraphs_count = extracted.get("total_paragraphs", 0)
+        tables_count = extracted.get("total_tables", 0)
+        storage_data = storage_info.dict() if storage_info else None
         
         # Complete operation
         output_data = {
@@ -140,13 +252,13 @@ async def ingest_docx_file(
             "target_document_type": target_document_type,
             "processing_time_ms": ingestion_result.processing_time_ms,
             "extracted_metadata": ingestion_result.metadata,
-            "storage_info": storage_info.dict() if storage_info else None,
+            "storage_info": storage_data,
             "validation_result": validation_result,
             "document_statistics": {
-                "controls_identified": len(ingestion_result.extracted_content.get("controls_identified", [])),
-                "sections_identified": len(ingestion_result.extracted_content.get("potential_ssp_sections", [])),
-                "paragraphs_processed": ingestion_result.extracted_content.get("total_paragraphs", 0),
-                "tables_processed": ingestion_result.extracted_content.get("total_tables", 0),
+                "controls_identified": controls_count,
+                "sections_identified": sections_count,
+                "paragraphs_processed": paragraphs_count,
+                "tables_processed": tables_count,
             }
         }
         operation.mark_completed(output_data)
@@ -154,44 +266,43 @@ async def ingest_docx_file(
         
         # Prepare response
         response_data = {
-            "operation_id": str(operation.id),
+            "operation_id": operation_id,
             "success": True,
             "message": f"Successfully ingested {file.filename} to OSCAL {target_document_type.upper()}",
             "target_document_type": target_document_type,
             "processing_summary": {
                 "processing_time_ms": ingestion_result.processing_time_ms,
-                "controls_identified": len(ingestion_result.extracted_content.get("controls_identified", [])),
-                "sections_mapped": len(ingestion_result.extracted_content.get("potential_ssp_sections", [])),
-                "paragraphs_processed": ingestion_result.extracted_content.get("total_paragraphs", 0),
-                "tables_processed": ingestion_result.extracted_content.get("total_tables", 0),
+                "controls_identified": controls_count,
+                "sections_mapped": sections_count,
+                "paragraphs_processed": paragraphs_count,
+                "tables_processed": tables_count,
                 "detected_document_type": ingestion_result.metadata.get("detected_document_type"),
             },
             "oscal_document": ingestion_result.oscal_document if not store_result else None,
-            "storage": storage_info.dict() if storage_info else None,
+            "storage": storage_data,
             "validation": validation_result,
-            "download_url": f"/api/v1/ingestion/operations/{operation.id}/download" if store_result else None,
+            "download_url": f"/api/v1/ingestion/operations/{operation_id}/download" if store_result else None,
         }
         
-        return JSONResponse(status_code=200, content=response_data)
+        return ORJSONResponse(status_code=200, content=response_data)
         
     except Exception as e:
-        operation.mark_failed(str(e), {"exception_type": type(e).__name__})
-        await db.commit()
+        await record_operation_failure(db, operation, str(e), {"exception_type": type(e).__name__})
         
-        logger.error("Document ingestion failed", operation_id=str(operation.id), error=str(e))
+        logger.error("Document ingestion failed", operation_id=operation_id, error=str(e))
         raise HTTPException(status_code=500, detail=f"Ingestion failed: {str(e)}")
         
     finally:
         # Clean up temp file
-        if temp_file and temp_file.exists():
-            temp_file.unlink(missing_ok=True)
+        if temp_file:
+            await asyncio.to_thread(temp_file.unlink, missing_ok=True)
 
 
 @router.post("/analyze", response_model=dict)
 async def analyze_document_structure(
     file: UploadFile = File(..., description="Document to analyze"),
     db: AsyncSession = Depends(get_db_session),
-) -> JSONResponse:
+) -> ORJSONResponse:
     """
     Analyze the structure of a document without full ingestion.
     
@@ -205,6 +316,7 @@ async def analyze_document_structure(
         )
     
     operation = Operation(
+        id=uuid4(),
         operation_type="ingestion",
         operation_name=f"Analyze structure of {file.filename}",
         operation_description="Document structure analysis for ingestion planning",
@@ -215,23 +327,29 @@ async def analyze_document_structure(
         }
     )
     
-    temp_file = None
-    
     try:
-        operation.mark_started()
-        db.add(operation)
-        await db.commit()
+        await start_operation(db, operation)
         
-        # Save uploaded file temporarily
-        temp_file = Path(f"/tmp/analysis_{operation.id}_{file.filename}")
-        content = await file.read()
-        temp_file.write_bytes(content)
+        # Analyze structure in one streaming pass straight from the spooled upload;
+        # no temp file or full python-docx load is needed for analysis
+        await file.seek(0)
+        structure = await asyncio.to_thread(
+            ingestion_service.mapper.analyzer.analyze_docx_streaming, file.file
+        )
         
-        # Load document and analyze structure
-        from docx import Document
-        doc = Document(temp_file)
+        # Bind the statistics used throughout the assessment and response once
+        controls = structure.get("controls_identified", [])
+        sections = structure.get("potential_ssp_sections", [])
+        controls_count = len(controls)
+        tables_count = structure.get("total_tables", 0)
         
-        structure = ingestion_service.mapper.analyzer.analyze_document_structure(doc)
+        potential_issues = []
+        if controls_count < 5:
+            potential_issues.append("Low control density")
+        if not sections:
+            potential_issues.append("No clear sections identified")
+        if tables_count > 20:
+            potential_issues.append("Complex table structure")
         
         # Complete operation
         output_data = {
@@ -239,23 +357,16 @@ async def analyze_document_structure(
             "document_statistics": structure,
             "suitability_assessment": {
                 "recommended_target_type": structure.get("document_type", "ssp"),
-                "confidence_score": len(structure.get("controls_identified", [])) / 50.0,  # Simple scoring
-                "ingestion_feasibility": "high" if len(structure.get("controls_identified", [])) > 5 else "medium",
-                "potential_issues": [
-                    "Low control density" if len(structure.get("controls_identified", [])) < 5 else None,
-                    "No clear sections identified" if not structure.get("potential_ssp_sections") else None,
-                    "Complex table structure" if structure.get("total_tables", 0) > 20 else None
-                ]
+                "confidence_score": controls_count / 50.0,  # Simple scoring
+                "ingestion_feasibility": "high" if controls_count > 5 else "medium",
+                "potential_issues": potential_issues
             }
         }
-        output_data["suitability_assessment"]["potential_issues"] = [
-            issue for issue in output_data["suitability_assessment"]["potential_issues"] if issue
-        ]
         
         operation.mark_completed(output_data)
         await db.commit()
         
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=200,
             content={
                 "operation_id": str(operation.id),
@@ -263,17 +374,17 @@ async def analyze_document_structure(
                 "analysis_results": {
                     "document_type_detected": structure.get("document_type", "unknown"),
                     "total_paragraphs": structure.get("total_paragraphs", 0),
-                    "total_tables": structure.get("total_tables", 0),
+                    "total_tables": tables_count,
                     "headings_found": len(structure.get("headings", [])),
-                    "controls_identified": len(structure.get("controls_identified", [])),
-                    "ssp_sections_identified": len(structure.get("potential_ssp_sections", [])),
+                    "controls_identified": controls_count,
+                    "ssp_sections_identified": len(sections),
                 },
                 "identified_controls": [
                     {
                         "control_id": ctrl["control_id"],
                         "control_title": ctrl["control_title"]
                     }
-                    for ctrl in structure.get("controls_identified", [])[:20]  # Limit to first 20
+                    for ctrl in controls[:20]  # Limit to first 20
                 ],
                 "identified_sections": [
                     {
@@ -281,33 +392,27 @@ async def analyze_document_structure(
                         "oscal_path": section["oscal_path"],
                         "confidence": section["confidence"]
                     }
-                    for section in structure.get("potential_ssp_sections", [])
+                    for section in sections
                 ],
                 "suitability_assessment": output_data["suitability_assessment"],
                 "recommendations": {
-                    "proceed_with_ingestion": len(structure.get("controls_identified", [])) > 3,
+                    "proceed_with_ingestion": controls_count > 3,
                     "recommended_target_type": structure.get("document_type", "ssp"),
-                    "manual_review_recommended": len(structure.get("controls_identified", [])) < 5,
+                    "manual_review_recommended": controls_count < 5,
                     "preprocessing_suggestions": [
-                        "Consider manual cleanup of table formatting" if structure.get("total_tables", 0) > 10 else None,
-                        "Review control identification accuracy" if len(structure.get("controls_identified", [])) < 10 else None,
-                        "Verify section mapping" if not structure.get("potential_ssp_sections") else None,
+                        "Consider manual cleanup of table formatting" if tables_count > 10 else None,
+                        "Review control identification accuracy" if controls_count < 10 else None,
+                        "Verify section mapping" if not sections else None,
                     ]
                 }
             }
         )
         
     except Exception as e:
-        operation.mark_failed(str(e), {"exception_type": type(e).__name__})
-        await db.commit()
+        await record_operation_failure(db, operation, str(e), {"exception_type": type(e).__name__})
         
         logger.error("Document analysis failed", operation_id=str(operation.id), error=str(e))
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
-        
-    finally:
-        # Clean up temp file
-        if temp_file and temp_file.exists():
-            temp_file.unlink(missing_ok=True)
 
 
 @router.get("/operations/{operation_id}/download")
@@ -318,23 +423,22 @@ async def download_ingested_document(
     """Download the OSCAL document generated from an ingestion operation."""
     from sqlalchemy import select
     
-    # Get the operation
-    query = select(Operation).where(
+    # Only the storage reference is needed, so fetch it without loading the whole row
+    query = select(Operation.output_data["storage_info"]).where(
         Operation.id == operation_id,
         Operation.operation_type == "ingestion",
         Operation.status == "completed"
     )
     result = await db.execute(query)
-    operation = result.scalar_one_or_none()
+    row = result.first()
     
-    if not operation:
+    if row is None:
         raise HTTPException(
             status_code=404,
             detail="Ingestion operation not found or not completed"
         )
     
-    output_data = operation.output_data
-    storage_info = output_data.get("storage_info") if output_data else None
+    storage_info = row[0]
     
     if not storage_info:
         raise HTTPException(
@@ -362,21 +466,46 @@ async def download_ingested_document(
 async def get_ingestion_operation(
     operation_id: UUID,
     db: AsyncSession = Depends(get_db_session),
-) -> dict:
-    """Get details of an ingestion operation."""
+) -> Response:
+    """
+    Get details of an ingestion operation.
+    
+    Clients poll this until the operation finishes, so responses for
+    finished operations are served from an in-process cache.
+    """
     from sqlalchemy import select
     
-    query = select(Operation).where(
+    content = _finished_operation_cache.get(operation_id)
+    if content is not None:
+        _finished_operation_cache.move_to_end(operation_id)
+        return Response(content=content, media_type="application/json")
+    
+    # Project just the returned columns rather than materialising the full row
+    query = select(
+        Operation.id,
+        Operation.operation_name,
+        Operation.operation_description,
+        Operation.status,
+        Operation.progress_percent,
+        Operation.started_at,
+        Operation.completed_at,
+        Operation.duration_ms,
+        Operation.input_data,
+        Operation.output_data,
+        Operation.error_message,
+        Operation.created_at,
+        Operation.updated_at,
+    ).where(
         Operation.id == operation_id,
         Operation.operation_type == "ingestion"
     )
     result = await db.execute(query)
-    operation = result.scalar_one_or_none()
+    operation = result.one_or_none()
     
     if not operation:
         raise HTTPException(status_code=404, detail="Ingestion operation not found")
     
-    return {
+    content = orjson.dumps({
         "operation_id": str(operation.id),
         "operation_name": operation.operation_name,
         "operation_description": operation.operation_description,
@@ -390,52 +519,17 @@ async def get_ingestion_operation(
         "error_message": operation.error_message,
         "created_at": operation.created_at.isoformat(),
         "updated_at": operation.updated_at.isoformat(),
-    }
+    })
+    
+    if operation.status in FINISHED_STATUSES:
+        _finished_operation_cache[operation_id] = content
+        if len(_finished_operation_cache) > FINISHED_OPERATION_CACHE_SIZE:
+            _finished_operation_cache.popitem(last=False)
+    
+    return Response(content=content, media_type="application/json")
 
 
 @router.get("/supported-formats", response_model=dict)
-async def get_supported_formats() -> dict:
+async def get_supported_formats() -> Response:
     """Get information about supported document formats for ingestion."""
-    return {
-        "supported_input_formats": [
-            {
-                "format": "docx",
-                "description": "Microsoft Word Document (Office Open XML)",
-                "supported_content_types": [
-                    "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                ],
-                "typical_use_cases": [
-                    "Legacy SSP documents",
-                    "Control implementation matrices",
-                    "System documentation"
-                ],
-                "extraction_capabilities": [
-                    "Text content and structure",
-                    "Tables and structured data", 
-                    "Section identification",
-                    "Control pattern recognition"
-                ]
-            }
-        ],
-        "supported_output_formats": [
-            {
-                "format": "ssp",
-                "description": "OSCAL System Security Plan",
-                "version": "1.1.3",
-                "file_extension": ".json",
-                "content_type": "application/json"
-            }
-        ],
-        "future_formats": [
-            {
-                "format": "pdf",
-                "status": "planned",
-                "description": "PDF document extraction (OCR-based)"
-            },
-            {
-                "format": "xlsx", 
-                "status": "planned",
-                "description": "Excel spreadsheet control matrices"
-            }
-        ]
-    }
\ No newline at end of file
+    return Response(content=_SUPPORTED_FORMATS_RESPONSE, media_type="application/json")
@@ -5,37 +5,155 @@ Provides endpoints for tracking long-running operations, monitoring their progre
 and retrieving operational logs and metrics.
 """
 
-from typing import List, Optional
+import asyncio
+import base64
+import binascii
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from itertools import islice
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from uuid import UUID
 from datetime import datetime, timezone, timedelta
 
 import structlog
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ConfigDict, TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, desc, and_, or_
-from sqlalchemy.orm import selectinload
+from sqlalchemy import Integer, and_, bindparam, cast, desc, func, literal, or_, select, tuple_, update
+from sqlalchemy.orm import raiseload, selectinload
 
 from app.core.database import get_db_session
 from app.models import Operation, OperationLog
+from app.models.operation import ACTIVE_STATUSES, OperationStatus, OperationType
 
 logger = structlog.get_logger()
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# Recently computed summaries per timeframe: (expires_at, response)
+SUMMARY_CACHE_TTL_SECONDS = 10
+SUMMARY_CACHE_SIZE = 32
+_summary_cache: OrderedDict[int, Tuple[float, dict]] = OrderedDict()
+# Refresh locks per timeframe as [lock, users]; entries are dropped once unused
+_summary_locks: Dict[int, list] = {}
+
+
+class OperationOut(BaseModel):
+    """Operation fields returned by listings."""
+    
+    model_config = ConfigDict(from_attributes=True)
+    
+    id: UUID
+    operation_type: OperationType
+    operation_name: str
+    operation_description: Optional[str]
+    status: OperationStatus
+    progress_percent: int
+    started_at: Optional[datetime]
+    completed_at: Optional[datetime]
+    duration_ms: Optional[int]
+    error_message: Optional[str]
+    retry_count: int
+    user_id: Optional[str]
+    session_id: Optional[str]
+    correlation_id: Optional[str]
+    parent_operation_id: Optional[UUID]
+    created_at: datetime
+    updated_at: datetime
+
+
+class OperationDetailOut(OperationOut):
+    """Full operation record returned by the detail endpoint."""
+    
+    input_data: Optional[Any]
+    output_data: Optional[Any]
+    error_details: Optional[Any]
+    max_retries: int
+    cpu_time_ms: Optional[int]
+    memory_peak_bytes: Optional[int]
+
+
+class ChildOperationOut(BaseModel):
+    """Summary of a child operation."""
+    
+    model_config = ConfigDict(from_attributes=True)
+    
+    id: UUID
+    operation_type: OperationType
+    operation_name: str
+    status: OperationStatus
+    progress_percent: int
+    duration_ms: Optional[int]
+    error_message: Optional[str]
+    created_at: datetime
+    completed_at: Optional[datetime]
+
+
+class OperationLogOut(BaseModel):
+    """Operation log entry."""
+    
+    model_config = ConfigDict(from_attributes=True)
+    
+    id: UUID
+    level: str
+    message: str
+    details: Optional[Any]
+    component: Optional[str]
+    created_at: datetime
+
+
+# Whole pages are converted from ORM rows in a single pydantic-core call
+_operation_list = TypeAdapter(List[OperationOut])
+_child_operation_list = TypeAdapter(List[ChildOperationOut])
+_operation_log_list = TypeAdapter(List[OperationLogOut])
+
+
+def _dump_rows(adapter: TypeAdapter, rows) -> list:
+    """Convert ORM objects to plain values for orjson via a list adapter."""
+    return adapter.dump_python(adapter.validate_python(rows, from_attributes=True))
+
+
+def _encode_cursor(created_at: datetime, row_id: UUID) -> str:
+    """Encode the position of the last row on a page as an opaque cursor."""
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{row_id}".encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """
+    Decode a cursor produced by ``_encode_cursor``.
+    
+    Raises:
+        HTTPException: If the cursor is malformed
+    """
+    try:
+        created_at, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), UUID(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
 
 
 @router.get("/", response_model=dict)
 async def list_operations(
     limit: int = Query(50, description="Maximum number of operations to return"),
-    offset: int = Query(0, description="Number of operations to skip"),
+    offset: int = Query(0, description="Number of operations to skip (ignored when a cursor is given)"),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's next_cursor"),
     operation_type: Optional[str] = Query(None, description="Filter by operation type"),
     status: Optional[str] = Query(None, description="Filter by operation status"),
     user_id: Optional[str] = Query(None, description="Filter by user ID"),
     since: Optional[datetime] = Query(None, description="Filter operations since this timestamp"),
     db: AsyncSession = Depends(get_db_session),
-) -> dict:
-    """List operations with optional filtering and pagination."""
+) -> ORJSONResponse:
+    """
+    List operations with optional filtering and pagination.
     
-    query = select(Operation).order_by(desc(Operation.created_at))
-    count_query = select(func.count(Operation.id))
+    Pass the returned ``next_cursor`` back as ``cursor`` to page through
+    results by keyset, which costs the same at any depth; offset paging is
+    kept for existing clients.
+    """
+    
+    query = select(Operation).order_by(desc(Operation.created_at), desc(Operation.id))
+    count_query = select(func.count()).select_from(Operation)
     
     # Apply filters
     filters = []
@@ -56,131 +174,99 @@ async def list_operations(
         query = query.where(and_(*filters))
         count_query = count_query.where(and_(*filters))
     
-    # Get total count
-    total_count = (await db.execute(count_query)).scalar()
-    
-    # Apply pagination
-    query = query.offset(offset).limit(limit)
-    result = await db.execute(query)
-    operations = result.scalars().all()
-    
-    return {
-        "operations": [
-            {
-                "id": str(op.id),
-                "operation_type": op.operation_type,
-                "operation_name": op.operation_name,
-                "operation_description": op.operation_description,
-                "status": op.status,
-                "progress_percent": op.progress_percent,
-                "started_at": op.started_at.isoformat() if op.started_at else None,
-                "completed_at": op.completed_at.isoformat() if op.completed_at else None,
-                "duration_ms": op.duration_ms,
-                "error_message": op.error_message,
-                "retry_count": op.retry_count,
-                "user_id": op.user_id,
-                "session_id": op.session_id,
-                "correlation_id": op.correlation_id,
-                "parent_operation_id": str(op.parent_operation_id) if op.parent_operation_id else None,
-                "created_at": op.created_at.isoformat(),
-                "updated_at": op.updated_at.isoformat(),
-            }
-            for op in operations
-        ],
-        "pagination": {
+    if cursor:
+        # Keyset pagination: no total, and one extra row tells us whether more follow
+        query = query.where(
+            tuple_(Operation.created_at, Operation.id) < _decode_cursor(cursor)
+        ).limit(limit + 1)
+        rows = (await db.execute(query)).all()
+        has_more = len(rows) > limit
+        pagination = {"cursor": cursor, "limit": limit, "has_more": has_more}
+    else:
+        # The total rides along with the page as a window aggregate
+        query = query.add_columns(func.count().over().label("total")).offset(offset).limit(limit)
+        rows = (await db.execute(query)).all()
+        if rows:
+            total_count = rows[0].total
+        elif offset:
+            # Past the end, so no row carried the total
+            total_count = (await db.execute(count_query)).scalar()
+        else:
+            total_count = 0
+        has_more = (offset + limit) < total_count
+        pagination = {
             "total": total_count,
             "offset": offset,
             "limit": limit,
-            "has_more": (offset + limit) < total_count,
-        },
+            "has_more": has_more,
+        }
+    
+    # Rows are serialised straight from the result; the extra keyset row is skipped
+    page = islice(rows, limit)
+    last = rows[min(len(rows), limit) - 1][0] if rows else None
+    pagination["next_cursor"] = _encode_cursor(last.created_at, last.id) if last and has_more else None
+    
+    return ORJSONResponse(content={
+        "operations": _dump_rows(_operation_list, [op for op, *_ in page]),
+        "pagination": pagination,
         "filters": {
             "operation_type": operation_type,
             "status": status,
             "user_id": user_id,
-            "since": since.isoformat() if since else None,
+            "since": since,
         }
-    }
+    })
 
 
 @router.get("/{operation_id}", response_model=dict)
 async def get_operation(
     operation_id: UUID,
-    include_logs: bool = Query(True, description="Include operation logs"),
+    include_logs: bool = Query(False, description="Include operation logs"),
+    log_limit: int = Query(100, ge=1, le=1000, description="Maximum number of most recent logs to include"),
     include_children: bool = Query(False, description="Include child operations"),
     db: AsyncSession = Depends(get_db_session),
-) -> dict:
-    """Get detailed operation information."""
+) -> ORJSONResponse:
+    """
+    Get detailed operation information.
     
-    query = select(Operation).where(Operation.id == operation_id)
+    Logs are opt-in and capped at the ``log_limit`` most recent entries;
+    ``logs_truncated`` reports whether older entries were left out. Use
+    ``/{operation_id}/logs`` to page through the full log.
+    """
     
-    if include_logs:
-        query = query.options(selectinload(Operation.logs))
+    # Relationships are loaded explicitly; anything else raises rather than lazy loading
+    query = select(Operation).where(Operation.id == operation_id).options(raiseload("*"))
     
     if include_children:
+        # A second collection join would multiply rows, so children keep their own IN query
         query = query.options(selectinload(Operation.child_operations))
     
     result = await db.execute(query)
-    operation = result.scalar_one_or_none()
+    operation = result.unique().scalar_one_or_none()
     
     if not operation:
         raise HTTPException(status_code=404, detail="Operation not found")
     
-    response_data = {
-        "id": str(operation.id),
-        "operation_type": operation.operation_type,
-        "operation_name": operation.operation_name,
-        "operation_description": operation.operation_description,
-        "status": operation.status,
-        "progress_percent": operation.progress_percent,
-        "started_at": operation.started_at.isoformat() if operation.started_at else None,
-        "completed_at": operation.completed_at.isoformat() if operation.completed_at else None,
-        "duration_ms": operation.duration_ms,
-        "input_data": operation.input_data,
-        "output_data": operation.output_data,
-        "error_message": operation.error_message,
-        "error_details": operation.error_details,
-        "retry_count": operation.retry_count,
-        "max_retries": operation.max_retries,
-        "correlation_id": operation.correlation_id,
-        "parent_operation_id": str(operation.parent_operation_id) if operation.parent_operation_id else None,
-        "user_id": operation.user_id,
-        "session_id": operation.session_id,
-        "cpu_time_ms": operation.cpu_time_ms,
-        "memory_peak_bytes": operation.memory_peak_bytes,
-        "created_at": operation.created_at.isoformat(),
-        "updated_at": operation.updated_at.isoformat(),
-    }
+    response_data = OperationDetailOut.model_validate(operation).model_dump()
     
-    if include_logs and operation.logs:
-        response_data["logs"] = [
-            {
-                "id": str(log.id),
-                "level": log.level,
-                "message": log.message,
-                "details": log.details,
-                "component": log.component,
-                "created_at": log.created_at.isoformat(),
-            }
-            for log in operation.logs
-        ]
+    if include_logs:
+        # Newest entries first so the bound keeps the most recent ones, walking
+        # the (operation_id, created_at, id) index; one extra row flags truncation
+        log_result = await db.execute(
+            select(OperationLog)
+            .where(OperationLog.operation_id == operation_id)
+            .order_by(desc(OperationLog.created_at), desc(OperationLog.id))
+            .limit(log_limit + 1)
+        )
+        logs = log_result.scalars().all()
+        if logs:
+            response_data["logs"] = _dump_rows(_operation_log_list, logs[log_limit - 1::-1])
+            response_data["logs_truncated"] = len(logs) > log_limit
     
     if include_children and operation.child_operations:
-        response_data["child_operations"] = [
-            {
-                "id": str(child.id),
-                "operation_type": child.operation_type,
-                "operation_name": child.operation_name,
-                "status": child.status,
-                "progress_percent": child.progress_percent,
-                "duration_ms": child.duration_ms,
-                "error_message": child.error_message,
-                "created_at": child.created_at.isoformat(),
-                "completed_at": child.completed_at.isoformat() if child.completed_at else None,
-            }
-            for child in operation.child_operations
-        ]
+        response_data["child_operations"] = _dump_rows(_child_operation_list, operation.child_operations)
     
-    return response_data
+    return ORJSONResponse(content=response_data)
 
 
 @router.post("/{operation_id}/cancel", response_model=dict)
@@ -189,41 +275,55 @@ async def cancel_operation(
     reason: Optional[str] = Query(None, description="Reason for cancellation"),
     db: AsyncSession = Depends(get_db_session),
 ) -> dict:
-    """Cancel a running operation."""
-    
-    query = select(Operation).where(Operation.id == operation_id)
-    result = await db.execute(query)
-    operation = result.scalar_one_or_none()
-    
-    if not operation:
-        raise HTTPException(status_code=404, detail="Operation not found")
+    """
+    Cancel a running operation.
     
-    if operation.status not in ["pending", "running"]:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Operation cannot be cancelled (status: {operation.status})"
-        )
+    The status check and write happen in one conditional UPDATE, so two
+    concurrent cancels cannot both succeed.
+    """
+    cancelled_at = datetime.now(timezone.utc)
     
     try:
-        # Update operation status
-        operation.status = "cancelled"
-        operation.completed_at = datetime.now(timezone.utc)
-        operation.error_message = reason or "Operation cancelled by user"
+        result = await db.execute(
+            update(Operation)
+            .where(
+                Operation.id == operation_id,
+                Operation.status.in_([OperationStatus.PENDING, OperationStatus.RUNNING])
+            )
+            .values(
+                status=OperationStatus.CANCELLED,
+                completed_at=cancelled_at,
+                error_message=reason or "Operation cancelled by user",
+                # NULL for operations that never started, as before
+                duration_ms=cast(
+                    func.extract("epoch", literal(cancelled_at) - Operation.started_at) * 1000,
+                    Integer
+                ),
+            )
+            .returning(Operation.id)
+        )
         
-        if operation.started_at:
-            delta = operation.completed_at - operation.started_at
-            operation.duration_ms = int(delta.total_seconds() * 1000)
+        if result.scalar_one_or_none() is None:
+            status_result = await db.execute(select(Operation.status).where(Operation.id == operation_id))
+            status = status_result.scalar_one_or_none()
+            if status is None:
+                raise HTTPException(status_code=404, detail="Operation not found")
+            raise HTTPException(
+                status_code=400,
+                detail=f"Operation cannot be cancelled (status: {status})"
+            )
         
         # Add cancellation log
-        operation.add_log(
+        db.add(OperationLog(
+            operation_id=operation_id,
             level="info",
             message="Operation cancelled",
             details={
                 "reason": reason,
-                "cancelled_at": operation.completed_at.isoformat(),
+                "cancelled_at": cancelled_at.isoformat(),
                 "cancelled_by": "api_request",  # Could be enhanced with user context
             }
-        )
+        ))
         
         await db.commit()
         
@@ -237,36 +337,48 @@ async def cancel_operation(
             "operation_id": str(operation_id),
             "status": "cancelled",
             "message": "Operation cancelled successfully",
-            "cancelled_at": operation.completed_at.isoformat(),
+            "cancelled_at": cancelled_at.isoformat(),
             "reason": reason,
         }
         
+    except HTTPException:
+        await db.rollback()
+        raise
+        
     except Exception as e:
         await db.rollback()
         logger.error("Failed to cancel operation", operation_id=str(operation_id), error=str(e))
         raise HTTPException(status_code=500, detail=f"Failed to cancel operation: {str(e)}")
 
 
+async def _ensure_operation_exists(db: AsyncSession, operation_id: UUID) -> None:
+    """
+    Raise a 404 if the operation does not exist.
+    
+    Only needed when a logs query comes back empty; any returned log already
+    proves the operation exists.
+    """
+    op_query = select(Operation.id).where(Operation.id == operation_id)
+    op_result = await db.execute(op_query)
+    if not op_result.scalar_one_or_none():
+        raise HTTPException(status_code=404, detail="Operation not found")
+
+
 @router.get("/{operation_id}/logs", response_model=dict)
 async def get_operation_logs(
     operation_id: UUID,
     level: Optional[str] = Query(None, description="Filter by log level"),
     limit: int = Query(100, description="Maximum number of logs to return"),
-    offset: int = Query(0, description="Number of logs to skip"),
+    offset: int = Query(0, description="Number of logs to skip (ignored when a cursor is given)"),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's next_cursor"),
     since: Optional[datetime] = Query(None, description="Filter logs since this timestamp"),
     db: AsyncSession = Depends(get_db_session),
-) -> dict:
+) -> ORJSONResponse:
     """Get logs for a specific operation."""
     
-    # Verify operation exists
-    op_query = select(Operation.id).where(Operation.id == operation_id)
-    op_result = await db.execute(op_query)
-    if not op_result.scalar_one_or_none():
-        raise HTTPException(status_code=404, detail="Operation not found")
-    
     # Build logs query
     query = select(OperationLog).where(OperationLog.operation_id == operation_id)
-    count_query = select(func.count(OperationLog.id)).where(OperationLog.operation_id == operation_id)
+    count_query = select(func.count()).select_from(OperationLog).where(OperationLog.operation_id == operation_id)
     
     filters = []
     
@@ -280,41 +392,71 @@ async def get_operation_logs(
         query = query.where(and_(*filters))
         count_query = count_query.where(and_(*filters))
     
-    # Order by creation time
-    query = query.order_by(desc(OperationLog.created_at))
-    
-    # Get total count
-    total_count = (await db.execute(count_query)).scalar()
-    
-    # Apply pagination
-    query = query.offset(offset).limit(limit)
-    result = await db.execute(query)
-    logs = result.scalars().all()
-    
-    return {
-        "operation_id": str(operation_id),
-        "logs": [
-            {
-                "id": str(log.id),
-                "level": log.level,
-                "message": log.message,
-                "details": log.details,
-                "component": log.component,
-                "created_at": log.created_at.isoformat(),
-            }
-            for log in logs
-        ],
-        "pagination": {
+    # Order by creation time, with the id as a stable tie-breaker
+    query = query.order_by(desc(OperationLog.created_at), desc(OperationLog.id))
+    
+    if cursor:
+        # Keyset pagination: no total, and one extra row tells us whether more follow
+        query = query.where(
+            tuple_(OperationLog.created_at, OperationLog.id) < _decode_cursor(cursor)
+        ).limit(limit + 1)
+        rows = (await db.execute(query)).all()
+        if not rows:
+            await _ensure_operation_exists(db, operation_id)
+        has_more = len(rows) > limit
+        pagination = {"cursor": cursor, "limit": limit, "has_more": has_more}
+    else:
+        # The total rides along with the page as a window aggregate
+        query = query.add_columns(func.count().over().label("total")).offset(offset).limit(limit)
+        rows = (await db.execute(query)).all()
+        if not rows:
+            await _ensure_operation_exists(db, operation_id)
+        if rows:
+            total_count = rows[0].total
+        elif offset:
+            # Past the end, so no row carried the total
+            total_count = (await db.execute(count_query)).scalar()
+        else:
+            total_count = 0
+        has_more = (offset + limit) < total_count
+        pagination = {
             "total": total_count,
             "offset": offset,
             "limit": limit,
-            "has_more": (offset + limit) < total_count,
-        },
+            "has_more": has_more,
+        }
+    
+    # Rows are serialised straight from the result; the extra keyset row is skipped
+    page = islice(rows, limit)
+    last = rows[min(len(rows), limit) - 1][0] if rows else None
+    pagination["next_cursor"] = _encode_cursor(last.created_at, last.id) if last and has_more else None
+    
+    return ORJSONResponse(content={
+        "operation_id": operation_id,
+        "logs": _dump_rows(_operation_log_list, [log for log, *_ in page]),
+        "pagination": pagination,
         "filters": {
             "level": level,
-            "since": since.isoformat() if since else None,
+            "since": since,
         }
-    }
+    })
+
+
+@asynccontextmanager
+async def _timeframe_lock(timeframe_hours: int) -> AsyncIterator[None]:
+    """Hold the summary refresh lock for one timeframe."""
+    entry = _summary_locks.get(timeframe_hours)
+    if entry is None:
+        entry = _summary_locks[timeframe_hours] = [asyncio.Lock(), 0]
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        # Timeframes are client-chosen, so locks must not accumulate
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _summary_locks[timeframe_hours]
 
 
 @router.get("/stats/summary", response_model=dict)
@@ -322,75 +464,80 @@ async def get_operations_summary(
     timeframe_hours: int = Query(24, description="Timeframe in hours for statistics"),
     db: AsyncSession = Depends(get_db_session),
 ) -> dict:
-    """Get summary statistics for operations."""
-    
-    since_time = datetime.now(timezone.utc) - timedelta(hours=timeframe_hours)
-    
-    # Overall statistics
-    total_query = select(func.count(Operation.id)).where(Operation.created_at >= since_time)
-    total_operations = (await db.execute(total_query)).scalar()
-    
-    # Status breakdown
-    status_query = select(
+    """
+    Get summary statistics for operations.
+    
+    Dashboards poll this with the same timeframe, so results are reused for
+    a few seconds; ``generated_at`` tells callers how fresh they are.
+    """
+    cached = _summary_cache.get(timeframe_hours)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    
+    # One computation per timeframe at a time, so a burst of polls after expiry
+    # hits the DB once without a slow timeframe holding up the others
+    async with _timeframe_lock(timeframe_hours):
+        cached = _summary_cache.get(timeframe_hours)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        
+        summary = await _compute_operations_summary(db, timeframe_hours)
+        _summary_cache[timeframe_hours] = (time.monotonic() + SUMMARY_CACHE_TTL_SECONDS, summary)
+        _summary_cache.move_to_end(timeframe_hours)
+        if len(_summary_cache) > SUMMARY_CACHE_SIZE:
+            _summary_cache.popitem(last=False)
+        return summary
+
+
+async def _compute_operations_summary(db: AsyncSession, timeframe_hours: int) -> dict:
+    """Run the summary aggregates for the given timeframe."""
+    now = datetime.now(timezone.utc)
+    since_time = now - timedelta(hours=timeframe_hours)
+    
+    completed = Operation.status == "completed"
+    
+    # Counts and duration stats over the window in one scan, with the
+    # (unwindowed) active count as a scalar subquery
+    summary_query = select(
+        func.count().label('total'),
+        func.count().filter(completed).label('success'),
+        func.count().filter(Operation.status == "failed").label('errors'),
+        func.avg(Operation.duration_ms).filter(completed).label('avg_duration'),
+        func.min(Operation.duration_ms).filter(completed).label('min_duration'),
+        func.max(Operation.duration_ms).filter(completed).label('max_duration'),
+        select(func.count()).select_from(Operation).where(
+            # Inline statuses so the ix_operations_active partial index applies
+            Operation.status.in_(bindparam(
+                "active_statuses", list(ACTIVE_STATUSES), type_=Operation.status.type,
+                expanding=True, literal_execute=True
+            ))
+        ).correlate(None).scalar_subquery().label('active'),
+    ).where(Operation.created_at >= since_time)
+    
+    duration_stats = (await db.execute(summary_query)).one()
+    total_operations = duration_stats.total
+    success_count = duration_stats.success
+    error_count = duration_stats.errors
+    active_count = duration_stats.active
+    
+    # Status and type breakdowns in one pass over the window via GROUPING SETS;
+    # grouping(status) is 0 on the per-status rows and 1 on the per-type rows
+    breakdown_query = select(
         Operation.status,
-        func.count(Operation.id).label('count')
-    ).where(
-        Operation.created_at >= since_time
-    ).group_by(Operation.status)
-    
-    status_result = await db.execute(status_query)
-    status_breakdown = {row.status: row.count for row in status_result}
-    
-    # Type breakdown
-    type_query = select(
         Operation.operation_type,
-        func.count(Operation.id).label('count')
+        func.grouping(Operation.status).label('by_type'),
+        func.count().label('count')
     ).where(
         Operation.created_at >= since_time
-    ).group_by(Operation.operation_type)
-    
-    type_result = await db.execute(type_query)
-    type_breakdown = {row.operation_type: row.count for row in type_result}
-    
-    # Average duration for completed operations
-    duration_query = select(
-        func.avg(Operation.duration_ms).label('avg_duration'),
-        func.min(Operation.duration_ms).label('min_duration'),
-        func.max(Operation.duration_ms).label('max_duration')
-    ).where(
-        and_(
-            Operation.created_at >= since_time,
-            Operation.status == "completed",
-            Operation.duration_ms.isnot(None)
-        )
-    )
-    
-    duration_result = await db.execute(duration_query)
-    duration_stats = duration_result.first()
-    
-    # Error rate
-    error_query = select(func.count(Operation.id)).where(
-        and_(
-            Operation.created_at >= since_time,
-            Operation.status == "failed"
-        )
-    )
-    error_count = (await db.execute(error_query)).scalar()
-    
-    # Success rate
-    success_query = select(func.count(Operation.id)).where(
-        and_(
-            Operation.created_at >= since_time,
-            Operation.status == "completed"
-        )
-    )
-    success_count = (await db.execute(success_query)).scalar()
+    ).group_by(func.grouping_sets(Operation.status, Operation.operation_type))
     
-    # Active operations
-    active_query = select(func.count(Operation.id)).where(
-        Operation.status.in_(["pending", "running"])
-    )
-    active_count = (await db.execute(active_query)).scalar()
+    status_breakdown = {}
+    type_breakdown = {}
+    for row in await db.execute(breakdown_query):
+        if row.by_type:
+            type_breakdown[row.operation_type] = row.count
+        else:
+            status_breakdown[row.status] = row.count
     
     return {
         "timeframe_hours": timeframe_hours,
@@ -410,7 +557,7 @@ async def get_operations_summary(
             "min_duration_ms": duration_stats.min_duration,
             "max_duration_ms": duration_stats.max_duration,
         } if duration_stats else None,
-        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "generated_at": now.isoformat(),
     }
 
 
@@ -418,73 +565,108 @@ async def get_operations_summary(
 async def get_performance_metrics(
     operation_type: Optional[str] = Query(None, description="Filter by operation type"),
     timeframe_hours: int = Query(24, description="Timeframe in hours"),
+    histogram_bins: int = Query(0, ge=0, le=1000, description="Number of duration histogram bins (0 disables the histogram)"),
     db: AsyncSession = Depends(get_db_session),
 ) -> dict:
-    """Get performance metrics for operations."""
-    
-    since_time = datetime.now(timezone.utc) - timedelta(hours=timeframe_hours)
-    
-    # Base query for completed operations
-    base_query = select(Operation).where(
-        and_(
-            Operation.created_at >= since_time,
-            Operation.status == "completed",
-            Operation.duration_ms.isnot(None)
-        )
-    )
-    
+    """
+    Get performance metrics for operations.
+    
+    With ``histogram_bins`` set, durations are also bucketed server-side
+    with ``width_bucket`` so the histogram size does not grow with the
+    number of operations.
+    """
+    
+    now = datetime.now(timezone.utc)
+    since_time = now - timedelta(hours=timeframe_hours)
+    
+    def percentile(fraction: float):
+        return func.percentile_cont(fraction).within_group(Operation.duration_ms)
+    
+    window_filters = [
+        Operation.created_at >= since_time,
+        # Inline status so the ix_operations_completed_created_at partial index applies
+        Operation.status == literal(OperationStatus.COMPLETED, Operation.status.type, literal_execute=True),
+        Operation.duration_ms.isnot(None),
+    ]
     if operation_type:
-        base_query = base_query.where(Operation.operation_type == operation_type)
-    
-    result = await db.execute(base_query)
-    operations = result.scalars().all()
-    
-    if not operations:
+        window_filters.append(Operation.operation_type == operation_type)
+    
+    # Aggregate completed operations in Postgres instead of loading the rows
+    metrics_query = select(
+        func.count().label('operation_count'),
+        func.avg(Operation.duration_ms).label('avg_ms'),
+        func.min(Operation.duration_ms).label('min_ms'),
+        func.max(Operation.duration_ms).label('max_ms'),
+        percentile(0.5).label('p50_ms'),
+        percentile(0.95).label('p95_ms'),
+        percentile(0.99).label('p99_ms'),
+        func.stddev_samp(Operation.duration_ms).label('std_dev_ms'),
+        func.avg(Operation.cpu_time_ms).label('cpu_avg_ms'),
+        func.max(Operation.cpu_time_ms).label('cpu_max_ms'),
+        func.count(Operation.cpu_time_ms).label('cpu_count'),
+        func.avg(Operation.memory_peak_bytes).label('memory_avg_bytes'),
+        func.max(Operation.memory_peak_bytes).label('memory_max_bytes'),
+        func.count(Operation.memory_peak_bytes).label('memory_count'),
+    ).where(*window_filters)
+    
+    metrics = (await db.execute(metrics_query)).one()
+    
+    if not metrics.operation_count:
         return {
             "message": "No completed operations found for the specified criteria",
             "timeframe_hours": timeframe_hours,
             "operation_type": operation_type,
         }
     
-    durations = [op.duration_ms for op in operations if op.duration_ms is not None]
-    cpu_times = [op.cpu_time_ms for op in operations if op.cpu_time_ms is not None]
-    memory_peaks = [op.memory_peak_bytes for op in operations if op.memory_peak_bytes is not None]
-    
-    # Calculate percentiles for duration
-    import statistics
-    
-    def calculate_percentile(data, percentile):
-        if not data:
-            return None
-        return statistics.quantiles(sorted(data), n=100)[percentile - 1] if len(data) > 1 else data[0]
+    def as_float(value):
+        return float(value) if value is not None else None
     
     performance_metrics = {
         "timeframe_hours": timeframe_hours,
         "operation_type": operation_type,
-        "operation_count": len(operations),
+        "operation_count": metrics.operation_count,
         "duration_metrics": {
-            "avg_ms": statistics.mean(durations) if durations else None,
-            "median_ms": statistics.median(durations) if durations else None,
-            "min_ms": min(durations) if durations else None,
-            "max_ms": max(durations) if durations else None,
-            "p50_ms": calculate_percentile(durations, 50),
-            "p95_ms": calculate_percentile(durations, 95),
-            "p99_ms": calculate_percentile(durations, 99),
-            "std_dev_ms": statistics.stdev(durations) if len(durations) > 1 else None,
+            "avg_ms": as_float(metrics.avg_ms),
+            "median_ms": as_float(metrics.p50_ms),
+            "min_ms": metrics.min_ms,
+            "max_ms": metrics.max_ms,
+            "p50_ms": as_float(metrics.p50_ms),
+            "p95_ms": as_float(metrics.p95_ms),
+            "p99_ms": as_float(metrics.p99_ms),
+            "std_dev_ms": as_float(metrics.std_dev_ms),
         },
         "resource_usage": {
             "cpu_time": {
-                "avg_ms": statistics.mean(cpu_times) if cpu_times else None,
-                "max_ms": max(cpu_times) if cpu_times else None,
-                "operations_with_data": len(cpu_times),
+                "avg_ms": as_float(metrics.cpu_avg_ms),
+                "max_ms": metrics.cpu_max_ms,
+                "operations_with_data": metrics.cpu_count,
             },
             "memory": {
-                "avg_bytes": statistics.mean(memory_peaks) if memory_peaks else None,
-                "max_bytes": max(memory_peaks) if memory_peaks else None,
-                "operations_with_data": len(memory_peaks),
+                "avg_bytes": as_float(metrics.memory_avg_bytes),
+                "max_bytes": metrics.memory_max_bytes,
+                "operations_with_data": metrics.memory_count,
             }
         },
-        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "generated_at": now.isoformat(),
     }
     
-    return performance_metrics
\ No newline at end of file
+    if histogram_bins:
+        # Bins span [0, max]; the upper bound is exclusive, so nudge it past the max
+        upper_ms = metrics.max_ms + 1
+        bin_width = upper_ms / histogram_bins
+        bucket = func.width_bucket(Operation.duration_ms, 0, upper_ms, histogram_bins).label('bucket')
+        histogram_query = select(
+            bucket,
+            func.count().label('count')
+        ).where(*window_filters).group_by(bucket).order_by(bucket)
+        
+        performance_metrics["duration_metrics"]["histogram"] = [
+            {
+                "lower_ms": (row.bucket - 1) * bin_width,
+                "upper_ms": row.bucket * bin_width,
+                "count": row.count,
+            }
+            for row in await db.execute(histogram_query)
+        ]
+    
+    return performance_metrics
@@ -5,27 +5,104 @@ Provides endpoints for generating human-readable printable documents
 from OSCAL content including PDFs, HTML, and other formats.
 """
 
-import json
+import asyncio
+import hashlib
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Dict, Literal, Optional
-from uuid import UUID
+from typing import Dict, Literal, Optional, Tuple
+from uuid import UUID, uuid4
 
+import orjson
 import structlog
-from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Request, UploadFile
+from fastapi.responses import FileResponse, JSONResponse, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import get_settings
 from app.core.database import get_db_session
+from app.core.operation_tracking import record_operation_failure, start_operation
+from app.core.uploads import read_upload
 from app.models import Operation
 from app.services.printable_service import PrintableGenerationService, PrintableGenerationResult
-from app.services.storage_service import StorageService
+from app.services.storage_service import PRESIGNED_URL_EXPIRY, get_storage_service
 
 logger = structlog.get_logger()
 router = APIRouter()
 
+# A stored presigned URL is only reused while the client has this long to follow it
+DOWNLOAD_URL_MIN_REMAINING = timedelta(minutes=5)
+
 # Service instances
 printable_service = PrintableGenerationService()
-storage_service = StorageService()
+storage_service = get_storage_service()
+
+
+# Template metadata is static, so the response is encoded once and validated by ETag
+_TEMPLATES_RESPONSE = orjson.dumps({
+    "document_types": [
+        {
+            "type": "ssp",
+            "name": "System Security Plan",
+            "description": "Comprehensive system security documentation",
+            "supported_formats": ["pdf", "html"],
+            "template_version": "1.0",
+            "status": "available"
+        },
+        {
+            "type": "sap", 
+            "name": "Security Assessment Plan",
+            "description": "Assessment planning documentation",
+            "supported_formats": ["pdf", "html"],
+            "template_version": "1.0",
+            "status": "coming_soon"
+        },
+        {
+            "type": "sar",
+            "name": "Security Assessment Report", 
+            "description": "Assessment results documentation",
+            "supported_formats": ["pdf", "html"],
+            "template_version": "1.0",
+            "status": "coming_soon"
+        },
+        {
+            "type": "poam",
+            "name": "Plan of Action and Milestones",
+            "description": "Remediation planning documentation",
+            "supported_formats": ["pdf", "html"],
+            "template_version": "1.0", 
+            "status": "coming_soon"
+        }
+    ],
+    "output_formats": [
+        {
+            "format": "pdf",
+            "description": "Portable Document Format",
+            "mime_type": "application/pdf",
+            "suitable_for": ["printing", "distribution", "archival"]
+        },
+        {
+            "format": "html",
+            "description": "HyperText Markup Language",
+            "mime_type": "text/html",
+            "suitable_for": ["web_viewing", "integration", "customization"]
+        }
+    ],
+    "template_features": [
+        "Professional formatting",
+        "Automatic table of contents",
+        "Control-by-control implementation details",
+        "System component documentation",
+        "Responsible roles and parties",
+        "Custom CSS styling for PDF",
+        "Markdown content support"
+    ]
+})
+_TEMPLATES_ETAG = f'"{hashlib.blake2b(_TEMPLATES_RESPONSE, digest_size=16).hexdigest()}"'
+TEMPLATE_CACHE_HEADERS = {"ETag": _TEMPLATES_ETAG, "Cache-Control": "public, max-age=86400"}
+
+# Preview responses as (body, media type, headers) keyed by (template version, document type, format)
+_preview_cache: Dict[Tuple[str, str, str], Tuple[bytes, str, Dict[str, str]]] = {}
+_preview_lock = asyncio.Lock()
 
 
 @router.post("/generate", response_model=dict)
@@ -47,7 +124,11 @@ async def generate_printable_document(
             detail="Only JSON and XML OSCAL files are supported"
         )
     
+    # Read up front so oversized uploads are rejected before any work is recorded
+    content = await read_upload(file, get_settings().max_upload_size)
+    
     operation = Operation(
+        id=uuid4(),
         operation_type="printable_generation",
         operation_name=f"Generate {output_format.upper()} printable from {file.filename}",
         operation_description=f"Printable document generation: {output_format.upper()}",
@@ -55,31 +136,28 @@ async def generate_printable_document(
             "filename": file.filename,
             "content_type": file.content_type,
             "output_format": output_format,
-            "file_size": file.size if hasattr(file, 'size') else None,
+            "file_size": len(content),
         }
     )
     
-    temp_input_file = None
+    generation_result: Optional[PrintableGenerationResult] = None
     
     try:
-        operation.mark_started()
-        db.add(operation)
-        await db.commit()
-        
-        # Read and parse OSCAL document
-        content = await file.read()
+        await start_operation(db, operation)
         
+        # Parse OSCAL document
         if file.content_type == "application/json":
             try:
-                oscal_document = json.loads(content.decode('utf-8'))
-            except json.JSONDecodeError as e:
+                # orjson parses the raw bytes, validating UTF-8 itself
+                oscal_document = orjson.loads(content)
+            except orjson.JSONDecodeError as e:
                 raise HTTPException(status_code=400, detail=f"Invalid JSON: {str(e)}")
         else:
             # XML parsing would be implemented here
             raise HTTPException(status_code=400, detail="XML parsing not yet implemented")
         
         # Generate printable document
-        generation_result: PrintableGenerationResult = await printable_service.generate_printable(
+        generation_result = await printable_service.generate_printable(
             oscal_document=oscal_document,
             output_format=output_format
         )
@@ -92,7 +170,6 @@ async def generate_printable_document(
                     "processing_time_ms": generation_result.generation_time_ms
                 }
             )
-            await db.commit()
             
             raise HTTPException(
                 status_code=400,
@@ -106,6 +183,8 @@ async def generate_printable_document(
         # Store generated document if requested
         storage_info = None
         if store_result and generation_result.output_file_path:
+            # The URL is signed during the call, so it expires no earlier than this
+            url_expires_at = datetime.now(timezone.utc) + PRESIGNED_URL_EXPIRY
             storage_info = await storage_service.store_artifact(
                 file_path=generation_result.output_file_path,
                 artifact_type="printable",
@@ -117,9 +196,15 @@ async def generate_printable_document(
                     "generation_operation_id": str(operation.id),
                     "generated_from": "oscal_document",
                     **generation_result.metadata
-                }
+                },
+                reference_session=db
             )
         
+        # Dumped once for both the operation record and the response
+        storage_data = storage_info.model_dump(mode="json") if storage_info else None
+        # Downloads redirect to the stored URL until it is about to expire
+        download_url_expires_at = url_expires_at.isoformat() if storage_info and storage_info.url else None
+        
         # Complete operation
         output_data = {
             "success": True,
@@ -127,7 +212,8 @@ async def generate_printable_document(
             "output_format": generation_result.output_format,
             "file_size_bytes": generation_result.file_size_bytes,
             "generation_time_ms": generation_result.generation_time_ms,
-            "storage_info": storage_info.dict() if storage_info else None,
+            "storage_info": storage_data,
+            "download_url_expires_at": download_url_expires_at,
             "generation_metadata": generation_result.metadata,
         }
         operation.mark_completed(output_data)
@@ -148,41 +234,54 @@ async def generate_printable_document(
                 "document_title": generation_result.metadata.get("document_title"),
                 "system_name": generation_result.metadata.get("system_name"),
             },
-            "storage": storage_info.dict() if storage_info else None,
+            "storage": storage_data,
             "download_url": f"/api/v1/printables/operations/{operation.id}/download" if generation_result.success else None,
         }
         
         return JSONResponse(status_code=200, content=response_data)
         
     except Exception as e:
-        operation.mark_failed(str(e), {"exception_type": type(e).__name__})
-        await db.commit()
+        await record_operation_failure(db, operation, str(e), {"exception_type": type(e).__name__})
+        
+        if isinstance(e, HTTPException):
+            raise
         
         logger.error("Printable generation failed", operation_id=str(operation.id), error=str(e))
         raise HTTPException(status_code=500, detail=f"Generation failed: {str(e)}")
         
     finally:
-        # Clean up temp file
-        if temp_input_file and temp_input_file.exists():
-            temp_input_file.unlink(missing_ok=True)
+        # The render is stored or discarded by now; each request owns its output file
+        if generation_result is not None and generation_result.output_file_path:
+            await asyncio.to_thread(generation_result.output_file_path.unlink, missing_ok=True)
 
 
 @router.post("/generate-from-json", response_model=dict)
 async def generate_from_json_data(
-    oscal_data: Dict = Form(..., description="OSCAL document data as JSON"),
-    output_format: Literal["pdf", "html"] = Form("pdf", description="Output format"),
-    document_title: Optional[str] = Form(None, description="Document title override"),
-    store_result: bool = Form(True, description="Whether to store the generated document"),
+    request: Request,
+    output_format: Literal["pdf", "html"] = Query("pdf", description="Output format"),
+    document_title: Optional[str] = Query(None, description="Document title override"),
+    store_result: bool = Query(True, description="Whether to store the generated document"),
     db: AsyncSession = Depends(get_db_session),
 ) -> JSONResponse:
     """
     Generate a printable document from JSON OSCAL data.
     
-    Alternative endpoint that accepts OSCAL data directly as JSON
-    instead of requiring file upload.
+    Alternative endpoint that accepts the OSCAL document directly as the
+    JSON request body instead of requiring file upload; options are passed
+    as query parameters.
     """
+    # The document is validated by the generator, so the body is only parsed
+    try:
+        oscal_data = orjson.loads(await request.body())
+    except orjson.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON: {str(e)}")
+    
+    if not isinstance(oscal_data, dict):
+        raise HTTPException(status_code=400, detail="OSCAL document must be a JSON object")
+    
     operation = Operation(
-        operation_type="printable_generation", 
+        id=uuid4(),
+        operation_type="printable_generation",
         operation_name=f"Generate {output_format.upper()} from JSON data",
         operation_description=f"Printable generation from direct JSON: {output_format.upper()}",
         input_data={
@@ -192,10 +291,10 @@ async def generate_from_json_data(
         }
     )
     
+    generation_result: Optional[PrintableGenerationResult] = None
+    
     try:
-        operation.mark_started()
-        db.add(operation)
-        await db.commit()
+        await start_operation(db, operation)
         
         # Override document title if provided
         if document_title and "system-security-plan" in oscal_data:
@@ -205,7 +304,7 @@ async def generate_from_json_data(
             ssp["metadata"]["title"] = document_title
         
         # Generate printable document
-        generation_result: PrintableGenerationResult = await printable_service.generate_printable(
+        generation_result = await printable_service.generate_printable(
             oscal_document=oscal_data,
             output_format=output_format
         )
@@ -214,7 +313,6 @@ async def generate_from_json_data(
             operation.mark_failed(
                 f"Generation failed: {'; '.join(generation_result.issues)}"
             )
-            await db.commit()
             
             raise HTTPException(
                 status_code=400,
@@ -227,6 +325,8 @@ async def generate_from_json_data(
         # Store if requested
         storage_info = None
         if store_result and generation_result.output_file_path:
+            # The URL is signed during the call, so it expires no earlier than this
+            url_expires_at = datetime.now(timezone.utc) + PRESIGNED_URL_EXPIRY
             storage_info = await storage_service.store_artifact(
                 file_path=generation_result.output_file_path,
                 artifact_type="printable",
@@ -237,16 +337,23 @@ async def generate_from_json_data(
                     "output_format": generation_result.output_format,
                     "generation_operation_id": str(operation.id),
                     **generation_result.metadata
-                }
+                },
+                reference_session=db
             )
         
+        # Dumped once for both the operation record and the response
+        storage_data = storage_info.model_dump(mode="json") if storage_info else None
+        # Downloads redirect to the stored URL until it is about to expire
+        download_url_expires_at = url_expires_at.isoformat() if storage_info and storage_info.url else None
+        
         # Complete operation
         output_data = {
             "success": True,
             "document_type": generation_result.document_type,
             "output_format": generation_result.output_format,
             "generation_metadata": generation_result.metadata,
-            "storage_info": storage_info.dict() if storage_info else None,
+            "storage_info": storage_data,
+            "download_url_expires_at": download_url_expires_at,
         }
         operation.mark_completed(output_data)
         await db.commit()
@@ -262,17 +369,24 @@ async def generate_from_json_data(
                     "processing_time_ms": generation_result.generation_time_ms,
                     "file_size_bytes": generation_result.file_size_bytes,
                 },
-                "storage": storage_info.dict() if storage_info else None,
+                "storage": storage_data,
                 "download_url": f"/api/v1/printables/operations/{operation.id}/download"
             }
         )
         
     except Exception as e:
-        operation.mark_failed(str(e))
-        await db.commit()
+        await record_operation_failure(db, operation, str(e))
+        
+        if isinstance(e, HTTPException):
+            raise
         
         logger.error("JSON printable generation failed", error=str(e))
         raise HTTPException(status_code=500, detail=f"Generation failed: {str(e)}")
+        
+    finally:
+        # The render is stored or discarded by now; each request owns its output file
+        if generation_result is not None and generation_result.output_file_path:
+            await asyncio.to_thread(generation_result.output_file_path.unlink, missing_ok=True)
 
 
 @router.get("/operations/{operation_id}/download")
@@ -283,23 +397,25 @@ async def download_printable_document(
     """Download the printable document generated from an operation."""
     from sqlalchemy import select
     
-    # Get the operation
-    query = select(Operation).where(
+    # Only the storage reference is needed, so fetch it without loading the whole row
+    query = select(
+        Operation.output_data["storage_info"],
+        Operation.output_data["download_url_expires_at"].as_string(),
+    ).where(
         Operation.id == operation_id,
         Operation.operation_type == "printable_generation",
         Operation.status == "completed"
     )
     result = await db.execute(query)
-    operation = result.scalar_one_or_none()
+    row = result.first()
     
-    if not operation:
+    if row is None:
         raise HTTPException(
             status_code=404,
             detail="Printable generation operation not found or not completed"
         )
     
-    output_data = operation.output_data
-    storage_info = output_data.get("storage_info") if output_data else None
+    storage_info, url_expires_at = row
     
     if not storage_info:
         raise HTTPException(
@@ -307,6 +423,16 @@ async def download_printable_document(
             detail="Generated document not available for download"
         )
     
+    from fastapi.responses import RedirectResponse
+    
+    # The URL signed at generation time is still good, so skip signing a new one
+    if (
+        url_expires_at
+        and storage_info.get("url")
+        and datetime.fromisoformat(url_expires_at) - datetime.now(timezone.utc) > DOWNLOAD_URL_MIN_REMAINING
+    ):
+        return RedirectResponse(url=storage_info["url"], status_code=302)
+    
     try:
         # Generate download URL
         download_url = await storage_service.get_download_url(
@@ -315,7 +441,6 @@ async def download_printable_document(
             expires_in=3600  # 1 hour
         )
         
-        from fastapi.responses import RedirectResponse
         return RedirectResponse(url=download_url, status_code=302)
         
     except Exception as e:
@@ -331,14 +456,29 @@ async def get_printable_operation(
     """Get details of a printable generation operation."""
     from sqlalchemy import select
     
-    query = select(Operation).where(
+    # Select just the columns in the response rather than hydrating an ORM object
+    query = select(
+        Operation.id,
+        Operation.operation_name,
+        Operation.operation_description,
+        Operation.status,
+        Operation.progress_percent,
+        Operation.started_at,
+        Operation.completed_at,
+        Operation.duration_ms,
+        Operation.input_data,
+        Operation.output_data,
+        Operation.error_message,
+        Operation.created_at,
+        Operation.updated_at,
+    ).where(
         Operation.id == operation_id,
         Operation.operation_type == "printable_generation"
     )
     result = await db.execute(query)
-    operation = result.scalar_one_or_none()
+    operation = result.first()
     
-    if not operation:
+    if operation is None:
         raise HTTPException(status_code=404, detail="Printable generation operation not found")
     
     return {
@@ -359,79 +499,29 @@ async def get_printable_operation(
 
 
 @router.get("/templates", response_model=dict)
-async def list_available_templates() -> dict:
+async def list_available_templates(request: Request) -> Response:
     """List available printable document templates."""
-    return {
-        "document_types": [
-            {
-                "type": "ssp",
-                "name": "System Security Plan",
-                "description": "Comprehensive system security documentation",
-                "supported_formats": ["pdf", "html"],
-                "template_version": "1.0",
-                "status": "available"
-            },
-            {
-                "type": "sap", 
-                "name": "Security Assessment Plan",
-                "description": "Assessment planning documentation",
-                "supported_formats": ["pdf", "html"],
-                "template_version": "1.0",
-                "status": "coming_soon"
-            },
-            {
-                "type": "sar",
-                "name": "Security Assessment Report", 
-                "description": "Assessment results documentation",
-                "supported_formats": ["pdf", "html"],
-                "template_version": "1.0",
-                "status": "coming_soon"
-            },
-            {
-                "type": "poam",
-                "name": "Plan of Action and Milestones",
-                "description": "Remediation planning documentation",
-                "supported_formats": ["pdf", "html"],
-                "template_version": "1.0", 
-                "status": "coming_soon"
-            }
-        ],
-        "output_formats": [
-            {
-                "format": "pdf",
-                "description": "Portable Document Format",
-                "mime_type": "application/pdf",
-                "suitable_for": ["printing", "distribution", "archival"]
-            },
-            {
-                "format": "html",
-                "description": "HyperText Markup Language",
-                "mime_type": "text/html",
-                "suitable_for": ["web_viewing", "integration", "customization"]
-            }
-        ],
-        "template_features": [
-            "Professional formatting",
-            "Automatic table of contents",
-            "Control-by-control implementation details",
-            "System component documentation",
-            "Responsible roles and parties",
-            "Custom CSS styling for PDF",
-            "Markdown content support"
-        ]
-    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or _TEMPLATES_ETAG in if_none_match):
+        return Response(status_code=304, headers=TEMPLATE_CACHE_HEADERS)
+    
+    return Response(content=_TEMPLATES_RESPONSE, media_type="application/json", headers=TEMPLATE_CACHE_HEADERS)
 
 
 @router.get("/preview/{document_type}", response_model=dict)
 async def preview_template(
     document_type: Literal["ssp", "sap", "sar", "poam"],
     format: Literal["pdf", "html"] = Query("html", description="Preview format")
-) -> JSONResponse:
+) -> Response:
     """
     Get a preview of a document template with sample data.
     
     Useful for understanding template structure and layout
-    before generating actual documents.
+    before generating actual documents. HTML previews are returned as the
+    document itself, with the generation metadata in the
+    ``X-Generation-Metadata`` header; PDF previews return metadata only.
+    The sample input is fixed, so each rendered preview is cached until
+    the template version changes.
     """
     if document_type != "ssp":
         raise HTTPException(
@@ -439,6 +529,22 @@ async def preview_template(
             detail=f"Template preview for {document_type} not yet implemented"
         )
     
+    cache_key = (printable_service.template_version, document_type, format)
+    preview = _preview_cache.get(cache_key)
+    if preview is None:
+        async with _preview_lock:
+            # Another request may have rendered it while we waited
+            preview = _preview_cache.get(cache_key)
+            if preview is None:
+                preview = await _render_preview(document_type, format)
+                _preview_cache[cache_key] = preview
+    
+    content, media_type, headers = preview
+    return Response(content=content, media_type=media_type, headers=headers)
+
+
+async def _render_preview(document_type: str, format: str) -> Tuple[bytes, str, Dict[str, str]]:
+    """Render a template preview from sample data as (body, media type, headers)."""
     # Sample OSCAL SSP data for preview
     sample_ssp = {
         "system-security-plan": {
@@ -512,6 +618,8 @@ async def preview_template(
         }
     }
     
+    generation_result: Optional[PrintableGenerationResult] = None
+    
     try:
         # Generate preview
         generation_result = await printable_service.generate_printable(
@@ -525,31 +633,20 @@ async def preview_template(
                 detail=f"Failed to generate preview: {'; '.join(generation_result.issues)}"
             )
         
-        # For HTML, return content directly; for PDF, return metadata
+        # For HTML, return the document itself; for PDF, return metadata
         if format == "html" and generation_result.output_file_path:
-            html_content = generation_result.output_file_path.read_text(encoding='utf-8')
-            return JSONResponse(
-                status_code=200,
-                content={
-                    "document_type": document_type,
-                    "format": format,
-                    "preview_content": html_content,
-                    "generation_metadata": generation_result.metadata,
-                    "note": "This is a preview with sample data"
-                }
-            )
+            html_content = generation_result.output_file_path.read_bytes()
+            headers = {"X-Generation-Metadata": orjson.dumps(generation_result.metadata).decode()}
+            return html_content, "text/html; charset=utf-8", headers
         else:
-            return JSONResponse(
-                status_code=200,
-                content={
-                    "document_type": document_type,
-                    "format": format,
-                    "file_size_bytes": generation_result.file_size_bytes,
-                    "generation_metadata": generation_result.metadata,
-                    "note": f"Preview {format.upper()} generated successfully",
-                    "download_note": "Use the generate endpoint with actual OSCAL data to create downloadable documents"
-                }
-            )
+            return orjson.dumps({
+                "document_type": document_type,
+                "format": format,
+                "file_size_bytes": generation_result.file_size_bytes,
+                "generation_metadata": generation_result.metadata,
+                "note": f"Preview {format.upper()} generated successfully",
+                "download_note": "Use the generate endpoint with actual OSCAL data to create downloadable documents"
+            }), "application/json", {}
             
     except Exception as e:
         logger.error("Template preview failed", document_type=document_type, error=str(e))
@@ -557,5 +654,5 @@ async def preview_template(
     
     finally:
         # Clean up preview file
-        if 'generation_result' in locals() and generation_result.output_file_path and generation_result.output_file_path.exists():
+        if generation_result is not None and generation_result.output_file_path:
             generation_result.output_file_path.unlink(missing_ok=True)
\ No newline at end of file
@@ -16,14 +16,19 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, desc
 
 from app.core.database import get_db_session
+from app.core.operation_tracking import record_operation_failure
 from app.models import Artifact, ArtifactVersion, Operation
-from app.services.storage_service import StorageService
+from app.services.storage_service import (
+    claim_unreferenced_object,
+    get_storage_service,
+    release_object_reference,
+)
 
 logger = structlog.get_logger()
 router = APIRouter()
 
 # Service instance
-storage_service = StorageService()
+storage_service = get_storage_service()
 
 
 @router.post("/upload", response_model=dict)
@@ -58,6 +63,8 @@ async def upload_artifact(
         }
     )
     
+    temp_file: Optional[Path] = None
+    
     try:
         operation.mark_started()
         db.add(operation)
@@ -80,7 +87,8 @@ async def upload_artifact(
                 "system_id": system_id,
                 "system_name": system_name,
                 "fedramp_baseline": fedramp_baseline,
-            }
+            },
+            reference_session=db
         )
         
         # Parse tags if provided
@@ -213,7 +221,7 @@ async def upload_artifact(
         await db.commit()
         
         # Clean up temp file
-        if 'temp_file' in locals() and temp_file.exists():
+        if temp_file is not None:
             temp_file.unlink(missing_ok=True)
         
         logger.error("Upload failed", operation_id=str(operation.id), error=str(e))
@@ -438,31 +446,47 @@ async def delete_artifact(
         db.add(operation)
         await db.commit()
         
-        # Delete storage objects for all versions
-        deleted_objects = []
+        # Content-addressed objects may still be referenced elsewhere, so
+        # release this artifact's references and collect the objects left
+        # unreferenced; versions can share an object
+        unreferenced = {}
         for version in artifact.versions:
-            try:
-                await storage_service.delete_artifact(
-                    bucket=version.storage_bucket,
-                    object_key=version.storage_key
+            remaining = await release_object_reference(
+                db, version.storage_bucket, version.storage_key
+            )
+            if not remaining:
+                unreferenced.setdefault(
+                    (version.storage_bucket, version.storage_key), str(version.id)
                 )
+        
+        # Delete from database (cascade should handle versions)
+        artifact_name = artifact.name
+        deleted_versions = len(artifact.versions)
+        await db.delete(artifact)
+        await db.commit()
+        
+        # Objects are only removed once the references are committed; each
+        # claim locks the object's row until the commit below, so an upload
+        # of the same content waits and then stores the object again
+        deleted_objects = []
+        for (bucket, object_key), version_id in unreferenced.items():
+            if not await claim_unreferenced_object(db, bucket, object_key):
+                continue
+            
+            if await storage_service.delete_artifact(bucket=bucket, object_key=object_key):
                 deleted_objects.append({
-                    "version_id": str(version.id),
-                    "object_key": version.storage_key,
+                    "version_id": version_id,
+                    "object_key": object_key,
                 })
-            except Exception as e:
+            else:
                 logger.warning(
                     "Failed to delete storage object",
-                    version_id=str(version.id),
-                    object_key=version.storage_key,
-                    error=str(e)
+                    version_id=version_id,
+                    object_key=object_key,
                 )
         
-        # Delete from database (cascade should handle versions)
-        await db.delete(artifact)
-        
         operation.mark_completed({
-            "deleted_versions": len(artifact.versions),
+            "deleted_versions": deleted_versions,
             "deleted_storage_objects": len(deleted_objects),
             "storage_objects": deleted_objects,
         })
@@ -473,15 +497,16 @@ async def delete_artifact(
             status_code=200,
             content={
                 "operation_id": str(operation.id),
-                "message": f"Artifact '{artifact.name}' deleted successfully",
-                "deleted_versions": len(artifact.versions),
+                "message": f"Artifact '{artifact_name}' deleted successfully",
+                "deleted_versions": deleted_versions,
                 "deleted_storage_objects": len(deleted_objects),
             }
         )
         
     except Exception as e:
-        operation.mark_failed(str(e), {"exception_type": type(e).__name__})
-        await db.commit()
+        await record_operation_failure(
+            db, operation, str(e), {"exception_type": type(e).__name__}
+        )
         
         logger.error("Delete artifact failed", operation_id=str(operation.id), error=str(e))
         raise HTTPException(status_code=500, detail=f"Delete failed: {str(e)}")
@@ -6,6 +6,8 @@ with comprehensive error reporting and operation tracking.
 """
 
 import asyncio
+import os
+import tempfile
 from pathlib import Path
 from typing import List, Optional
 from uuid import UUID
@@ -18,7 +20,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db_session
 from app.models import Operation, ValidationRun, ValidationError
 from app.services.oscal_service import OSCALService, ValidationResult
-from app.services.storage_service import StorageService
+from app.services.storage_service import get_storage_service
 from app.core.config import get_settings
 
 logger = structlog.get_logger()
@@ -26,7 +28,28 @@ router = APIRouter()
 
 # Service instances
 oscal_service = OSCALService()
-storage_service = StorageService()
+storage_service = get_storage_service()
+
+
+def _write_temp_document(content: bytes, filename: str) -> Path:
+    """
+    Write document content to a uniquely named temporary file.
+    
+    The OSCAL CLI infers the format from the extension, so the original
+    suffix is kept; the rest of the name is random, which avoids collisions
+    and path traversal from client-supplied filenames.
+    
+    Args:
+        content: Document content
+        filename: Original filename, used only for its suffix
+        
+    Returns:
+        Path to the temporary file; the caller is responsible for removing it
+    """
+    fd, path = tempfile.mkstemp(prefix="oscal_validate_", suffix=Path(filename).suffix)
+    with os.fdopen(fd, "wb") as temp:
+        temp.write(content)
+    return Path(path)
 
 
 @router.post("/file", response_model=dict)
@@ -60,15 +83,16 @@ async def validate_file(
         }
     )
     
+    temp_file: Optional[Path] = None
+    
     try:
         operation.mark_started()
         db.add(operation)
         await db.commit()
         
-        # Save uploaded file temporarily
-        temp_file = Path(f"/tmp/{file.filename}")
+        # Save uploaded file temporarily, off the event loop
         content = await file.read()
-        temp_file.write_bytes(content)
+        temp_file = await asyncio.to_thread(_write_temp_document, content, file.filename or "document.json")
         
         # Validate with OSCAL CLI
         validation_result: ValidationResult = await oscal_service.validate_document(
@@ -166,7 +190,7 @@ async def validate_file(
         await db.commit()
         
         # Clean up temp file
-        if 'temp_file' in locals():
+        if temp_file is not None:
             temp_file.unlink(missing_ok=True)
         
         logger.error("Validation failed", operation_id=str(operation.id), error=str(e))
@@ -197,6 +221,8 @@ async def validate_url(
         }
     )
     
+    temp_file: Optional[Path] = None
+    
     try:
         operation.mark_started()
         db.add(operation)
@@ -212,9 +238,8 @@ async def validate_url(
         content_type = response.headers.get("content-type", "application/json")
         filename = Path(url).name or "document.json"
         
-        # Save to temp file
-        temp_file = Path(f"/tmp/{filename}")
-        temp_file.write_bytes(content)
+        # Save to temp file, off the event loop
+        temp_file = await asyncio.to_thread(_write_temp_document, content, filename)
         
         # Validate with OSCAL CLI
         validation_result: ValidationResult = await oscal_service.validate_document(
@@ -313,7 +338,7 @@ async def validate_url(
         await db.commit()
         
         # Clean up
-        if 'temp_file' in locals():
+        if temp_file is not None:
             temp_file.unlink(missing_ok=True)
         
         logger.error("URL validation failed", operation_id=str(operation.id), error=str(e))
@@ -5,6 +5,7 @@ Provides async database session handling with SQLAlchemy for PostgreSQL
 and dependency injection for FastAPI endpoints.
 """
 
+import asyncio
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 
@@ -46,12 +47,21 @@ def create_engine():
     database_url = get_database_url()
     settings = get_settings()
     
+    # Disable pooling in debug; otherwise size the pool for concurrent requests
+    if settings.debug:
+        pool_options = {"poolclass": NullPool}
+    else:
+        pool_options = {
+            "pool_size": settings.database_pool_size,
+            "max_overflow": settings.database_max_overflow,
+        }
+    
     _engine = create_async_engine(
         database_url,
         echo=settings.debug,  # Log SQL in debug mode
-        poolclass=NullPool if settings.debug else None,  # Disable pooling in debug
         pool_pre_ping=True,
-        pool_recycle=3600,  # Recycle connections after 1 hour
+        pool_recycle=settings.database_pool_recycle,
+        **pool_options,
         connect_args={
             "command_timeout": 30,
             "server_settings": {
@@ -128,6 +138,30 @@ async def init_database():
         logger.info("Database tables created successfully")
 
 
+async def warm_database_pool():
+    """
+    Open the configured number of pooled connections ahead of traffic.
+    
+    asyncpg connections are created lazily, so without warming the first
+    requests after startup each pay the TCP, TLS and authentication handshake.
+    Should be called during application startup.
+    """
+    settings = get_settings()
+    if settings.debug:
+        # Debug mode uses NullPool; there is nothing to keep warm
+        return
+    
+    engine = create_engine()
+    
+    async def open_connection():
+        async with engine.connect() as conn:
+            await conn.exec_driver_sql("SELECT 1")
+    
+    # Hold every connection at once so the pool creates distinct ones
+    await asyncio.gather(*(open_connection() for _ in range(settings.database_pool_size)))
+    logger.info("Database pool warmed", connections=settings.database_pool_size)
+
+
 async def close_database():
     """
     Close database connections.
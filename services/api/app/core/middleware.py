@@ -0,0 +1,61 @@
+"""
+ASGI middleware for the OSCAL Compliance Factory.
+"""
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class RequestSizeLimitMiddleware:
+    """
+    Reject request bodies larger than a fixed number of bytes.
+    
+    Requests declaring an oversized Content-Length are answered with 413
+    before any of the body is read. Bodies without a usable Content-Length,
+    such as chunked uploads, are counted as they stream in and aborted with
+    413 as soon as the limit is crossed, so nothing past the cap is spooled
+    to disk or memory.
+    """
+    
+    def __init__(self, app: ASGIApp, max_body_size: int) -> None:
+        self.app = app
+        self.max_body_size = max_body_size
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length is not None and content_length.isdigit():
+            if int(content_length) > self.max_body_size:
+                response = JSONResponse(
+                    status_code=413,
+                    content={
+                        "error": "REQUEST_TOO_LARGE",
+                        "message": f"Request body exceeds {self.max_body_size} bytes",
+                        "details": {"max_body_size": self.max_body_size},
+                    },
+                )
+                await response(scope, receive, send)
+                return
+        
+        received_bytes = 0
+        
+        async def limited_receive() -> Message:
+            nonlocal received_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                received_bytes += len(message.get("body", b""))
+                if received_bytes > self.max_body_size:
+                    # HTTPException passes through FastAPI's body parsing
+                    # unchanged and is rendered as a 413 response
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Request body exceeds {self.max_body_size} bytes"
+                    )
+            return message
+        
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,48 @@
+"""
+Persistence helpers for operations tracked by request handlers.
+
+Handlers write an operation once, with its final state. A started operation
+is only flushed, so it gets its row in the request's transaction without a
+commit round trip, and the success path commits it together with everything
+else. On failure the whole transaction is rolled back, so nothing
+half-written survives, and the failed operation is then committed on its own.
+"""
+
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Operation
+from app.models.operation import OperationStatus
+
+
+async def start_operation(session: AsyncSession, operation: Operation) -> None:
+    """Mark an operation started and flush it without committing."""
+    operation.mark_started()
+    session.add(operation)
+    await session.flush()
+
+
+async def record_operation_failure(
+    session: AsyncSession,
+    operation: Operation,
+    error_message: str,
+    error_details: Optional[dict] = None
+) -> None:
+    """
+    Roll back the request's transaction and commit the failed operation alone.
+    
+    A failure the handler already recorded, e.g. with generation issues, is
+    kept rather than overwritten by the exception that reported it.
+    
+    Args:
+        session: The request's database session
+        operation: Operation that failed
+        error_message: Error message to record
+        error_details: Detailed error information to record
+    """
+    await session.rollback()
+    if operation.status != OperationStatus.FAILED:
+        operation.mark_failed(error_message, error_details)
+    session.add(operation)
+    await session.commit()
@@ -0,0 +1,32 @@
+"""
+Helpers for reading uploaded files.
+"""
+
+from fastapi import HTTPException, UploadFile
+
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1MB
+
+
+async def read_upload(file: UploadFile, max_bytes: int) -> bytearray:
+    """
+    Read an upload chunk by chunk, stopping as soon as it exceeds the cap.
+    
+    Args:
+        file: Uploaded file to read
+        max_bytes: Maximum accepted size in bytes
+        
+    Returns:
+        The upload content
+        
+    Raises:
+        HTTPException: 413 if the upload is larger than max_bytes
+    """
+    buffer = bytearray()
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        buffer += chunk
+        if len(buffer) > max_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File exceeds the maximum upload size of {max_bytes} bytes"
+            )
+    return buffer
@@ -19,6 +19,7 @@ from app.core.config import get_settings
 from app.core.logging import setup_logging
 from app.api.routes import api_router
 from app.core.exceptions import ComplianceFactoryException
+from app.core.middleware import RequestSizeLimitMiddleware
 
 
 @asynccontextmanager
@@ -31,13 +32,13 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     logger.info("Starting OSCAL Compliance Factory API", version=settings.version)
     
     # Initialize database connection
-    from app.core.database import init_database
+    from app.core.database import init_database, warm_database_pool
     await init_database()
+    await warm_database_pool()
     
     # Initialize MinIO/S3 storage - verify connectivity
-    from app.services.storage_service import StorageService
-    storage_service = StorageService()
-    await storage_service.health_check()
+    from app.services.storage_service import get_storage_service
+    await get_storage_service().health_check()
     
     # Verify OSCAL CLI availability
     from app.services.oscal_service import OSCALService
@@ -55,6 +56,18 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     from app.core.database import close_database
     await close_database()
     
+    # Release pooled storage connections
+    from app.services.storage_service import close_storage_service
+    close_storage_service()
+    
+    # Stop FedRAMP validation workers
+    from app.services.fedramp_service import close_validation_pool
+    close_validation_pool()
+    
+    # Stop printable render workers
+    from app.services.printable_service import close_render_pool
+    close_render_pool()
+    
     logger.info("Application shutdown complete")
 
 
@@ -101,6 +114,11 @@ def create_application() -> FastAPI:
             allowed_hosts=settings.allowed_hosts,
         )
     
+    app.add_middleware(
+        RequestSizeLimitMiddleware,
+        max_body_size=settings.max_request_size,
+    )
+    
     # Add exception handlers
     @app.exception_handler(ComplianceFactoryException)
     async def compliance_exception_handler(
@@ -180,5 +198,6 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=8000,
         reload=settings.debug,
+        loop="uvloop",
         log_config=None,  # Use our custom logging setup
     )
\ No newline at end of file
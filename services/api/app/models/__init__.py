@@ -4,6 +4,8 @@ from .base import Base
 from .validation import ValidationRun, ValidationError
 from .artifact import Artifact, ArtifactVersion
 from .operation import Operation, OperationLog
+from .conversion import ConversionCache
+from .storage import StoredObject
 
 __all__ = [
     "Base",
@@ -13,4 +15,6 @@ __all__ = [
     "ArtifactVersion", 
     "Operation",
     "OperationLog",
+    "ConversionCache",
+    "StoredObject",
 ]
\ No newline at end of file
@@ -0,0 +1,56 @@
+"""
+Database models for conversion result caching.
+"""
+
+from sqlalchemy import Column, ForeignKey, Integer, String, JSON, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID
+
+from .base import Base
+
+
+class ConversionCache(Base):
+    """Map converted input content to a previously stored conversion result."""
+    
+    __tablename__ = "conversion_cache"
+    __table_args__ = (
+        UniqueConstraint("content_hash", "target_format", name="uq_conversion_cache_key"),
+    )
+    
+    # Cache key
+    content_hash = Column(
+        String(64),
+        nullable=False,
+        doc="BLAKE2b-256 hex digest of the input document"
+    )
+    
+    target_format = Column(
+        String(8),
+        nullable=False,
+        doc="Target format of the conversion (json, xml)"
+    )
+    
+    # Cached result
+    output_size_bytes = Column(
+        Integer,
+        nullable=False,
+        doc="Size of the converted document in bytes"
+    )
+    
+    storage_info = Column(
+        JSON,
+        nullable=False,
+        doc="Storage location of the converted document"
+    )
+    
+    conversion_operation_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("operations.id", ondelete="SET NULL"),
+        nullable=True,
+        doc="Operation that produced the cached conversion"
+    )
+    
+    def __repr__(self) -> str:
+        return (
+            f"<ConversionCache(id={self.id}, hash='{self.content_hash[:12]}', "
+            f"target_format='{self.target_format}')>"
+        )
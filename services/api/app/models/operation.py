@@ -3,7 +3,7 @@ Database models for operation tracking and audit logs.
 """
 
 from sqlalchemy import (
-    Boolean, Column, DateTime, ForeignKey, Integer, String, Text, JSON, Enum
+    Boolean, Column, DateTime, ForeignKey, Index, Integer, String, Text, JSON, Enum, and_
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
@@ -21,6 +21,10 @@ class OperationStatus(str, enum.Enum):
     CANCELLED = "cancelled"
 
 
+# Statuses of operations that have not finished yet
+ACTIVE_STATUSES = (OperationStatus.PENDING, OperationStatus.RUNNING)
+
+
 class OperationType(str, enum.Enum):
     """Types of operations."""
     VALIDATION = "validation"
@@ -36,6 +40,10 @@ class Operation(Base):
     """Track long-running operations and their status."""
     
     __tablename__ = "operations"
+    __table_args__ = (
+        # Keyset pagination walks (created_at, id) newest first
+        Index("ix_operations_created_at_id", "created_at", "id"),
+    )
     
     # Operation identification
     operation_type = Column(
@@ -226,6 +234,24 @@ class Operation(Base):
             delta = self.completed_at - self.started_at
             self.duration_ms = int(delta.total_seconds() * 1000)
     
+    def status_values(self) -> dict:
+        """
+        Get the status tracking columns set by the mark_* methods.
+        
+        Lets callers persist a status change with a single UPDATE statement
+        instead of attaching the instance to a session.
+        """
+        return {
+            "status": self.status,
+            "progress_percent": self.progress_percent,
+            "started_at": self.started_at,
+            "completed_at": self.completed_at,
+            "duration_ms": self.duration_ms,
+            "output_data": self.output_data,
+            "error_message": self.error_message,
+            "error_details": self.error_details,
+        }
+    
     def __repr__(self) -> str:
         return (
             f"<Operation(id={self.id}, type='{self.operation_type}', "
@@ -233,10 +259,31 @@ class Operation(Base):
         )
 
 
+# Partial indexes for the operations stats queries. The planner can only use
+# them when the status is rendered inline (not as a bind parameter), so
+# queries relying on them pass the status with literal_execute=True.
+Index(
+    "ix_operations_active",
+    Operation.id,
+    postgresql_where=Operation.status.in_(ACTIVE_STATUSES),
+)
+Index(
+    "ix_operations_completed_created_at",
+    Operation.created_at,
+    postgresql_where=and_(
+        Operation.status == OperationStatus.COMPLETED,
+        Operation.duration_ms.isnot(None),
+    ),
+)
+
+
 class OperationLog(Base):
     """Log entries for operations."""
     
     __tablename__ = "operation_logs"
+    __table_args__ = (
+        Index("ix_operation_logs_operation_created_at_id", "operation_id", "created_at", "id"),
+    )
     
     # Link to operation
     operation_id = Column(
@@ -0,0 +1,43 @@
+"""
+Database models for content-addressed storage bookkeeping.
+"""
+
+from sqlalchemy import Column, Integer, String, UniqueConstraint
+
+from .base import Base
+
+
+class StoredObject(Base):
+    """Track how many records reference a shared storage object."""
+    
+    __tablename__ = "stored_objects"
+    __table_args__ = (
+        UniqueConstraint("bucket", "object_key", name="uq_stored_objects_location"),
+    )
+    
+    # Object location
+    bucket = Column(
+        String(255),
+        nullable=False,
+        doc="S3 bucket holding the object"
+    )
+    
+    object_key = Column(
+        String(1024),
+        nullable=False,
+        doc="Content-addressed S3 object key (sha256/<digest>.<ext>)"
+    )
+    
+    # Reference tracking
+    reference_count = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        doc="Number of artifacts and operations pointing at this object"
+    )
+    
+    def __repr__(self) -> str:
+        return (
+            f"<StoredObject(bucket='{self.bucket}', key='{self.object_key}', "
+            f"references={self.reference_count})>"
+        )
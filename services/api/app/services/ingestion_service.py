@@ -5,17 +5,19 @@ Provides functionality to ingest legacy document formats (primarily DOCX)
 and map them to OSCAL structures, particularly for SSP generation.
 """
 
+import asyncio
 import re
 import json
 import zipfile
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Union, Tuple
+from typing import BinaryIO, Dict, List, Optional, Any, Union, Tuple
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from uuid import uuid4
 import xml.etree.ElementTree as ET
 
 import structlog
+from lxml import etree
 from docx import Document
 from docx.document import Document as DocxDocument
 from docx.text.paragraph import Paragraph
@@ -23,6 +25,39 @@ from docx.table import Table
 
 logger = structlog.get_logger()
 
+# WordprocessingML element names used by the streaming analyzer
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+W_BODY = f"{{{W_NS}}}body"
+W_P = f"{{{W_NS}}}p"
+W_TBL = f"{{{W_NS}}}tbl"
+W_R = f"{{{W_NS}}}r"
+W_HYPERLINK = f"{{{W_NS}}}hyperlink"
+W_T = f"{{{W_NS}}}t"
+W_BR = f"{{{W_NS}}}br"
+W_PSTYLE = f"{{{W_NS}}}pPr/{{{W_NS}}}pStyle"
+W_STYLE = f"{{{W_NS}}}style"
+W_NAME = f"{{{W_NS}}}name"
+W_VAL = f"{{{W_NS}}}val"
+W_TYPE = f"{{{W_NS}}}type"
+W_STYLE_ID = f"{{{W_NS}}}styleId"
+W_DEFAULT = f"{{{W_NS}}}default"
+
+# Run children other than w:t and w:br that python-docx renders into text
+RUN_TEXT = {
+    f"{{{W_NS}}}tab": "\t",
+    f"{{{W_NS}}}ptab": "\t",
+    f"{{{W_NS}}}cr": "\n",
+    f"{{{W_NS}}}noBreakHyphen": "-",
+}
+
+# Built-in styles stored under lowercase names that python-docx reports capitalised
+UI_STYLE_NAMES = {
+    "caption": "Caption",
+    "footer": "Footer",
+    "header": "Header",
+    **{f"heading {level}": f"Heading {level}" for level in range(1, 10)},
+}
+
 
 @dataclass
 class IngestionResult:
@@ -72,6 +107,9 @@ class DocumentStructureAnalyzer:
             re.compile(r'^([A-Z]{2}-\d+(?:\.\d+)?)\s+(.+)', re.IGNORECASE),
             re.compile(r'Control\s+([A-Z]{2}-\d+)', re.IGNORECASE),
         ]
+        # Every control pattern is anchored at a control ID or "Control <ID>",
+        # so this cheap anchored check rejects most paragraphs up front
+        self.control_prefix = re.compile(r'(?:Control\s+)?[A-Z]{2}-\d', re.IGNORECASE)
         
         self.section_patterns = [
             re.compile(r'^\d+\.\s+(.+)', re.IGNORECASE),  # Numbered sections
@@ -127,6 +165,139 @@ class DocumentStructureAnalyzer:
         
         return structure
     
+    def analyze_docx_streaming(self, source: Union[str, Path, BinaryIO]) -> Dict[str, Any]:
+        """
+        Analyze document structure in a single streaming pass.
+        
+        Walks ``word/document.xml`` with ``iterparse`` instead of loading the
+        full python-docx object model, clearing each body element once it has
+        been inspected. Produces the same result shape as
+        ``analyze_document_structure``.
+        
+        Args:
+            source: Path to the DOCX file, or a seekable binary file object
+                such as an upload's spooled file
+            
+        Returns:
+            Dictionary with structure analysis results
+        """
+        structure = {
+            "total_paragraphs": 0,
+            "total_tables": 0,
+            "headings": [],
+            "sections": {},
+            "controls_identified": [],
+            "document_type": "unknown",
+            "potential_ssp_sections": [],
+        }
+        controls = []
+        
+        with zipfile.ZipFile(source) as archive:
+            style_names, default_style_name = self._paragraph_style_names(archive)
+            with archive.open("word/document.xml") as document_xml:
+                events = etree.iterparse(
+                    document_xml, events=("end",), tag=(W_P, W_TBL), resolve_entities=False
+                )
+                for _, element in events:
+                    # Paragraphs nested in tables are released with their table
+                    parent = element.getparent()
+                    if parent is None or parent.tag != W_BODY:
+                        continue
+                    
+                    if element.tag == W_TBL:
+                        structure["total_tables"] += 1
+                    else:
+                        index = structure["total_paragraphs"]
+                        structure["total_paragraphs"] += 1
+                        text = self._paragraph_text(element).strip()
+                        if text:
+                            style = element.find(W_PSTYLE)
+                            style_name = (
+                                style_names.get(style.get(W_VAL), default_style_name)
+                                if style is not None else default_style_name
+                            )
+                            if style_name.startswith('Heading') or self._is_likely_heading(text):
+                                structure["headings"].append({
+                                    "level": self._extract_heading_level(style_name),
+                                    "text": text,
+                                    "paragraph_index": index,
+                                })
+                            controls.extend(self._match_controls(text, index))
+                    
+                    element.clear()
+                    while element.getprevious() is not None:
+                        del parent[0]
+        
+        structure["potential_ssp_sections"] = self._identify_ssp_sections(structure["headings"])
+        structure["controls_identified"] = self._unique_controls(controls)
+        structure["document_type"] = self._determine_document_type(structure)
+        
+        return structure
+    
+    def _paragraph_style_names(self, archive: zipfile.ZipFile) -> Tuple[Dict[str, str], str]:
+        """
+        Map paragraph style IDs to the names python-docx reports for them.
+        
+        Paragraphs reference styles by ID, which differs from the name in
+        localized documents (e.g. ``berschrift1`` for "heading 1").
+        
+        Args:
+            archive: Open DOCX archive
+            
+        Returns:
+            Tuple of (style ID to name mapping, name of the default paragraph
+            style, used for paragraphs with no or an unknown style ID)
+        """
+        try:
+            styles_xml = archive.read("word/styles.xml")
+        except KeyError:
+            # python-docx falls back to its built-in styles, where Normal is the default
+            return {}, "Normal"
+        
+        style_names = {}
+        default_style_name = ""
+        root = etree.fromstring(styles_xml, etree.XMLParser(resolve_entities=False))
+        for style in root.iterchildren(W_STYLE):
+            if style.get(W_TYPE, "paragraph") != "paragraph":
+                continue
+            name = style.find(W_NAME)
+            name = name.get(W_VAL, "") if name is not None else ""
+            name = UI_STYLE_NAMES.get(name, name)
+            style_names.setdefault(style.get(W_STYLE_ID), name)
+            if style.get(W_DEFAULT) in ("1", "true", "on"):
+                default_style_name = name
+        
+        return style_names, default_style_name
+    
+    def _paragraph_text(self, paragraph) -> str:
+        """
+        Render a ``w:p`` element's text the way python-docx's ``Paragraph.text`` does.
+        
+        Runs are read directly and inside hyperlinks; tabs and text-wrapping
+        line breaks are rendered as whitespace, while page and column breaks
+        add nothing.
+        """
+        parts = []
+        for child in paragraph:
+            if child.tag == W_R:
+                runs = (child,)
+            elif child.tag == W_HYPERLINK:
+                runs = child.iterchildren(W_R)
+            else:
+                continue
+            
+            for run in runs:
+                for item in run:
+                    if item.tag == W_T:
+                        parts.append(item.text or "")
+                    elif item.tag == W_BR:
+                        if item.get(W_TYPE, "textWrapping") == "textWrapping":
+                            parts.append("\n")
+                    else:
+                        parts.append(RUN_TEXT.get(item.tag, ""))
+        
+        return "".join(parts)
+    
     def _is_likely_heading(self, text: str) -> bool:
         """Check if text is likely a heading based on patterns."""
         # Check for numbered sections
@@ -201,22 +372,33 @@ class DocumentStructureAnalyzer:
             if not text:
                 continue
             
-            # Check for control patterns
-            for pattern in self.control_patterns:
-                match = pattern.match(text)
-                if match:
-                    control_id = match.group(1).upper()
-                    control_title = match.group(2).strip() if len(match.groups()) > 1 else ""
-                    
-                    controls.append({
-                        "control_id": control_id,
-                        "control_title": control_title,
-                        "paragraph_index": i,
-                        "paragraph_text": text,
-                        "pattern_used": pattern.pattern
-                    })
+            controls.extend(self._match_controls(text, i))
+        
+        return self._unique_controls(controls)
+    
+    def _match_controls(self, text: str, paragraph_index: int) -> List[Dict]:
+        """Match control patterns against a single paragraph."""
+        controls = []
+        if not self.control_prefix.match(text):
+            return controls
         
-        # Remove duplicates based on control_id
+        for pattern in self.control_patterns:
+            match = pattern.match(text)
+            if match:
+                control_id = match.group(1).upper()
+                control_title = match.group(2).strip() if len(match.groups()) > 1 else ""
+                
+                controls.append({
+                    "control_id": control_id,
+                    "control_title": control_title,
+                    "paragraph_index": paragraph_index,
+                    "paragraph_text": text,
+                    "pattern_used": pattern.pattern
+                })
+        return controls
+    
+    def _unique_controls(self, controls: List[Dict]) -> List[Dict]:
+        """Remove duplicates based on control_id, keeping the first match."""
         unique_controls = {}
         for control in controls:
             if control["control_id"] not in unique_controls:
@@ -457,7 +639,8 @@ class DOCXToOSCALMapper:
                 paragraph_text = doc.paragraphs[i].text.strip()
                 
                 # Stop if we hit another control or major heading
-                if (any(pattern.match(paragraph_text) for pattern in self.analyzer.control_patterns) or
+                if ((self.analyzer.control_prefix.match(paragraph_text) and
+                     any(pattern.match(paragraph_text) for pattern in self.analyzer.control_patterns)) or
                     self.analyzer._is_likely_heading(paragraph_text)):
                     break
                 
@@ -626,6 +809,9 @@ class DocumentIngestionService:
         """
         Ingest a DOCX file and convert it to OSCAL format.
         
+        Parsing and mapping are synchronous python-docx/lxml work, so they run
+        in a worker thread to keep the event loop responsive.
+        
         Args:
             file_path: Path to DOCX file
             target_document_type: Target OSCAL document type
@@ -635,6 +821,18 @@ class DocumentIngestionService:
         Returns:
             Ingestion result with OSCAL document
         """
+        return await asyncio.to_thread(
+            self._ingest_docx_sync, file_path, target_document_type, system_id, document_title
+        )
+    
+    def _ingest_docx_sync(
+        self, 
+        file_path: Union[str, Path],
+        target_document_type: str,
+        system_id: Optional[str],
+        document_title: Optional[str]
+    ) -> IngestionResult:
+        """Parse, map and analyze a DOCX file; see ``ingest_docx``."""
         file_path = Path(file_path)
         start_time = datetime.now(timezone.utc)
         
@@ -7,6 +7,8 @@ logging, and result parsing. Supports OSCAL 1.1.3 schema validation and format c
 
 import asyncio
 import json
+import os
+import re
 import shutil
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Union
@@ -45,6 +47,111 @@ class ConversionResult(BaseModel):
     conversion_time_ms: int = Field(description="Time taken for conversion in milliseconds")
     file_size_bytes: int = Field(description="Size of converted file in bytes")
     errors: List[str] = Field(default_factory=list, description="Conversion errors if any")
+    document_kind: Optional[str] = Field(None, description="OSCAL model used for conversion")
+    return_code: int = Field(0, description="OSCAL CLI return code")
+    cli_stdout: str = Field("", description="OSCAL CLI standard output")
+    cli_stderr: str = Field("", description="OSCAL CLI standard error")
+    
+    @property
+    def duration_ms(self) -> int:
+        """Time taken for conversion in milliseconds."""
+        return self.conversion_time_ms
+    
+    @property
+    def error_message(self) -> Optional[str]:
+        """Combined conversion error message, if any."""
+        return "; ".join(self.errors) if self.errors else None
+
+
+# OSCAL model root elements mapped to their model-specific oscal-cli command.
+# Model-specific commands only load the bindings for that model, which is much
+# cheaper than the generic converter that loads every OSCAL model.
+OSCAL_MODEL_COMMANDS: Dict[str, str] = {
+    "catalog": "catalog",
+    "profile": "profile",
+    "component-definition": "component-definition",
+    "system-security-plan": "ssp",
+    "assessment-plan": "ap",
+    "assessment-results": "ar",
+    "plan-of-action-and-milestones": "poam",
+}
+
+# Number of leading bytes inspected to detect the OSCAL model
+DOCUMENT_KIND_PEEK_BYTES = 4096
+
+_JSON_ROOT_PATTERN = re.compile(
+    rb'^\s*\{\s*(?:"\$schema"\s*:\s*"[^"]*"\s*,\s*)?"([a-z-]+)"\s*:'
+)
+_XML_ROOT_PATTERN = re.compile(rb"<(?:[A-Za-z_][\w.-]*:)?([a-z-]+)[\s/>]")
+
+
+def detect_document_kind(head: bytes) -> Optional[str]:
+    """
+    Detect the OSCAL model of a document from its leading bytes.
+    
+    Args:
+        head: The first bytes of a JSON or XML OSCAL document
+        
+    Returns:
+        OSCAL model root name, or None if detection is ambiguous
+    """
+    head = head.lstrip(b"\xef\xbb\xbf")
+    pattern = _JSON_ROOT_PATTERN if head.lstrip().startswith(b"{") else _XML_ROOT_PATTERN
+    match = pattern.search(head)
+    if match is None:
+        return None
+    
+    kind = match.group(1).decode("ascii")
+    return kind if kind in OSCAL_MODEL_COMMANDS else None
+
+
+def detect_source_format(head: bytes) -> Optional[str]:
+    """
+    Detect whether a document is JSON or XML from its leading bytes.
+    
+    Args:
+        head: The first bytes of the document
+        
+    Returns:
+        "json" or "xml", or None if the content is neither
+    """
+    head = head.lstrip(b"\xef\xbb\xbf").lstrip()
+    if head[:1] in (b"{", b"["):
+        return "json"
+    if head[:1] == b"<":
+        return "xml"
+    return None
+
+
+def conversion_command(document_kind: Optional[str], target_format: str) -> tuple[str, ...]:
+    """
+    Build the OSCAL CLI arguments for a conversion.
+    
+    The model-specific converter is preferred; unknown models fall back to the
+    generic ``convert`` command.
+    
+    Args:
+        document_kind: OSCAL model of the source document, if known
+        target_format: Target format ("json" or "xml")
+        
+    Returns:
+        CLI arguments preceding the source and target paths
+    """
+    model_command = OSCAL_MODEL_COMMANDS.get(document_kind)
+    command = (model_command, "convert") if model_command else ("convert",)
+    return (*command, f"--to={target_format.lower()}")
+
+
+# Process-wide pool of OSCAL CLI worker slots, shared by all service instances
+_cli_worker_slots: Optional[asyncio.Semaphore] = None
+
+
+def _get_cli_worker_slots() -> asyncio.Semaphore:
+    """Get the shared semaphore bounding concurrent OSCAL CLI processes."""
+    global _cli_worker_slots
+    if _cli_worker_slots is None:
+        _cli_worker_slots = asyncio.Semaphore(get_settings().oscal_cli_workers)
+    return _cli_worker_slots
 
 
 class OSCALService:
@@ -55,6 +162,16 @@ class OSCALService:
         self.logger = structlog.get_logger(__name__)
         self.oscal_cli_path = self.settings.oscal_cli_path
         self._verify_oscal_cli()
+        
+        # The OSCAL CLI is a JVM application, so startup dominates small
+        # conversions. Tune the JVM for short-lived runs and bound how many
+        # run at once so concurrent requests don't thrash the CPU.
+        self._cli_env = {**os.environ}
+        if self.settings.oscal_cli_java_opts:
+            self._cli_env["JAVA_OPTS"] = " ".join(
+                filter(None, [os.environ.get("JAVA_OPTS"), self.settings.oscal_cli_java_opts])
+            )
+        self._cli_worker_slots = _get_cli_worker_slots()
     
     def _verify_oscal_cli(self) -> None:
         """Verify OSCAL CLI is available and executable."""
@@ -90,16 +207,29 @@ class OSCALService:
         self.logger.info("Executing OSCAL command", command=cmd, timeout=timeout)
         
         try:
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
-            
-            stdout, stderr = await asyncio.wait_for(
-                process.communicate(), 
-                timeout=timeout
-            )
+            # Wait for a free worker slot; the timeout only covers execution
+            async with self._cli_worker_slots:
+                process = await asyncio.create_subprocess_exec(
+                    *cmd,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    env=self._cli_env,
+                )
+                
+                try:
+                    stdout, stderr = await asyncio.wait_for(
+                        process.communicate(), 
+                        timeout=timeout
+                    )
+                finally:
+                    # On timeout or cancellation, kill the JVM and reap it
+                    # before the slot is released
+                    if process.returncode is None:
+                        try:
+                            process.kill()
+                        except ProcessLookupError:
+                            pass
+                        await process.wait()
             
             return_code = process.returncode or 0
             stdout_str = stdout.decode('utf-8') if stdout else ""
@@ -290,7 +420,8 @@ class OSCALService:
         source_path: Union[str, Path],
         target_path: Union[str, Path],
         target_format: str,
-        timeout: int = 300
+        timeout: int = 300,
+        document_kind: Optional[str] = None
     ) -> ConversionResult:
         """
         Convert OSCAL document between JSON and XML formats.
@@ -300,6 +431,7 @@ class OSCALService:
             target_path: Path where converted document should be saved
             target_format: Target format ("json" or "xml")
             timeout: Conversion timeout in seconds
+            document_kind: OSCAL model of the document; detected if not given
             
         Returns:
             ConversionResult with conversion details
@@ -325,12 +457,19 @@ class OSCALService:
         # Detect source format
         source_format = "xml" if source_path.suffix.lower() == ".xml" else "json"
         
+        # Prefer the model-specific converter; fall back to the generic one
+        if document_kind is None:
+            with open(source_path, "rb") as f:
+                document_kind = detect_document_kind(f.read(DOCUMENT_KIND_PEEK_BYTES))
+        command = conversion_command(document_kind, target_format)
+        
         self.logger.info(
             "Starting OSCAL format conversion",
             source_path=str(source_path),
             target_path=str(target_path),
             source_format=source_format,
-            target_format=target_format
+            target_format=target_format,
+            document_kind=document_kind
         )
         
         import time
@@ -342,8 +481,7 @@ class OSCALService:
             
             # Run conversion command
             return_code, stdout, stderr = await self._run_oscal_command([
-                "convert",
-                f"--to={target_format.lower()}",
+                *command,
                 str(source_path),
                 str(target_path)
             ], timeout)
@@ -370,7 +508,11 @@ class OSCALService:
                 target_format=target_format,
                 conversion_time_ms=conversion_time_ms,
                 file_size_bytes=file_size_bytes,
-                errors=errors
+                errors=errors,
+                document_kind=document_kind,
+                return_code=return_code,
+                cli_stdout=stdout,
+                cli_stderr=stderr
             )
             
             self.logger.info(
@@ -378,6 +520,7 @@ class OSCALService:
                 source_path=str(source_path),
                 target_path=str(target_path),
                 success=success,
+                document_kind=document_kind,
                 conversion_time_ms=conversion_time_ms,
                 file_size_bytes=file_size_bytes
             )
@@ -405,6 +548,35 @@ class OSCALService:
                 }
             )
     
+    async def convert_document(
+        self,
+        input_path: Union[str, Path],
+        output_path: Union[str, Path],
+        target_format: str,
+        timeout: int = 300,
+        document_kind: Optional[str] = None
+    ) -> ConversionResult:
+        """
+        Convert an OSCAL document, selecting the model-specific converter.
+        
+        Args:
+            input_path: Path to source document
+            output_path: Path where converted document should be saved
+            target_format: Target format ("json" or "xml")
+            timeout: Conversion timeout in seconds
+            document_kind: OSCAL model of the document; detected if not given
+            
+        Returns:
+            ConversionResult with conversion details
+        """
+        return await self.convert_format(
+            source_path=input_path,
+            target_path=output_path,
+            target_format=target_format,
+            timeout=timeout,
+            document_kind=document_kind
+        )
+    
     async def get_oscal_version(self) -> Dict[str, Any]:
         """
         Get OSCAL CLI version information.
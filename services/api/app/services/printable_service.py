@@ -6,6 +6,9 @@ documents using templates. Supports SSP, SAP, SAR, and POA&M generation.
 """
 
 import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Optional, Any, Union, Literal
 from dataclasses import dataclass
@@ -20,6 +23,8 @@ from jinja2 import Environment, FileSystemLoader, Template, select_autoescape
 from markdown import markdown
 import weasyprint
 
+from app.core.config import get_settings
+
 logger = structlog.get_logger()
 
 
@@ -682,6 +687,9 @@ class PrintableGenerationService:
     Orchestrates the generation of printable documents from OSCAL content.
     """
     
+    # Bumped whenever the built-in templates change, invalidating cached renders
+    template_version = "1.0"
+    
     def __init__(self, template_dir: Optional[Path] = None):
         self.logger = structlog.get_logger().bind(component="printable_service")
         self.processor = OSCALTemplateProcessor()
@@ -692,6 +700,38 @@ class PrintableGenerationService:
         oscal_document: Dict[str, Any],
         output_format: Literal["pdf", "html"] = "pdf",
         output_path: Optional[Path] = None
+    ) -> PrintableGenerationResult:
+        """
+        Generate a printable document from OSCAL content in a worker process.
+        
+        Jinja rendering and WeasyPrint layout are CPU-bound, so running them on
+        the event loop would stall every other request. Renders run in the
+        shared process pool, and the slots bound how many are queued at once.
+        
+        Args:
+            oscal_document: OSCAL document data
+            output_format: Output format (pdf, html)
+            output_path: Output file path (generated if not provided)
+            
+        Returns:
+            Generation result with file path and metadata
+        """
+        loop = asyncio.get_running_loop()
+        async with _get_render_slots():
+            return await loop.run_in_executor(
+                get_render_pool(),
+                _generate_printable_worker,
+                str(self.template_engine.template_dir),
+                oscal_document,
+                output_format,
+                output_path
+            )
+    
+    def generate_printable_sync(
+        self,
+        oscal_document: Dict[str, Any],
+        output_format: Literal["pdf", "html"] = "pdf",
+        output_path: Optional[Path] = None
     ) -> PrintableGenerationResult:
         """
         Generate a printable document from OSCAL content.
@@ -705,6 +745,7 @@ class PrintableGenerationService:
             Generation result with file path and metadata
         """
         start_time = datetime.now(timezone.utc)
+        created_path = None
         
         try:
             # Determine document type
@@ -737,12 +778,13 @@ class PrintableGenerationService:
                     metadata={"title": f"Generated {document_type.upper()}"}
                 )
             
-            # Generate output file path if not provided
+            # Generate output file path if not provided; renders run concurrently,
+            # so every one gets its own file rather than a per-second name
             if output_path is None:
-                suffix = f".{output_format}"
                 timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-                filename = f"{document_type}_{timestamp}{suffix}"
-                output_path = Path(tempfile.gettempdir()) / filename
+                fd, temp_name = tempfile.mkstemp(prefix=f"{document_type}_{timestamp}_", suffix=f".{output_format}")
+                os.close(fd)
+                output_path = created_path = Path(temp_name)
             
             # Render HTML
             html_content = self.template_engine.render_html(document_type, context)
@@ -756,6 +798,8 @@ class PrintableGenerationService:
                 self.template_engine.generate_pdf(html_content, output_path)
             
             else:
+                if created_path is not None:
+                    created_path.unlink(missing_ok=True)
                 return PrintableGenerationResult(
                     success=False,
                     document_type=document_type,
@@ -780,7 +824,7 @@ class PrintableGenerationService:
                     "document_title": context.metadata.get("title", "Generated Document"),
                     "controls_count": len(context.controls),
                     "components_count": len(context.components),
-                    "template_version": "1.0",
+                    "template_version": self.template_version,
                     "generated_at": start_time.isoformat(),
                 }
             )
@@ -789,6 +833,10 @@ class PrintableGenerationService:
             self.logger.error("Printable generation failed", error=str(e))
             duration = datetime.now(timezone.utc) - start_time
             
+            # Don't leave a partial render behind
+            if created_path is not None:
+                created_path.unlink(missing_ok=True)
+            
             return PrintableGenerationResult(
                 success=False,
                 document_type=self._detect_document_type(oscal_document),
@@ -808,4 +856,54 @@ class PrintableGenerationService:
         elif "plan-of-action-and-milestones" in oscal_document:
             return "poam"
         else:
-            return "unknown"
\ No newline at end of file
+            return "unknown"
+
+
+# Services used inside render worker processes, keyed by template directory
+_worker_services: Dict[str, PrintableGenerationService] = {}
+
+
+def _generate_printable_worker(
+    template_dir: str,
+    oscal_document: Dict[str, Any],
+    output_format: str,
+    output_path: Optional[Path]
+) -> PrintableGenerationResult:
+    """Render a printable document inside a pool worker process."""
+    service = _worker_services.get(template_dir)
+    if service is None:
+        service = _worker_services[template_dir] = PrintableGenerationService(Path(template_dir))
+    return service.generate_printable_sync(oscal_document, output_format, output_path)
+
+
+# Process pool shared by every printable generation request
+_render_pool: Optional[ProcessPoolExecutor] = None
+_render_slots: Optional[asyncio.Semaphore] = None
+
+
+def _get_render_slots() -> asyncio.Semaphore:
+    """Get the shared semaphore bounding queued and running renders."""
+    global _render_slots
+    if _render_slots is None:
+        _render_slots = asyncio.Semaphore(get_settings().printable_render_workers)
+    return _render_slots
+
+
+def get_render_pool() -> ProcessPoolExecutor:
+    """Get the global printable render process pool."""
+    global _render_pool
+    if _render_pool is None:
+        # Spawned workers avoid forking the running event loop and its threads
+        _render_pool = ProcessPoolExecutor(
+            max_workers=get_settings().printable_render_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _render_pool
+
+
+def close_render_pool() -> None:
+    """Shut down the global printable render process pool."""
+    global _render_pool
+    if _render_pool is not None:
+        _render_pool.shutdown(cancel_futures=True)
+        _render_pool = None
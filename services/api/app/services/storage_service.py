@@ -5,20 +5,51 @@ Handles secure upload/download of OSCAL documents, validation results,
 and generated artifacts with versioning, checksums, and audit trails.
 """
 
+import asyncio
 import hashlib
+import io
 import json
-from datetime import datetime, timezone
+import time
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
 from urllib.parse import quote
 
 import structlog
+import urllib3
+import zstandard
 from minio import Minio
 from minio.error import S3Error
 from pydantic import BaseModel, Field
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import get_settings
 from app.core.exceptions import StorageError
+from app.models import StoredObject
+
+
+# MIME types for stored artifacts, keyed by lowercase file suffix
+CONTENT_TYPES = {
+    ".json": "application/json",
+    ".xml": "application/xml",
+    ".pdf": "application/pdf",
+    ".md": "text/markdown",
+    ".txt": "text/plain",
+}
+
+# zstd level for compressed artifacts; level 3 compresses faster than the upload it shrinks
+ZSTD_COMPRESSION_LEVEL = 3
+
+# Chunk size used when streaming objects back to clients
+STREAM_CHUNK_SIZE = 64 * 1024  # 64KB
+
+# Lifetime of the presigned URLs returned when artifacts are stored
+PRESIGNED_URL_EXPIRY = timedelta(days=7)
+
+# S3 error codes meaning the object is absent
+MISSING_OBJECT_CODES = {"NoSuchKey", "NoSuchObject", "NotFound"}
 
 
 class StorageMetadata(BaseModel):
@@ -41,7 +72,7 @@ class UploadResult(BaseModel):
     success: bool = Field(description="Whether upload was successful")
     metadata: Optional[StorageMetadata] = Field(None, description="Upload metadata")
     public_url: Optional[str] = Field(None, description="Public URL if available")
-    presigned_url: Optional[str] = Field(None, description="Presigned URL for access")
+    presigned_url: Optional[str] = Field(None, description="Presigned URL for access; None for compressed objects")
     upload_time_ms: int = Field(description="Time taken for upload in milliseconds")
     errors: List[str] = Field(default_factory=list, description="Upload errors if any")
 
@@ -57,15 +88,46 @@ class DownloadResult(BaseModel):
     errors: List[str] = Field(default_factory=list, description="Download errors if any")
 
 
+class StorageResult(BaseModel):
+    """Location of an artifact stored under its content address."""
+    
+    success: bool = Field(description="Whether the artifact is available in storage")
+    bucket: str = Field(description="S3 bucket name")
+    object_key: str = Field(description="Content-addressed S3 object key")
+    url: Optional[str] = Field(None, description="Presigned URL for access; None for compressed objects")
+    checksum: str = Field(description="SHA-256 checksum of the stored content")
+    file_size_bytes: int = Field(description="File size in bytes")
+    content_type: str = Field(default="application/octet-stream", description="MIME content type")
+    original_filename: Optional[str] = Field(None, description="Filename supplied by the caller")
+    deduplicated: bool = Field(default=False, description="Whether the content was already stored")
+    content_encoding: Optional[str] = Field(None, description="Encoding of the stored bytes (zstd) if compressed")
+
+
 class StorageService:
     """Service for S3-compatible storage operations with MinIO."""
     
     def __init__(self) -> None:
         self.settings = get_settings()
         self.logger = structlog.get_logger(__name__)
+        self._http_client = self._create_http_client()
         self.client = self._create_client()
         self.bucket = self.settings.minio_bucket
+        self._bucket_ready = False
         
+    def _create_http_client(self) -> urllib3.PoolManager:
+        """Create the pooled HTTP client shared by all MinIO requests."""
+        return urllib3.PoolManager(
+            maxsize=self.settings.minio_max_pool_connections,
+            block=False,
+            timeout=urllib3.Timeout(connect=10, read=300),
+            retries=urllib3.Retry(
+                total=self.settings.minio_max_retries,
+                backoff_factor=0.2,
+                status_forcelist=[500, 502, 503, 504]
+            ),
+            cert_reqs="CERT_REQUIRED" if self.settings.minio_secure else "CERT_NONE"
+        )
+    
     def _create_client(self) -> Minio:
         """Create MinIO client with configuration."""
         try:
@@ -74,12 +136,14 @@ class StorageService:
                 access_key=self.settings.minio_access_key,
                 secret_key=self.settings.minio_secret_key,
                 secure=self.settings.minio_secure,
+                http_client=self._http_client,
             )
             
             self.logger.info(
                 "MinIO client created",
                 endpoint=self.settings.minio_endpoint,
-                secure=self.settings.minio_secure
+                secure=self.settings.minio_secure,
+                max_pool_connections=self.settings.minio_max_pool_connections
             )
             
             return client
@@ -101,6 +165,10 @@ class StorageService:
         
         return sha256_hash.hexdigest()
     
+    def _calculate_bytes_checksum(self, data: bytes) -> str:
+        """Calculate SHA-256 checksum for in-memory content."""
+        return hashlib.sha256(data).hexdigest()
+    
     def _generate_object_key(
         self, 
         file_path: Path, 
@@ -147,14 +215,7 @@ class StorageService:
         """Create metadata object for stored artifact."""
         
         # Determine content type
-        content_types = {
-            ".json": "application/json",
-            ".xml": "application/xml", 
-            ".pdf": "application/pdf",
-            ".md": "text/markdown",
-            ".txt": "text/plain",
-        }
-        content_type = content_types.get(file_path.suffix.lower(), "application/octet-stream")
+        content_type = CONTENT_TYPES.get(file_path.suffix.lower(), "application/octet-stream")
         
         return StorageMetadata(
             object_key=object_key,
@@ -168,6 +229,27 @@ class StorageService:
             tags=tags or {}
         )
     
+    def _compress_file(self, source_path: Path, target_path: Path) -> None:
+        """Write a zstd-compressed copy of a file using all cores."""
+        compressor = zstandard.ZstdCompressor(level=ZSTD_COMPRESSION_LEVEL, threads=-1)
+        with open(source_path, "rb") as source, open(target_path, "wb") as target:
+            compressor.copy_stream(source, target)
+    
+    def _compress_bytes(self, data: bytes) -> bytes:
+        """Return a zstd-compressed copy of in-memory content using all cores."""
+        compressor = zstandard.ZstdCompressor(level=ZSTD_COMPRESSION_LEVEL, threads=-1)
+        return compressor.compress(data)
+    
+    def _object_exists(self, bucket: str, object_key: str) -> bool:
+        """Check for an object with a HEAD request."""
+        try:
+            self.client.stat_object(bucket, object_key)
+            return True
+        except S3Error as e:
+            if e.code in MISSING_OBJECT_CODES:
+                return False
+            raise
+    
     async def ensure_bucket_exists(self) -> bool:
         """
         Ensure the configured bucket exists, create if necessary.
@@ -175,6 +257,9 @@ class StorageService:
         Returns:
             True if bucket exists or was created successfully
         """
+        if self._bucket_ready:
+            return True
+        
         try:
             if not self.client.bucket_exists(self.bucket):
                 self.logger.info("Creating storage bucket", bucket=self.bucket)
@@ -200,6 +285,7 @@ class StorageService:
                     self.logger.warning("Could not set bucket policy", bucket=self.bucket)
             
             self.logger.info("Storage bucket ready", bucket=self.bucket)
+            self._bucket_ready = True
             return True
             
         except Exception as e:
@@ -209,6 +295,28 @@ class StorageService:
                 details={"bucket": self.bucket}
             )
     
+    async def health_check(self) -> Dict[str, Any]:
+        """
+        Verify storage connectivity and that the bucket is ready.
+        
+        Returns:
+            Dictionary with health information
+            
+        Raises:
+            StorageError: If the bucket cannot be accessed or created
+        """
+        await self.ensure_bucket_exists()
+        return {
+            "status": "healthy",
+            "endpoint": self.settings.minio_endpoint,
+            "bucket": self.bucket,
+        }
+    
+    def close(self) -> None:
+        """Close pooled connections to storage."""
+        self._http_client.clear()
+        self.logger.info("Storage connections closed")
+    
     async def upload_file(
         self,
         file_path: Union[str, Path],
@@ -246,7 +354,6 @@ class StorageService:
             version=version
         )
         
-        import time
         start_time = time.time()
         
         try:
@@ -283,11 +390,10 @@ class StorageService:
             # Generate presigned URL for access (valid for 7 days)
             presigned_url = None
             try:
-                from datetime import timedelta
                 presigned_url = self.client.presigned_get_object(
                     bucket_name=self.bucket,
                     object_name=object_key,
-                    expires=timedelta(days=7)
+                    expires=PRESIGNED_URL_EXPIRY
                 )
             except Exception as e:
                 self.logger.warning("Could not generate presigned URL", error=str(e))
@@ -323,6 +429,337 @@ class StorageService:
                 errors=[f"Upload failed: {str(e)}"]
             )
     
+    async def store_artifact(
+        self,
+        file_path: Union[str, Path],
+        artifact_type: str,
+        original_filename: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        compress: bool = False,
+        reference_session: Optional[AsyncSession] = None
+    ) -> StorageResult:
+        """
+        Store a file under its content address, skipping the upload if present.
+        
+        Objects are keyed as ``sha256/<digest><ext>``. A HEAD request is issued
+        first and the file is only PUT when the object does not exist yet, so
+        identical outputs share a single object. Callers that persist the
+        returned location pass ``reference_session``: the reference is then
+        acquired before the HEAD request, so a concurrent delete of the last
+        other reference either finishes first, and the file is uploaded again,
+        or sees the new reference and keeps the object.
+        
+        Compressed objects are stored under a ``.zst`` key with the codec in
+        custom ``compression`` metadata, not as ``Content-Encoding``, and get
+        no presigned URL: they are only served through API download paths,
+        which negotiate the encoding with the client. The checksum always
+        covers the uncompressed content.
+        
+        Args:
+            file_path: Path to file to store
+            artifact_type: Type of artifact (oscal, converted, printable, etc.)
+            original_filename: Filename supplied by the caller
+            metadata: Caller metadata, logged with the upload
+            compress: Whether to store the content zstd-compressed
+            reference_session: Session to acquire a reference to the object
+                in; the caller commits it
+            
+        Returns:
+            StorageResult with the object location
+            
+        Raises:
+            StorageError: If the file is missing or the upload fails
+        """
+        file_path = Path(file_path)
+        
+        if not file_path.exists():
+            raise StorageError(
+                f"File not found: {file_path}",
+                details={"file_path": str(file_path)}
+            )
+        
+        start_time = time.time()
+        
+        try:
+            await self.ensure_bucket_exists()
+            
+            # Hashing reads the whole file and the MinIO client blocks, so file
+            # and network calls run in worker threads
+            checksum = await asyncio.to_thread(self._calculate_checksum, file_path)
+            suffix = file_path.suffix.lower()
+            content_encoding = "zstd" if compress else None
+            object_key = f"sha256/{checksum}{suffix}" + (".zst" if compress else "")
+            content_type = CONTENT_TYPES.get(suffix, "application/octet-stream")
+            file_size_bytes = file_path.stat().st_size
+            
+            if reference_session is not None:
+                await acquire_object_reference(reference_session, self.bucket, object_key)
+            deduplicated = await asyncio.to_thread(self._object_exists, self.bucket, object_key)
+            if not deduplicated:
+                s3_metadata = {
+                    "artifact-type": artifact_type,
+                    "sha256-checksum": checksum,
+                    "uploaded-at": datetime.now(timezone.utc).isoformat(),
+                }
+                
+                if compress:
+                    upload_path = file_path.with_name(f"{file_path.name}.zst")
+                    await asyncio.to_thread(self._compress_file, file_path, upload_path)
+                    s3_metadata["compression"] = content_encoding
+                else:
+                    upload_path = file_path
+                
+                try:
+                    await asyncio.to_thread(
+                        self.client.fput_object,
+                        bucket_name=self.bucket,
+                        object_name=object_key,
+                        file_path=str(upload_path),
+                        content_type=content_type,
+                        metadata=s3_metadata
+                    )
+                finally:
+                    if compress:
+                        upload_path.unlink(missing_ok=True)
+            
+            # Compressed bytes would reach clients that never negotiated zstd
+            url = None if compress else await asyncio.to_thread(
+                self.client.presigned_get_object,
+                bucket_name=self.bucket,
+                object_name=object_key,
+                expires=PRESIGNED_URL_EXPIRY
+            )
+            
+            self.logger.info(
+                "Artifact stored",
+                object_key=object_key,
+                artifact_type=artifact_type,
+                original_filename=original_filename,
+                size_bytes=file_size_bytes,
+                deduplicated=deduplicated,
+                store_time_ms=int((time.time() - start_time) * 1000),
+                metadata=metadata
+            )
+            
+            return StorageResult(
+                success=True,
+                bucket=self.bucket,
+                object_key=object_key,
+                url=url,
+                checksum=checksum,
+                file_size_bytes=file_size_bytes,
+                content_type=content_type,
+                original_filename=original_filename,
+                deduplicated=deduplicated,
+                content_encoding=content_encoding
+            )
+            
+        except StorageError:
+            raise
+        except Exception as e:
+            self.logger.error(
+                "Failed to store artifact",
+                file_path=str(file_path),
+                error=str(e)
+            )
+            raise StorageError(
+                f"Failed to store artifact: {str(e)}",
+                details={"file_path": str(file_path), "artifact_type": artifact_type}
+            )
+    
+    async def store_artifact_bytes(
+        self,
+        data: bytes,
+        artifact_type: str,
+        original_filename: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        compress: bool = False,
+        reference_session: Optional[AsyncSession] = None
+    ) -> StorageResult:
+        """
+        Store in-memory content under its content address.
+        
+        Behaves like ``store_artifact`` but uploads the bytes directly, so
+        generated documents do not need a temp-file round trip. The object
+        extension and content type come from ``original_filename``. Storage
+        calls run in worker threads, so other coroutines keep running while
+        the upload is in flight.
+        
+        Args:
+            data: Content to store
+            artifact_type: Type of artifact (oscal, converted, printable, etc.)
+            original_filename: Filename supplied by the caller
+            metadata: Caller metadata, logged with the upload
+            compress: Whether to store the content zstd-compressed
+            reference_session: Session to acquire a reference to the object
+                in; the caller commits it
+            
+        Returns:
+            StorageResult with the object location
+            
+        Raises:
+            StorageError: If the upload fails
+        """
+        start_time = time.time()
+        
+        try:
+            await self.ensure_bucket_exists()
+            
+            # Hashing and compressing whole artifacts is CPU-bound and the MinIO
+            # client blocks, so both run in worker threads
+            checksum = await asyncio.to_thread(self._calculate_bytes_checksum, data)
+            suffix = Path(original_filename).suffix.lower() if original_filename else ""
+            content_encoding = "zstd" if compress else None
+            object_key = f"sha256/{checksum}{suffix}" + (".zst" if compress else "")
+            content_type = CONTENT_TYPES.get(suffix, "application/octet-stream")
+            
+            if reference_session is not None:
+                await acquire_object_reference(reference_session, self.bucket, object_key)
+            deduplicated = await asyncio.to_thread(self._object_exists, self.bucket, object_key)
+            if not deduplicated:
+                s3_metadata = {
+                    "artifact-type": artifact_type,
+                    "sha256-checksum": checksum,
+                    "uploaded-at": datetime.now(timezone.utc).isoformat(),
+                }
+                
+                if compress:
+                    payload = await asyncio.to_thread(self._compress_bytes, data)
+                    s3_metadata["compression"] = content_encoding
+                else:
+                    payload = data
+                
+                await asyncio.to_thread(
+                    self.client.put_object,
+                    bucket_name=self.bucket,
+                    object_name=object_key,
+                    data=io.BytesIO(payload),
+                    length=len(payload),
+                    content_type=content_type,
+                    metadata=s3_metadata
+                )
+            
+            # Compressed bytes would reach clients that never negotiated zstd
+            url = None if compress else await asyncio.to_thread(
+                self.client.presigned_get_object,
+                bucket_name=self.bucket,
+                object_name=object_key,
+                expires=PRESIGNED_URL_EXPIRY
+            )
+            
+            self.logger.info(
+                "Artifact stored",
+                object_key=object_key,
+                artifact_type=artifact_type,
+                original_filename=original_filename,
+                size_bytes=len(data),
+                deduplicated=deduplicated,
+                store_time_ms=int((time.time() - start_time) * 1000),
+                metadata=metadata
+            )
+            
+            return StorageResult(
+                success=True,
+                bucket=self.bucket,
+                object_key=object_key,
+                url=url,
+                checksum=checksum,
+                file_size_bytes=len(data),
+                content_type=content_type,
+                original_filename=original_filename,
+                deduplicated=deduplicated,
+                content_encoding=content_encoding
+            )
+            
+        except Exception as e:
+            self.logger.error(
+                "Failed to store artifact",
+                original_filename=original_filename,
+                error=str(e)
+            )
+            raise StorageError(
+                f"Failed to store artifact: {str(e)}",
+                details={"original_filename": original_filename, "artifact_type": artifact_type}
+            )
+    
+    async def object_exists(self, bucket: str, object_key: str) -> bool:
+        """
+        Check whether an object is present in storage.
+        
+        Args:
+            bucket: S3 bucket name
+            object_key: S3 object key
+            
+        Returns:
+            True if the object exists
+        """
+        return await asyncio.to_thread(self._object_exists, bucket, object_key)
+    
+    async def get_download_url(
+        self,
+        bucket: str,
+        object_key: str,
+        expires_in: int = 3600,
+        response_headers: Optional[Dict[str, str]] = None
+    ) -> str:
+        """
+        Generate a presigned download URL for a stored object.
+        
+        Args:
+            bucket: S3 bucket name
+            object_key: S3 object key
+            expires_in: URL lifetime in seconds
+            response_headers: S3 response header overrides, e.g.
+                ``response-content-disposition``, signed into the URL
+            
+        Returns:
+            Presigned GET URL
+        """
+        return await asyncio.to_thread(
+            self.client.presigned_get_object,
+            bucket_name=bucket,
+            object_name=object_key,
+            expires=timedelta(seconds=expires_in),
+            response_headers=response_headers
+        )
+    
+    async def stream_object(
+        self,
+        bucket: str,
+        object_key: str,
+        chunk_size: int = STREAM_CHUNK_SIZE,
+        decompress: bool = False
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream an object's content in fixed-size chunks.
+        
+        The MinIO client is synchronous, so each read runs in a worker thread.
+        Requests reuse the client's pooled keep-alive connections. Stored bytes
+        are yielded as-is unless ``decompress`` is set for a zstd object.
+        
+        Args:
+            bucket: S3 bucket name
+            object_key: S3 object key
+            chunk_size: Size of each read from storage in bytes
+            decompress: Whether to zstd-decompress the object while streaming
+            
+        Yields:
+            Chunks of object content
+        """
+        decompressor = zstandard.ZstdDecompressor().decompressobj() if decompress else None
+        response = await asyncio.to_thread(self.client.get_object, bucket, object_key)
+        try:
+            while chunk := await asyncio.to_thread(
+                response.read, chunk_size, decode_content=False
+            ):
+                if decompressor is None:
+                    yield chunk
+                elif data := decompressor.decompress(chunk):
+                    yield data
+        finally:
+            response.close()
+            response.release_conn()
+    
     async def download_file(
         self,
         object_key: str,
@@ -348,7 +785,6 @@ class StorageService:
             local_path=str(local_path)
         )
         
-        import time
         start_time = time.time()
         
         try:
@@ -528,18 +964,23 @@ class StorageService:
                 details={"artifact_type": artifact_type, "prefix": prefix}
             )
     
-    async def delete_artifact(self, object_key: str) -> bool:
+    async def delete_artifact(self, object_key: str, bucket: Optional[str] = None) -> bool:
         """
         Delete artifact from storage.
         
+        Content-addressed objects may be shared; release the caller's reference
+        with ``release_object_reference`` and commit, then only delete objects
+        claimed with ``claim_unreferenced_object``.
+        
         Args:
             object_key: S3 object key to delete
+            bucket: S3 bucket name, defaults to the configured bucket
             
         Returns:
             True if deletion was successful
         """
         try:
-            self.client.remove_object(self.bucket, object_key)
+            self.client.remove_object(bucket or self.bucket, object_key)
             
             self.logger.info("Artifact deleted", object_key=object_key)
             return True
@@ -599,6 +1040,110 @@ class StorageService:
             }
 
 
+async def acquire_object_reference(
+    db: AsyncSession,
+    bucket: str,
+    object_key: str
+) -> None:
+    """
+    Record one more reference to a stored object.
+    
+    Args:
+        db: Database session, committed by the caller
+        bucket: S3 bucket name
+        object_key: S3 object key
+    """
+    statement = pg_insert(StoredObject).values(
+        bucket=bucket,
+        object_key=object_key,
+        reference_count=1
+    )
+    await db.execute(
+        statement.on_conflict_do_update(
+            index_elements=["bucket", "object_key"],
+            set_={"reference_count": StoredObject.reference_count + 1}
+        )
+    )
+
+
+async def release_object_reference(
+    db: AsyncSession,
+    bucket: str,
+    object_key: str
+) -> int:
+    """
+    Drop one reference to a stored object.
+    
+    Objects stored before reference tracking have no row and are treated as
+    unshared.
+    
+    Args:
+        db: Database session, committed by the caller
+        bucket: S3 bucket name
+        object_key: S3 object key
+        
+    Returns:
+        Number of references still held; the object may be deleted at zero
+    """
+    result = await db.execute(
+        update(StoredObject)
+        .where(
+            StoredObject.bucket == bucket,
+            StoredObject.object_key == object_key,
+            StoredObject.reference_count > 0
+        )
+        .values(reference_count=StoredObject.reference_count - 1)
+        .returning(StoredObject.reference_count)
+    )
+    remaining = result.scalar_one_or_none()
+    return remaining or 0
+
+
+async def claim_unreferenced_object(
+    db: AsyncSession,
+    bucket: str,
+    object_key: str
+) -> bool:
+    """
+    Claim a stored object whose last reference was released, for deletion.
+    
+    The object's zero-count row is deleted and stays locked until the caller
+    commits, so a store of the same content that arrives meanwhile waits to
+    acquire its reference and then uploads the object again. Delete the
+    object before committing.
+    
+    Objects stored before reference tracking have no row and are claimed
+    unless a reference has been acquired since.
+    
+    Args:
+        db: Database session, committed by the caller
+        bucket: S3 bucket name
+        object_key: S3 object key
+        
+    Returns:
+        Whether the object is unreferenced and may be deleted
+    """
+    result = await db.execute(
+        delete(StoredObject)
+        .where(
+            StoredObject.bucket == bucket,
+            StoredObject.object_key == object_key,
+            StoredObject.reference_count == 0
+        )
+        .returning(StoredObject.id)
+    )
+    if result.scalar_one_or_none() is not None:
+        return True
+    
+    referenced = await db.scalar(
+        select(StoredObject.id).where(
+            StoredObject.bucket == bucket,
+            StoredObject.object_key == object_key
+        )
+    )
+    return referenced is None
+
+
 # Global service instance
 _storage_service: Optional[StorageService] = None
 
@@ -608,4 +1153,12 @@ def get_storage_service() -> StorageService:
     global _storage_service
     if _storage_service is None:
         _storage_service = StorageService()
-    return _storage_service
\ No newline at end of file
+    return _storage_service
+
+
+def close_storage_service() -> None:
+    """Close the global storage service's connections."""
+    global _storage_service
+    if _storage_service is not None:
+        _storage_service.close()
+        _storage_service = None
\ No newline at end of file
@@ -286,7 +286,7 @@ def mock_fedramp_service():
     from app.services.fedramp_service import FedRAMPValidationResult, FedRAMPValidationIssue
     
     mock_service = Mock()
-    mock_service.validate_document = AsyncMock(return_value=FedRAMPValidationResult(
+    mock_service.validate_bytes_in_pool = AsyncMock(return_value=FedRAMPValidationResult(
         is_compliant=True,
         baseline="moderate",
         document_type="system-security-plan",
@@ -295,7 +295,7 @@ def mock_fedramp_service():
         metadata={"controls_validated": 25}
     ))
     
-    mock_service.get_baseline_requirements = AsyncMock(return_value={
+    mock_service.get_baseline_requirements = Mock(return_value={
         "required_controls": ["ac-1", "ac-2", "ac-3"],
         "min_controls": 3,
         "required_metadata": ["system_name", "system_id"]
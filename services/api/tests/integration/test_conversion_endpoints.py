@@ -0,0 +1,481 @@
+"""
+Integration tests for conversion API endpoints.
+
+Tests the background conversion path taken by uploads larger than the
+async conversion threshold, encoding negotiation on converted file
+downloads, and the conversion cache shared by single and batch conversions.
+"""
+
+import hashlib
+import json
+import pytest
+import pytest_asyncio
+import zstandard
+from contextlib import asynccontextmanager
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from sqlalchemy import select, update
+
+from app.core.config import get_settings
+from app.core.exceptions import ConversionError
+from app.models import ConversionCache, Operation, StoredObject
+from app.models.operation import OperationStatus, OperationType
+from app.services.oscal_service import ConversionResult
+from app.services.storage_service import StorageResult
+
+
+# Output recorded by a successful conversion
+CONVERTED_OUTPUT = {
+    "output_filename": "test_ssp.xml",
+    "conversion_time_ms": 300,
+    "cache_hit": False,
+    "output_size_bytes": 2048,
+    "storage_info": None,
+}
+
+
+@pytest.fixture
+def background_conversion(test_session):
+    """Send every upload down the background path, sharing the test session."""
+    @asynccontextmanager
+    async def get_test_session():
+        yield test_session
+    
+    with patch.object(get_settings(), "async_conversion_threshold", 64), \
+            patch("app.api.endpoints.conversion.get_async_session", get_test_session):
+        yield
+
+
+class TestBackgroundConversion:
+    """Integration tests for the 202 background conversion path."""
+
+    @patch('app.api.endpoints.conversion._perform_conversion')
+    def test_large_upload_accepted_and_converted(self, mock_convert, test_client: TestClient, background_conversion, sample_ssp):
+        """Test that a large upload returns 202 and the job completes the operation."""
+        job_inputs = []
+
+        async def convert(db, operation, input_file, job_dir, *args):
+            job_inputs.append((input_file, input_file.read_bytes()))
+            operation.mark_completed(CONVERTED_OUTPUT)
+            return CONVERTED_OUTPUT
+        
+        mock_convert.side_effect = convert
+        
+        file_content = json.dumps(sample_ssp).encode('utf-8')
+        files = {"file": ("test_ssp.json", file_content, "application/json")}
+        data = {"target_format": "xml", "store_result": "false"}
+        
+        response = test_client.post("/api/v1/convert/file", files=files, data=data)
+        
+        assert response.status_code == 202
+        response_data = response.json()
+        
+        operation_id = response_data["operation_id"]
+        assert response_data["status"] == "pending"
+        assert response_data["source_format"] == "json"
+        assert response_data["status_url"] == f"/api/v1/convert/operations/{operation_id}"
+        
+        # The job saw the spooled upload and removed its scratch directory
+        input_file, spooled = job_inputs[0]
+        assert spooled == file_content
+        assert input_file.name == "input.json"
+        assert not input_file.parent.exists()
+        
+        status = test_client.get(response_data["status_url"]).json()
+        assert status["status"] == "completed"
+        assert status["output_data"] == CONVERTED_OUTPUT
+
+    @patch('app.api.endpoints.conversion._perform_conversion')
+    def test_large_upload_conversion_failure(self, mock_convert, test_client: TestClient, background_conversion, sample_ssp):
+        """Test that a failed background job marks the operation failed."""
+        job_dirs = []
+
+        async def convert(db, operation, input_file, job_dir, *args):
+            job_dirs.append(job_dir)
+            raise ConversionError("CLI exited with status 1")
+        
+        mock_convert.side_effect = convert
+        
+        file_content = json.dumps(sample_ssp).encode('utf-8')
+        files = {"file": ("test_ssp.json", file_content, "application/json")}
+        data = {"target_format": "xml", "store_result": "false"}
+        
+        response = test_client.post("/api/v1/convert/file", files=files, data=data)
+        
+        assert response.status_code == 202
+        assert not Path(job_dirs[0]).exists()
+        
+        status = test_client.get(response.json()["status_url"]).json()
+        assert status["status"] == "failed"
+        assert "CLI exited with status 1" in status["error_message"]
+
+    @patch('app.api.endpoints.conversion._perform_conversion')
+    def test_large_upload_cancelled_mid_job(self, mock_convert, test_client: TestClient, background_conversion, sample_ssp):
+        """Test that a cancellation made while the job runs is not overwritten."""
+        async def convert(db, operation, input_file, job_dir, *args):
+            # Cancel the operation as POST /operations/{id}/cancel would
+            await db.execute(
+                update(Operation)
+                .where(Operation.id == operation.id)
+                .values(status=OperationStatus.CANCELLED, error_message="Operation cancelled by user")
+            )
+            await db.commit()
+            
+            operation.mark_completed(CONVERTED_OUTPUT)
+            return CONVERTED_OUTPUT
+        
+        mock_convert.side_effect = convert
+        
+        file_content = json.dumps(sample_ssp).encode('utf-8')
+        files = {"file": ("test_ssp.json", file_content, "application/json")}
+        data = {"target_format": "xml", "store_result": "false"}
+        
+        response = test_client.post("/api/v1/convert/file", files=files, data=data)
+        
+        assert response.status_code == 202
+        
+        status = test_client.get(response.json()["status_url"]).json()
+        assert status["status"] == "cancelled"
+        assert status["output_data"] is None
+
+    @patch('app.api.endpoints.conversion._perform_conversion')
+    def test_large_upload_database_error(self, mock_convert, test_client: TestClient, background_conversion, sample_ssp):
+        """Test that a database error in the job is rolled back and recorded as a failure."""
+        async def convert(db, operation, input_file, job_dir, *args):
+            # A failed flush leaves the session needing a rollback
+            db.add(Operation(operation_type=OperationType.CONVERSION))
+            await db.flush()
+        
+        mock_convert.side_effect = convert
+        
+        file_content = json.dumps(sample_ssp).encode('utf-8')
+        files = {"file": ("test_ssp.json", file_content, "application/json")}
+        data = {"target_format": "xml", "store_result": "false"}
+        
+        response = test_client.post("/api/v1/convert/file", files=files, data=data)
+        
+        assert response.status_code == 202
+        
+        status = test_client.get(response.json()["status_url"]).json()
+        assert status["status"] == "failed"
+        assert status["error_message"]
+
+    @patch('app.api.endpoints.conversion._perform_conversion')
+    def test_small_upload_converted_inline(self, mock_convert, test_client: TestClient, sample_ssp):
+        """Test that uploads under the threshold are not queued."""
+        async def convert(db, operation, input_file, job_dir, *args):
+            operation.mark_completed(CONVERTED_OUTPUT)
+            return CONVERTED_OUTPUT
+        
+        mock_convert.side_effect = convert
+        
+        file_content = json.dumps(sample_ssp).encode('utf-8')
+        files = {"file": ("test_ssp.json", file_content, "application/json")}
+        data = {"target_format": "xml", "store_result": "false"}
+        
+        response = test_client.post("/api/v1/convert/file", files=files, data=data)
+        
+        assert response.status_code == 200
+        response_data = response.json()
+        
+        assert response_data["success"] is True
+        assert response_data["output_filename"] == "test_ssp.xml"
+        mock_convert.assert_called_once()
+
+    @patch('app.api.endpoints.conversion._perform_conversion')
+    async def test_small_upload_failure_rolled_back(self, mock_convert, test_client: TestClient, test_session, sample_ssp):
+        """Test that an inline failure discards the request's writes and records the failed operation."""
+        async def convert(db, operation, input_file, job_dir, *args):
+            db.add(StoredObject(bucket="test-bucket", object_key="sha256/partial.xml", reference_count=1))
+            raise RuntimeError("storage unavailable")
+        
+        mock_convert.side_effect = convert
+        
+        file_content = json.dumps(sample_ssp).encode('utf-8')
+        files = {"file": ("test_ssp.json", file_content, "application/json")}
+        
+        response = test_client.post("/api/v1/convert/file", files=files, data={"target_format": "xml"})
+        
+        assert response.status_code == 500
+        
+        operation = await test_session.scalar(select(Operation))
+        assert operation.status == OperationStatus.FAILED
+        assert operation.error_details["exception_type"] == "RuntimeError"
+        assert await test_session.scalar(select(StoredObject)) is None
+
+
+CONVERTED_XML = b"<system-security-plan/>" * 64
+
+
+def _compressed_object_stream(content: bytes):
+    """Fake stream_object for an object stored zstd-compressed."""
+    compressed = zstandard.ZstdCompressor().compress(content)
+
+    async def stream_object(bucket, object_key, decompress=False):
+        yield content if decompress else compressed
+    
+    return stream_object
+
+
+@pytest_asyncio.fixture
+async def converted_operation(test_session):
+    """Factory for a completed conversion whose output is in storage."""
+    async def create(output_size_bytes=len(CONVERTED_XML), content_encoding="zstd"):
+        operation = Operation(
+            operation_type=OperationType.CONVERSION,
+            operation_name="Convert test_ssp.json to XML",
+            status=OperationStatus.COMPLETED,
+            output_data={
+                "output_filename": "test_ssp.xml",
+                "output_size_bytes": output_size_bytes,
+                "storage_info": {
+                    "bucket": "test-bucket",
+                    "object_key": "sha256/abc123.xml.zst",
+                    "content_type": "application/xml",
+                    "content_encoding": content_encoding,
+                },
+            },
+        )
+        test_session.add(operation)
+        await test_session.commit()
+        return f"/api/v1/convert/download/{operation.id}"
+    
+    return create
+
+
+class TestConvertedDownload:
+    """Integration tests for Accept-Encoding negotiation on downloads."""
+
+    @pytest.mark.parametrize("accept_encoding,passthrough", [
+        ("gzip, zstd", True),
+        ("*", True),
+        ("gzip;q=1.0, ZSTD;q=0.5", True),
+        ("gzip", False),
+        ("", False),
+        ("zstd;q=0, gzip", False),
+        ("gzip, *;q=0", False),
+    ])
+    @patch('app.api.endpoints.conversion.storage_service.stream_object')
+    async def test_small_compressed_download(self, mock_stream, test_client: TestClient, converted_operation, accept_encoding, passthrough):
+        """Test that zstd is sent only to clients accepting it and decompressed for others."""
+        mock_stream.side_effect = _compressed_object_stream(CONVERTED_XML)
+        url = await converted_operation()
+        
+        response = test_client.get(url, headers={"Accept-Encoding": accept_encoding})
+        
+        assert response.status_code == 200
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert mock_stream.call_args.kwargs["decompress"] is not passthrough
+        if passthrough:
+            assert response.headers["content-encoding"] == "zstd"
+        else:
+            assert "content-encoding" not in response.headers
+            assert response.headers["content-length"] == str(len(CONVERTED_XML))
+            assert response.content == CONVERTED_XML
+
+    @patch('app.api.endpoints.conversion.storage_service.get_download_url', new_callable=AsyncMock)
+    async def test_large_compressed_download_redirects_zstd_clients(self, mock_presign, test_client: TestClient, converted_operation):
+        """Test that a large file redirects with the encoding signed into the URL."""
+        mock_presign.return_value = "https://storage.example/object"
+        url = await converted_operation(output_size_bytes=get_settings().download_stream_threshold + 1)
+        
+        response = test_client.get(url, headers={"Accept-Encoding": "zstd"}, follow_redirects=False)
+        
+        assert response.status_code == 302
+        assert response.headers["location"] == "https://storage.example/object"
+        assert response.headers["vary"] == "Accept-Encoding"
+        
+        response_headers = mock_presign.call_args.kwargs["response_headers"]
+        assert response_headers["response-content-encoding"] == "zstd"
+        assert response_headers["response-content-type"] == "application/xml"
+
+    @patch('app.api.endpoints.conversion.storage_service.get_download_url', new_callable=AsyncMock)
+    @patch('app.api.endpoints.conversion.storage_service.stream_object')
+    async def test_large_compressed_download_decompressed_for_others(self, mock_stream, mock_presign, test_client: TestClient, converted_operation):
+        """Test that a large file is streamed decompressed rather than redirected to zstd bytes."""
+        mock_stream.side_effect = _compressed_object_stream(CONVERTED_XML)
+        url = await converted_operation(output_size_bytes=get_settings().download_stream_threshold + 1)
+        
+        response = test_client.get(url, headers={"Accept-Encoding": "gzip"}, follow_redirects=False)
+        
+        assert response.status_code == 200
+        assert response.content == CONVERTED_XML
+        assert mock_stream.call_args.kwargs["decompress"] is True
+        mock_presign.assert_not_called()
+
+    @patch('app.api.endpoints.conversion.storage_service.get_download_url', new_callable=AsyncMock)
+    async def test_large_uncompressed_download_redirects(self, mock_presign, test_client: TestClient, converted_operation):
+        """Test that a large uncompressed file redirects without an encoding override."""
+        mock_presign.return_value = "https://storage.example/object"
+        url = await converted_operation(
+            output_size_bytes=get_settings().download_stream_threshold + 1, content_encoding=None
+        )
+        
+        response = test_client.get(url, headers={"Accept-Encoding": "gzip"}, follow_redirects=False)
+        
+        assert response.status_code == 302
+        assert "vary" not in response.headers
+        assert "response-content-encoding" not in mock_presign.call_args.kwargs["response_headers"]
+
+
+CACHED_KEY = "sha256/cached.xml.zst"
+
+
+@pytest.fixture
+def task_sessions(test_session):
+    """Route the batch's per-file sessions to the test session."""
+    @asynccontextmanager
+    async def get_test_session():
+        yield test_session
+    
+    with patch("app.api.endpoints.conversion.get_async_session", get_test_session):
+        yield
+
+
+@pytest_asyncio.fixture
+async def cached_conversion(test_session):
+    """Factory for a conversion cache entry for the given input content."""
+    async def create(content: bytes, content_encoding="zstd"):
+        test_session.add(ConversionCache(
+            content_hash=hashlib.blake2b(content, digest_size=32).hexdigest(),
+            target_format="xml",
+            output_size_bytes=len(CONVERTED_XML),
+            storage_info={
+                "bucket": "test-bucket",
+                "object_key": CACHED_KEY,
+                "url": "https://storage.example/expired",
+                "content_type": "application/xml",
+                "content_encoding": content_encoding,
+            },
+        ))
+        await test_session.commit()
+    
+    return create
+
+
+def _write_converted_output(**kwargs) -> ConversionResult:
+    """Fake convert_document that writes CONVERTED_XML to the output path."""
+    Path(kwargs["output_path"]).write_bytes(CONVERTED_XML)
+    return ConversionResult(
+        success=True,
+        source_path=str(kwargs["input_path"]),
+        target_path=str(kwargs["output_path"]),
+        source_format="json",
+        target_format=kwargs["target_format"],
+        conversion_time_ms=300,
+        file_size_bytes=len(CONVERTED_XML),
+    )
+
+
+STORED_OUTPUT = StorageResult(
+    success=True,
+    bucket="test-bucket",
+    object_key="sha256/stored.xml.zst",
+    checksum="stored",
+    file_size_bytes=len(CONVERTED_XML),
+    content_type="application/xml",
+    content_encoding="zstd",
+)
+
+
+async def _reference_count(session, object_key: str) -> int:
+    """Read the current reference count of a stored object."""
+    result = await session.execute(
+        select(StoredObject.reference_count).where(StoredObject.object_key == object_key)
+    )
+    return result.scalar_one()
+
+
+class TestConversionCache:
+    """Integration tests for conversion cache hits and misses."""
+
+    @patch('app.api.endpoints.conversion.storage_service.get_download_url', new_callable=AsyncMock)
+    @patch('app.api.endpoints.conversion.storage_service.object_exists', new_callable=AsyncMock, return_value=True)
+    @patch('app.api.endpoints.conversion.oscal_service.convert_document', new_callable=AsyncMock)
+    async def test_file_cache_hit(self, mock_convert, mock_exists, mock_presign, test_client: TestClient, test_session, cached_conversion, sample_ssp):
+        """Test that a cached compressed conversion is served without the CLI or a stale URL."""
+        file_content = json.dumps(sample_ssp).encode('utf-8')
+        await cached_conversion(file_content)
+        
+        files = {"file": ("test_ssp.json", file_content, "application/json")}
+        response = test_client.post("/api/v1/convert/file", files=files, data={"target_format": "xml"})
+        
+        assert response.status_code == 200
+        response_data = response.json()
+        
+        assert response_data["cache_hit"] is True
+        assert response_data["storage"]["object_key"] == CACHED_KEY
+        # Compressed objects are downloaded through the API, never by URL
+        assert response_data["storage"]["url"] is None
+        mock_convert.assert_not_called()
+        mock_presign.assert_not_called()
+        assert await _reference_count(test_session, CACHED_KEY) == 1
+
+    @patch('app.api.endpoints.conversion.storage_service.get_download_url', new_callable=AsyncMock)
+    @patch('app.api.endpoints.conversion.storage_service.object_exists', new_callable=AsyncMock, return_value=True)
+    @patch('app.api.endpoints.conversion.oscal_service.convert_document', new_callable=AsyncMock)
+    async def test_batch_cache_hit(self, mock_convert, mock_exists, mock_presign, test_client: TestClient, test_session, task_sessions, cached_conversion, sample_ssp):
+        """Test that batch items are served from the cache with a freshly signed URL."""
+        mock_presign.return_value = "https://storage.example/fresh"
+        file_content = json.dumps(sample_ssp).encode('utf-8')
+        await cached_conversion(file_content, content_encoding=None)
+        
+        files = [("files", ("test_ssp.json", file_content, "application/json"))]
+        response = test_client.post("/api/v1/convert/batch", files=files, data={"target_format": "xml"})
+        
+        assert response.status_code == 200
+        result = response.json()["results"][0]
+        
+        assert result["success"] is True
+        assert result["cache_hit"] is True
+        assert result["storage"]["url"] == "https://storage.example/fresh"
+        mock_convert.assert_not_called()
+        assert mock_presign.call_args.args == ("test-bucket", CACHED_KEY)
+        assert await _reference_count(test_session, CACHED_KEY) == 1
+
+    @patch('app.api.endpoints.conversion.storage_service.object_exists', new_callable=AsyncMock, return_value=True)
+    @patch('app.api.endpoints.conversion.storage_service.store_artifact', new_callable=AsyncMock, return_value=STORED_OUTPUT)
+    @patch('app.api.endpoints.conversion.oscal_service.convert_document', new_callable=AsyncMock)
+    async def test_batch_cache_miss(self, mock_convert, mock_store, mock_exists, test_client: TestClient, test_session, task_sessions, sample_ssp):
+        """Test that a batch item is converted and cached, and its repeat is served from the cache."""
+        mock_convert.side_effect = _write_converted_output
+        file_content = json.dumps(sample_ssp).encode('utf-8')
+        files = [("files", ("test_ssp.json", file_content, "application/json"))]
+        
+        first = test_client.post("/api/v1/convert/batch", files=files, data={"target_format": "xml"})
+        second = test_client.post("/api/v1/convert/batch", files=files, data={"target_format": "xml"})
+        
+        assert first.status_code == 200
+        assert second.status_code == 200
+        assert first.json()["results"][0]["cache_hit"] is False
+        assert second.json()["results"][0]["cache_hit"] is True
+        assert second.json()["results"][0]["storage"]["object_key"] == STORED_OUTPUT.object_key
+        mock_convert.assert_awaited_once()
+        mock_store.assert_awaited_once()
+        
+        cached = await test_session.scalar(select(ConversionCache))
+        assert cached.content_hash == hashlib.blake2b(file_content, digest_size=32).hexdigest()
+        assert cached.output_size_bytes == len(CONVERTED_XML)
+
+    @patch('app.api.endpoints.conversion.storage_service.object_exists', new_callable=AsyncMock, return_value=False)
+    @patch('app.api.endpoints.conversion.storage_service.store_artifact', new_callable=AsyncMock, return_value=STORED_OUTPUT)
+    @patch('app.api.endpoints.conversion.oscal_service.convert_document', new_callable=AsyncMock)
+    async def test_cache_entry_missing_object(self, mock_convert, mock_store, mock_exists, test_client: TestClient, test_session, cached_conversion, sample_ssp):
+        """Test that an entry whose object is gone is converted again and replaced."""
+        mock_convert.side_effect = _write_converted_output
+        file_content = json.dumps(sample_ssp).encode('utf-8')
+        await cached_conversion(file_content)
+        
+        files = {"file": ("test_ssp.json", file_content, "application/json")}
+        response = test_client.post("/api/v1/convert/file", files=files, data={"target_format": "xml"})
+        
+        assert response.status_code == 200
+        assert response.json()["cache_hit"] is False
+        mock_convert.assert_awaited_once()
+        
+        test_session.expire_all()
+        cached = await test_session.scalar(select(ConversionCache))
+        assert cached.storage_info["object_key"] == STORED_OUTPUT.object_key
+        # The reference taken while checking the stale entry is given back
+        assert await _reference_count(test_session, CACHED_KEY) == 0
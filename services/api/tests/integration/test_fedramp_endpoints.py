@@ -15,7 +15,7 @@ from fastapi.testclient import TestClient
 class TestFedRAMPEndpoints:
     """Integration tests for FedRAMP validation endpoints."""
 
-    @patch('app.services.fedramp_service.FedRAMPService.validate_document')
+    @patch('app.services.fedramp_service.FedRAMPService.validate_bytes_in_pool')
     def test_validate_fedramp_file_compliant(self, mock_validate, test_client: TestClient, sample_ssp):
         """Test FedRAMP validation with compliant document."""
         from app.services.fedramp_service import FedRAMPValidationResult
@@ -46,7 +46,7 @@ class TestFedRAMPEndpoints:
         assert response_data["document_type"] == "system-security-plan"
         assert "validation_summary" in response_data
 
-    @patch('app.services.fedramp_service.FedRAMPService.validate_document')
+    @patch('app.services.fedramp_service.FedRAMPService.validate_bytes_in_pool')
     def test_validate_fedramp_file_non_compliant(self, mock_validate, test_client: TestClient, sample_ssp):
         """Test FedRAMP validation with non-compliant document."""
         from app.services.fedramp_service import FedRAMPValidationResult, FedRAMPValidationIssue
@@ -98,6 +98,43 @@ class TestFedRAMPEndpoints:
         warning_issue = next(i for i in response_data["issues"] if i["severity"] == "warning")
         assert "control-assessor" in warning_issue["message"]
 
+    @patch('app.services.fedramp_service.FedRAMPService.validate_bytes_in_pool')
+    def test_validate_fedramp_file_ndjson(self, mock_validate, test_client: TestClient, sample_ssp):
+        """Test FedRAMP validation streamed as NDJSON."""
+        from app.services.fedramp_service import FedRAMPValidationResult, FedRAMPValidationIssue
+        
+        mock_validate.return_value = FedRAMPValidationResult(
+            is_compliant=False,
+            baseline="moderate",
+            document_type="system-security-plan",
+            issues=[
+                FedRAMPValidationIssue(
+                    severity="error",
+                    code="FEDRAMP_MISSING_REQUIRED_CONTROL",
+                    message=f"Required control AC-{i} is not implemented"
+                )
+                for i in range(3)
+            ],
+            validation_time_ms=1000
+        )
+        
+        file_content = json.dumps(sample_ssp).encode('utf-8')
+        files = {"file": ("test_ssp.json", file_content, "application/json")}
+        data = {"baseline": "moderate", "store_result": "false"}
+        headers = {"Accept": "application/x-ndjson"}
+        
+        response = test_client.post("/api/v1/fedramp/validate/file", files=files, data=data, headers=headers)
+        
+        assert response.status_code == 400
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert len(lines) == 4
+        assert lines[0]["is_compliant"] is False
+        assert "issues" not in lines[0]
+        assert lines[0]["validation_summary"]["total_issues"] == 3
+        assert all(line["code"] == "FEDRAMP_MISSING_REQUIRED_CONTROL" for line in lines[1:])
+
     def test_validate_fedramp_invalid_baseline(self, test_client: TestClient, sample_ssp):
         """Test FedRAMP validation with invalid baseline."""
         file_content = json.dumps(sample_ssp).encode('utf-8')
@@ -146,7 +183,7 @@ class TestFedRAMPEndpoints:
         assert moderate["min_controls"] == 325
         assert "Moderate impact systems" in moderate["description"]
 
-    @patch('app.services.fedramp_service.FedRAMPService.validate_document')
+    @patch('app.services.fedramp_service.FedRAMPService.validate_bytes_in_pool')
     def test_validate_fedramp_batch_success(self, mock_validate, test_client: TestClient, sample_ssp):
         """Test FedRAMP batch validation."""
         from app.services.fedramp_service import FedRAMPValidationResult
@@ -263,7 +300,29 @@ class TestFedRAMPEndpoints:
         assert response.status_code == 400
         assert "Only JSON and XML OSCAL files are supported" in response.json()["detail"]
 
-    @patch('app.services.fedramp_service.FedRAMPService.validate_document')
+    @patch('app.services.fedramp_service.FedRAMPService.validate_bytes_in_pool')
+    def test_fedramp_validate_sniffs_generic_content_type(self, mock_validate, test_client: TestClient, sample_ssp):
+        """Test FedRAMP validation accepts JSON uploaded as application/octet-stream."""
+        from app.services.fedramp_service import FedRAMPValidationResult
+        
+        mock_validate.return_value = FedRAMPValidationResult(
+            is_compliant=True,
+            baseline="moderate",
+            document_type="system-security-plan",
+            issues=[],
+            validation_time_ms=1000
+        )
+        
+        file_content = json.dumps(sample_ssp).encode('utf-8')
+        files = {"file": ("test_ssp.json", file_content, "application/octet-stream")}
+        data = {"baseline": "moderate", "store_result": "false"}
+        
+        response = test_client.post("/api/v1/fedramp/validate/file", files=files, data=data)
+        
+        assert response.status_code == 200
+        assert mock_validate.call_args.args[0] == file_content
+
+    @patch('app.services.fedramp_service.FedRAMPService.validate_bytes_in_pool')
     def test_fedramp_validate_service_error(self, mock_validate, test_client: TestClient, sample_ssp):
         """Test FedRAMP validation when service throws an error."""
         # Mock service error
@@ -0,0 +1,73 @@
+"""
+Integration tests for ASGI middleware.
+
+Tests that the request size limit rejects oversized bodies whether or not
+they declare a Content-Length.
+"""
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.core.middleware import RequestSizeLimitMiddleware
+
+
+MAX_BODY_SIZE = 16
+
+
+@pytest.fixture
+def limited_client():
+    """Client for an echo app behind a 16 byte request size limit."""
+    app = FastAPI()
+    app.add_middleware(RequestSizeLimitMiddleware, max_body_size=MAX_BODY_SIZE)
+    
+    @app.post("/echo")
+    async def echo(request: Request) -> dict:
+        body = await request.body()
+        return {"received_bytes": len(body)}
+    
+    with TestClient(app) as client:
+        yield client
+
+
+class TestRequestSizeLimitMiddleware:
+    """Integration tests for RequestSizeLimitMiddleware."""
+
+    def test_body_within_limit(self, limited_client: TestClient):
+        """Test that bodies up to the limit reach the endpoint."""
+        response = limited_client.post("/echo", content=b"x" * MAX_BODY_SIZE)
+        
+        assert response.status_code == 200
+        assert response.json()["received_bytes"] == MAX_BODY_SIZE
+
+    def test_declared_content_length_too_large(self, limited_client: TestClient):
+        """Test that an oversized Content-Length is rejected before the body is read."""
+        response = limited_client.post("/echo", content=b"x" * (MAX_BODY_SIZE + 1))
+        
+        assert response.status_code == 413
+        response_data = response.json()
+        
+        assert response_data["error"] == "REQUEST_TOO_LARGE"
+        assert response_data["details"]["max_body_size"] == MAX_BODY_SIZE
+
+    def test_chunked_body_too_large(self, limited_client: TestClient):
+        """Test that a body without Content-Length is cut off once it crosses the limit."""
+        def chunks():
+            for _ in range(4):
+                yield b"x" * 8
+        
+        response = limited_client.post("/echo", content=chunks())
+        
+        assert response.status_code == 413
+        assert response.json()["detail"] == f"Request body exceeds {MAX_BODY_SIZE} bytes"
+
+    def test_chunked_body_within_limit(self, limited_client: TestClient):
+        """Test that a small body without Content-Length is passed through."""
+        def chunks():
+            yield b"x" * 8
+            yield b"x" * 8
+        
+        response = limited_client.post("/echo", content=chunks())
+        
+        assert response.status_code == 200
+        assert response.json()["received_bytes"] == MAX_BODY_SIZE
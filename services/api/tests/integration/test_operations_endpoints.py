@@ -0,0 +1,120 @@
+"""
+Integration tests for operations tracking endpoints.
+
+Tests offset and keyset (cursor) pagination of the operations listing.
+"""
+
+import base64
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+from fastapi.testclient import TestClient
+
+from app.api.endpoints.operations import _decode_cursor, _encode_cursor
+from app.models import Operation
+from app.models.operation import OperationStatus, OperationType
+
+
+@pytest_asyncio.fixture
+async def seeded_operations(test_session):
+    """Five operations created a minute apart, returned newest first."""
+    base_time = datetime(2024, 1, 15, 10, 0, 0)
+    operations = [
+        Operation(
+            operation_type=OperationType.VALIDATION,
+            operation_name=f"Validate document {i}",
+            status=OperationStatus.COMPLETED,
+            created_at=base_time + timedelta(minutes=i),
+        )
+        for i in range(5)
+    ]
+    test_session.add_all(operations)
+    await test_session.commit()
+    
+    return [str(op.id) for op in reversed(operations)]
+
+
+class TestOperationsPagination:
+    """Integration tests for operations list pagination."""
+
+    def test_cursor_round_trip(self):
+        """Test that a cursor decodes back to the position it encodes."""
+        created_at = datetime(2024, 1, 15, 10, 30, tzinfo=timezone.utc)
+        row_id = uuid4()
+        
+        assert _decode_cursor(_encode_cursor(created_at, row_id)) == (created_at, row_id)
+
+    def test_offset_page_returns_next_cursor(self, test_client: TestClient, seeded_operations):
+        """Test that an offset page reports the total and a cursor for the next page."""
+        response = test_client.get("/api/v1/operations/", params={"limit": 2})
+        
+        assert response.status_code == 200
+        response_data = response.json()
+        
+        assert [op["id"] for op in response_data["operations"]] == seeded_operations[:2]
+        pagination = response_data["pagination"]
+        assert pagination["total"] == 5
+        assert pagination["has_more"] is True
+        assert pagination["next_cursor"] is not None
+
+    def test_cursor_walks_all_operations(self, test_client: TestClient, seeded_operations):
+        """Test that following next_cursor visits every operation once, newest first."""
+        seen = []
+        params = {"limit": 2}
+        
+        while True:
+            response = test_client.get("/api/v1/operations/", params=params)
+            assert response.status_code == 200
+            response_data = response.json()
+            
+            seen.extend(op["id"] for op in response_data["operations"])
+            next_cursor = response_data["pagination"]["next_cursor"]
+            if next_cursor is None:
+                break
+            params = {"limit": 2, "cursor": next_cursor}
+        
+        assert seen == seeded_operations
+        assert "total" not in response_data["pagination"]
+        assert response_data["pagination"]["has_more"] is False
+
+    def test_cursor_exact_final_page_has_no_more(self, test_client: TestClient, seeded_operations):
+        """Test that a keyset page filling exactly to the end reports has_more False."""
+        first = test_client.get("/api/v1/operations/", params={"limit": 2}).json()
+        cursor = first["pagination"]["next_cursor"]
+        
+        response = test_client.get("/api/v1/operations/", params={"limit": 3, "cursor": cursor})
+        
+        assert response.status_code == 200
+        response_data = response.json()
+        
+        assert [op["id"] for op in response_data["operations"]] == seeded_operations[2:]
+        assert response_data["pagination"]["has_more"] is False
+        assert response_data["pagination"]["next_cursor"] is None
+
+    def test_cursor_page_with_more_rows(self, test_client: TestClient, seeded_operations):
+        """Test that the extra keyset row sets has_more without being returned."""
+        first = test_client.get("/api/v1/operations/", params={"limit": 1}).json()
+        cursor = first["pagination"]["next_cursor"]
+        
+        response = test_client.get("/api/v1/operations/", params={"limit": 2, "cursor": cursor})
+        
+        assert response.status_code == 200
+        response_data = response.json()
+        
+        assert [op["id"] for op in response_data["operations"]] == seeded_operations[1:3]
+        assert response_data["pagination"]["has_more"] is True
+        assert response_data["pagination"]["next_cursor"] is not None
+
+    @pytest.mark.parametrize("cursor", [
+        "not-base64!",
+        base64.urlsafe_b64encode(b"no-separator").decode(),
+        base64.urlsafe_b64encode(b"2024-01-15T10:00:00|not-a-uuid").decode(),
+        base64.urlsafe_b64encode(b"\xff\xfe|\xff").decode(),
+    ])
+    def test_invalid_cursor(self, test_client: TestClient, cursor):
+        """Test that a malformed cursor is rejected with 400."""
+        response = test_client.get("/api/v1/operations/", params={"cursor": cursor})
+        
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid pagination cursor"
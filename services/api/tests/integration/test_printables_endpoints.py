@@ -0,0 +1,53 @@
+"""
+Integration tests for printable document API endpoints.
+
+Tests conditional requests against the template listing.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+class TestTemplateListing:
+    """Integration tests for the templates endpoint's ETag validation."""
+
+    def test_list_templates(self, test_client: TestClient):
+        """Test that the template listing carries an ETag and cache headers."""
+        response = test_client.get("/api/v1/printables/templates")
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/json")
+        assert response.headers["etag"].startswith('"')
+        assert "max-age" in response.headers["cache-control"]
+        
+        document_types = {t["type"] for t in response.json()["document_types"]}
+        assert "ssp" in document_types
+
+    def test_matching_etag_not_modified(self, test_client: TestClient):
+        """Test that a request with the current ETag gets 304 and no body."""
+        etag = test_client.get("/api/v1/printables/templates").headers["etag"]
+        
+        response = test_client.get("/api/v1/printables/templates", headers={"If-None-Match": etag})
+        
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+    @pytest.mark.parametrize("if_none_match", ["*", '"stale-etag", {etag}'])
+    def test_etag_list_or_wildcard_not_modified(self, test_client: TestClient, if_none_match):
+        """Test that a wildcard or an ETag list containing the current ETag gets 304."""
+        etag = test_client.get("/api/v1/printables/templates").headers["etag"]
+        
+        response = test_client.get(
+            "/api/v1/printables/templates",
+            headers={"If-None-Match": if_none_match.format(etag=etag)}
+        )
+        
+        assert response.status_code == 304
+
+    def test_stale_etag_returns_listing(self, test_client: TestClient):
+        """Test that a stale ETag gets the full listing."""
+        response = test_client.get("/api/v1/printables/templates", headers={"If-None-Match": '"stale-etag"'})
+        
+        assert response.status_code == 200
+        assert "document_types" in response.json()
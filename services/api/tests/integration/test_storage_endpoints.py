@@ -0,0 +1,134 @@
+"""
+Integration tests for storage API endpoints.
+
+Tests that deleting an artifact only removes content-addressed storage
+objects once no other record references them.
+"""
+
+import pytest_asyncio
+from typing import Optional
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app.models import Artifact, ArtifactVersion, StoredObject
+
+
+SHARED_KEY = "sha256/abc123def456.json"
+
+
+@pytest_asyncio.fixture
+async def artifact_factory(test_session):
+    """Create an artifact whose versions are all stored under SHARED_KEY."""
+    async def create(reference_count=None, version_count=1):
+        artifact = Artifact(name="Test SSP", artifact_type="ssp")
+        for version_number in range(1, version_count + 1):
+            artifact.versions.append(ArtifactVersion(
+                version_number=version_number,
+                original_filename="test_ssp.json",
+                file_size_bytes=1024,
+                content_type="application/json",
+                sha256_checksum="abc123def456",
+                storage_bucket="test-bucket",
+                storage_key=SHARED_KEY,
+            ))
+        test_session.add(artifact)
+        if reference_count is not None:
+            test_session.add(StoredObject(
+                bucket="test-bucket",
+                object_key=SHARED_KEY,
+                reference_count=reference_count,
+            ))
+        await test_session.commit()
+        return str(artifact.id)
+    
+    return create
+
+
+async def _reference_count(session) -> Optional[int]:
+    """Read the current reference count of SHARED_KEY, None once it is untracked."""
+    result = await session.execute(
+        select(StoredObject.reference_count).where(StoredObject.object_key == SHARED_KEY)
+    )
+    return result.scalar_one_or_none()
+
+
+class TestDeleteArtifact:
+    """Integration tests for refcounted artifact deletion."""
+
+    @patch('app.api.endpoints.storage.storage_service.delete_artifact', new_callable=AsyncMock)
+    async def test_delete_skips_shared_object(self, mock_delete, test_client: TestClient, test_session, artifact_factory):
+        """Test that an object still referenced elsewhere is kept."""
+        artifact_id = await artifact_factory(reference_count=2)
+        
+        response = test_client.delete(f"/api/v1/storage/artifacts/{artifact_id}", params={"force": "true"})
+        
+        assert response.status_code == 200
+        response_data = response.json()
+        
+        assert response_data["deleted_versions"] == 1
+        assert response_data["deleted_storage_objects"] == 0
+        mock_delete.assert_not_called()
+        assert await _reference_count(test_session) == 1
+
+    @patch('app.api.endpoints.storage.storage_service.delete_artifact', new_callable=AsyncMock)
+    async def test_delete_removes_last_reference(self, mock_delete, test_client: TestClient, test_session, artifact_factory):
+        """Test that the object is deleted when the last reference is released."""
+        artifact_id = await artifact_factory(reference_count=1)
+        
+        response = test_client.delete(f"/api/v1/storage/artifacts/{artifact_id}", params={"force": "true"})
+        
+        assert response.status_code == 200
+        assert response.json()["deleted_storage_objects"] == 1
+        mock_delete.assert_awaited_once_with(bucket="test-bucket", object_key=SHARED_KEY)
+        # The deleted object's row is removed with it
+        assert await _reference_count(test_session) is None
+
+    @patch('app.api.endpoints.storage.storage_service.delete_artifact', new_callable=AsyncMock)
+    async def test_delete_shared_by_versions(self, mock_delete, test_client: TestClient, test_session, artifact_factory):
+        """Test that an object shared by several versions is deleted once."""
+        artifact_id = await artifact_factory(reference_count=2, version_count=2)
+        
+        response = test_client.delete(f"/api/v1/storage/artifacts/{artifact_id}", params={"force": "true"})
+        
+        assert response.status_code == 200
+        response_data = response.json()
+        
+        assert response_data["deleted_versions"] == 2
+        assert response_data["deleted_storage_objects"] == 1
+        mock_delete.assert_awaited_once_with(bucket="test-bucket", object_key=SHARED_KEY)
+        assert await _reference_count(test_session) is None
+
+    @patch('app.api.endpoints.storage.release_object_reference', new_callable=AsyncMock, return_value=0)
+    @patch('app.api.endpoints.storage.storage_service.delete_artifact', new_callable=AsyncMock)
+    async def test_delete_keeps_object_referenced_again(self, mock_delete, mock_release, test_client: TestClient, test_session, artifact_factory):
+        """Test that an object referenced again after its release is kept."""
+        # An upload of the same content acquired a reference after the release
+        artifact_id = await artifact_factory(reference_count=1)
+        
+        response = test_client.delete(f"/api/v1/storage/artifacts/{artifact_id}", params={"force": "true"})
+        
+        assert response.status_code == 200
+        assert response.json()["deleted_storage_objects"] == 0
+        mock_release.assert_awaited_once()
+        mock_delete.assert_not_called()
+        assert await _reference_count(test_session) == 1
+
+    @patch('app.api.endpoints.storage.storage_service.delete_artifact', new_callable=AsyncMock)
+    async def test_delete_untracked_object(self, mock_delete, test_client: TestClient, artifact_factory):
+        """Test that objects stored before reference tracking are treated as unshared."""
+        artifact_id = await artifact_factory()
+        
+        response = test_client.delete(f"/api/v1/storage/artifacts/{artifact_id}", params={"force": "true"})
+        
+        assert response.status_code == 200
+        assert response.json()["deleted_storage_objects"] == 1
+        mock_delete.assert_awaited_once_with(bucket="test-bucket", object_key=SHARED_KEY)
+
+    def test_delete_missing_artifact(self, test_client: TestClient):
+        """Test that a missing artifact is reported as not found."""
+        fake_uuid = "12345678-1234-5678-9abc-123456789012"
+        response = test_client.delete(f"/api/v1/storage/artifacts/{fake_uuid}")
+        
+        assert response.status_code == 404
+        assert "not found" in response.json()["detail"].lower()
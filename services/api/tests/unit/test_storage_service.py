@@ -0,0 +1,78 @@
+"""
+Unit tests for storage service functionality.
+
+Tests how compressed artifacts are written to and described from storage.
+"""
+
+import pytest
+import zstandard
+from unittest.mock import Mock, patch
+
+from app.services.storage_service import StorageService
+
+
+class TestStorageService:
+    """Test cases for storage service."""
+
+    @pytest.fixture
+    def storage_service(self):
+        """Create storage service with a mocked MinIO client and a ready bucket."""
+        with patch.object(StorageService, "_create_client", return_value=Mock()):
+            service = StorageService()
+        service._bucket_ready = True
+        service.client.presigned_get_object.return_value = "https://storage.example/object"
+        service._object_exists = Mock(return_value=False)
+        return service
+
+    @pytest.mark.asyncio
+    async def test_store_bytes_compressed(self, storage_service):
+        """Test that compressed content records its codec as custom metadata and gets no URL."""
+        data = b'{"system-security-plan": {}}' * 100
+        
+        result = await storage_service.store_artifact_bytes(
+            data, "converted", original_filename="ssp.json", compress=True
+        )
+        
+        assert result.content_encoding == "zstd"
+        assert result.object_key.endswith(".json.zst")
+        assert result.url is None
+        storage_service.client.presigned_get_object.assert_not_called()
+        
+        kwargs = storage_service.client.put_object.call_args.kwargs
+        assert kwargs["metadata"]["compression"] == "zstd"
+        assert "Content-Encoding" not in kwargs["metadata"]
+        assert zstandard.ZstdDecompressor().decompress(kwargs["data"].read()) == data
+
+    @pytest.mark.asyncio
+    async def test_store_bytes_uncompressed(self, storage_service):
+        """Test that uncompressed content is stored as-is with a presigned URL."""
+        data = b'{"system-security-plan": {}}'
+        
+        result = await storage_service.store_artifact_bytes(
+            data, "converted", original_filename="ssp.json"
+        )
+        
+        assert result.content_encoding is None
+        assert result.url == "https://storage.example/object"
+        
+        kwargs = storage_service.client.put_object.call_args.kwargs
+        assert "compression" not in kwargs["metadata"]
+        assert kwargs["data"].read() == data
+
+    @pytest.mark.asyncio
+    async def test_store_file_compressed(self, storage_service, tmp_path):
+        """Test that compressed files record their codec as custom metadata and get no URL."""
+        file_path = tmp_path / "ssp.xml"
+        file_path.write_bytes(b"<system-security-plan/>" * 100)
+        
+        result = await storage_service.store_artifact(file_path, "converted", compress=True)
+        
+        assert result.content_encoding == "zstd"
+        assert result.url is None
+        storage_service.client.presigned_get_object.assert_not_called()
+        
+        kwargs = storage_service.client.fput_object.call_args.kwargs
+        assert kwargs["metadata"]["compression"] == "zstd"
+        assert "Content-Encoding" not in kwargs["metadata"]
+        # The compressed temp copy is removed after the upload
+        assert not (tmp_path / "ssp.xml.zst").exists()